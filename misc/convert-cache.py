@@ -3,6 +3,10 @@
 
 We support a filesystem tree based cache and a sqlite based cache.
 See mypy/metastore.py for details.
+
+Data files can also be converted between the JSON and binary formats
+(see mypy/binarycache.py), and either kind of cache can be packed into a
+read-only cache bundle for use with --cache-bundle.
 """
 
 from __future__ import annotations
@@ -14,8 +18,20 @@ import sys
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import argparse
+import json
 
-from mypy.metastore import FilesystemMetadataStore, MetadataStore, SqliteMetadataStore
+from mypy.binarycache import (
+    BINARY_DATA_SUFFIX,
+    decode_cache_data,
+    encode_cache_data,
+    is_binary_cache_file,
+)
+from mypy.metastore import (
+    FilesystemMetadataStore,
+    MetadataStore,
+    SqliteMetadataStore,
+    write_cache_bundle,
+)
 
 
 def main() -> None:
@@ -32,14 +48,34 @@ def main() -> None:
         default=None,
         help="Output cache location (default: same as input)",
     )
+    parser.add_argument(
+        "--data-format",
+        choices=["json", "binary"],
+        default=None,
+        help="Convert data files to the given format (default: keep as is)",
+    )
+    parser.add_argument(
+        "--to-bundle",
+        metavar="FILE",
+        default=None,
+        help="Pack the cache (of either kind) into a read-only bundle file",
+    )
     parser.add_argument("input_dir", help="Input directory for the cache")
     args = parser.parse_args()
 
     input_dir = args.input_dir
+    if args.to_bundle:
+        if os.path.isfile(os.path.join(input_dir, "cache.db")):
+            input: MetadataStore = SqliteMetadataStore(input_dir)
+        else:
+            input = FilesystemMetadataStore(input_dir)
+        count = write_cache_bundle(input, args.to_bundle)
+        print(f"Wrote {count} cache entries to {args.to_bundle}")
+        return
     output_dir = args.output_dir or input_dir
     assert os.path.isdir(output_dir), f"{output_dir} is not a directory"
     if args.to_sqlite:
-        input: MetadataStore = FilesystemMetadataStore(input_dir)
+        input = FilesystemMetadataStore(input_dir)
         output: MetadataStore = SqliteMetadataStore(output_dir)
     else:
         fnam = os.path.join(input_dir, "cache.db")
@@ -50,10 +86,22 @@ def main() -> None:
         input, output = SqliteMetadataStore(input_dir), FilesystemMetadataStore(output_dir)
 
     for s in input.list_all():
-        if s.endswith(".json"):
-            assert output.write(
-                s, input.read(s), input.getmtime(s)
-            ), f"Failed to write cache file {s}!"
+        mtime = input.getmtime(s)
+        if s.endswith(".data.json") and args.data_format == "binary":
+            data = encode_cache_data(json.loads(input.read(s)))
+            target = s[: -len(".data.json")] + BINARY_DATA_SUFFIX
+            ok = output.write_bytes(target, data, mtime)
+        elif is_binary_cache_file(s) and args.data_format == "json":
+            data_str = json.dumps(decode_cache_data(input.read_bytes(s)), separators=(",", ":"))
+            target = s[: -len(BINARY_DATA_SUFFIX)] + ".data.json"
+            ok = output.write(target, data_str, mtime)
+        elif is_binary_cache_file(s):
+            ok = output.write_bytes(s, input.read_bytes(s), mtime)
+        elif s.endswith(".json"):
+            ok = output.write(s, input.read(s), mtime)
+        else:
+            continue
+        assert ok, f"Failed to write cache file {s}!"
     output.commit()
 
 
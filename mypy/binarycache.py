@@ -0,0 +1,93 @@
+"""Compact binary encoding for cache data files.
+
+The serialize() methods in mypy.nodes and mypy.types produce JSON-compatible
+data (dicts, lists, strings, ints, bools and None). By default this data is
+stored as JSON, but with --binary-cache it is encoded using marshal instead,
+which is both more compact and considerably faster to decode.
+
+The encoded data is deduplicated: every distinct string (in particular the
+many repeated fullnames and dictionary keys) and int is stored only once, and
+later occurrences refer back to it, so this acts as a string table. Decoding
+produces shared objects for these, which also reduces memory use.
+
+The output is deterministic for equal data, since the interface hash of a
+module is computed from it.
+"""
+
+from __future__ import annotations
+
+import marshal
+import sys
+from typing import Any, Final
+
+# Prefix identifying binary cache data files (and the format version).
+MAGIC: Final = b"\x93mypy-cache\x01"
+
+# Suffix used for binary data files instead of ".data.json".
+BINARY_DATA_SUFFIX: Final = ".data.bin"
+
+# We rely on marshal back-references (available since version 3) for deduplication.
+MARSHAL_VERSION: Final = 4
+
+
+class BinaryCacheError(Exception):
+    """Raised when decoding a corrupted or incompatible binary cache file."""
+
+
+def is_binary_cache_file(name: str) -> bool:
+    return name.endswith(BINARY_DATA_SUFFIX)
+
+
+def encode_cache_data(data: dict[str, Any]) -> bytes:
+    """Encode JSON-compatible cache data to bytes."""
+    # Note that table is alive while the data is marshalled: since it holds a
+    # reference to every string and int, marshal emits a back-reference for
+    # each repeated one regardless of any references held elsewhere, which
+    # makes the output deterministic.
+    table: dict[object, object] = {}
+    canonical: Any = _canonicalize(data, table)
+    return MAGIC + marshal.dumps(canonical, MARSHAL_VERSION)
+
+
+def decode_cache_data(data: bytes) -> dict[str, Any]:
+    """Decode cache data encoded by encode_cache_data()."""
+    if not data.startswith(MAGIC):
+        raise BinaryCacheError("Invalid binary cache data (bad header)")
+    try:
+        result = marshal.loads(memoryview(data)[len(MAGIC) :])
+    except (EOFError, ValueError, TypeError) as err:
+        raise BinaryCacheError(f"Invalid binary cache data ({err})") from err
+    if not isinstance(result, dict):
+        raise BinaryCacheError("Invalid binary cache data (not a dict)")
+    return result
+
+
+def _canonicalize(obj: object, table: dict[object, object]) -> object:
+    """Make a fresh copy of obj with all equal strings and ints shared.
+
+    Strings are interned, so that they are also interned when decoded.
+    Tuples become lists, as they would in a JSON round trip. Dict keys are
+    sorted, so that the output doesn't depend on insertion order.
+    """
+    t = type(obj)
+    if t is str:
+        assert isinstance(obj, str)
+        return table.setdefault(obj, sys.intern(obj))
+    if t is int:
+        # Note that bools are never put in table, since True == 1.
+        return table.setdefault(obj, obj)
+    if t is dict:
+        assert isinstance(obj, dict)
+        for key in obj:
+            if type(key) is not str:
+                raise TypeError(f"Cache data keys must be strings, not {type(key).__name__}")
+        result = {}
+        for key in sorted(obj):
+            result[table.setdefault(key, sys.intern(key))] = _canonicalize(obj[key], table)
+        return result
+    if t is list or t is tuple:
+        assert isinstance(obj, (list, tuple))
+        return [_canonicalize(item, table) for item in obj]
+    if obj is None or t is bool or t is float:
+        return obj
+    raise TypeError(f"Unsupported type in cache data: {t.__name__}")
@@ -16,6 +16,7 @@ import collections
 import contextlib
 import errno
 import gc
+import io
 import json
 import os
 import platform
@@ -32,6 +33,7 @@ from typing import (
     ClassVar,
     Dict,
     Final,
+    Iterable,
     Iterator,
     Mapping,
     NamedTuple,
@@ -42,6 +44,13 @@ from typing import (
 from typing_extensions import TypeAlias as _TypeAlias, TypedDict
 
 import mypy.semanal_main
+from mypy.binarycache import (
+    BINARY_DATA_SUFFIX,
+    BinaryCacheError,
+    decode_cache_data,
+    encode_cache_data,
+    is_binary_cache_file,
+)
 from mypy.checker import TypeChecker
 from mypy.errors import CompileError, ErrorInfo, Errors, report_internal_error
 from mypy.graph_utils import prepare_sccs, strongly_connected_components, topsort
@@ -52,9 +61,11 @@ from mypy.partially_defined import PossiblyUndefinedVariableVisitor
 from mypy.semanal import SemanticAnalyzer
 from mypy.semanal_pass1 import SemanticAnalyzerPreAnalysis
 from mypy.util import (
+    DEFAULT_HASH_ALGORITHM,
     DecodeError,
     decode_python_encoding,
     get_mypy_comments,
+    hash_algorithm,
     hash_digest,
     is_stub_package_file,
     is_sub_path,
@@ -67,13 +78,22 @@ from mypy.util import (
 
 if TYPE_CHECKING:
     from mypy.report import Reports  # Avoid unconditional slow import
+    from mypy.server.astdiff import SymbolTableSnapshots
+    from mypy.server.update import UpdateWork
 
 from mypy import errorcodes as codes
 from mypy.config_parser import parse_mypy_comments
+from mypy.depsindex import DEPS_INDEX_FILE, FineGrainedDepsIndex, open_deps_index
 from mypy.fixup import fixup_module
 from mypy.freetree import free_tree
 from mypy.fscache import FileSystemCache
-from mypy.metastore import FilesystemMetadataStore, MetadataStore, SqliteMetadataStore
+from mypy.metastore import (
+    BundleMetadataStore,
+    FilesystemMetadataStore,
+    LayeredMetadataStore,
+    MetadataStore,
+    SqliteMetadataStore,
+)
 from mypy.modulefinder import (
     BuildSource as BuildSource,
     BuildSourceSet as BuildSourceSet,
@@ -88,10 +108,11 @@ from mypy.options import Options
 from mypy.parse import parse
 from mypy.plugin import ChainedPlugin, Plugin, ReportConfigContext
 from mypy.plugins.default import DefaultPlugin
+from mypy.profiler import BuildProfiler
 from mypy.renaming import LimitedVariableRenameVisitor, VariableRenameVisitor
 from mypy.stats import dump_type_stats
 from mypy.stubinfo import legacy_bundled_packages, non_bundled_packages, stub_distribution_name
-from mypy.types import Type
+from mypy.types import Type, type_interner
 from mypy.typestate import reset_global_state, type_state
 from mypy.version import __version__
 
@@ -258,12 +279,21 @@ def _build(
     manager.trace(repr(options))
 
     reset_global_state()
+    type_interner.reset(options.intern_types)
     try:
         graph = dispatch(sources, manager, stdout)
+        manager.add_stats(**type_state.take_cache_stats())
+        if type_interner.enabled:
+            manager.add_stats(
+                interned_types=type_interner.size(),
+                interned_type_reuses=sum(type_interner.reused.values()),
+            )
         if not options.fine_grained_incremental:
             type_state.reset_all_subtype_caches()
         if options.timing_stats is not None:
             dump_timing_stats(options.timing_stats, graph)
+        if options.build_profile is not None and manager.profiler is not None:
+            manager.profiler.write_chrome_trace(options.build_profile)
         if options.line_checking_stats is not None:
             dump_line_checking_stats(options.line_checking_stats, graph)
         return BuildResult(manager, graph)
@@ -624,6 +654,22 @@ class BuildManager:
         # dependencies as we go, which allows us to free ASTs and type information,
         # saving a ton of memory on net.
         self.fg_deps: dict[str, set[str]] = {}
+        # Index of the fine-grained dependency cache, if it is used (see mypy.depsindex)
+        self.fg_deps_index: FineGrainedDepsIndex | None = None
+        # If all cached fine-grained dependencies are in the index, they are loaded
+        # for each trigger as needed, instead of for each module
+        self.fg_deps_by_trigger = False
+        self.fg_loaded_triggers: set[str] = set()
+        # Latest symbol table snapshots of modules, used by fine-grained updates
+        self.symbol_snapshots: SymbolTableSnapshots | None = None
+        # Work done by fine-grained updates, for diagnostics
+        self.fg_work: UpdateWork | None = None
+        # Number of fine-grained updates so far, and the update in which the tree of
+        # each loaded module was last used (used to find cold modules to evict)
+        self.fg_increment = 0
+        self.fg_last_used: dict[str, int] = {}
+        # Total size of the encoded trees of evicted modules (see State.evicted_tree)
+        self.evicted_tree_bytes = 0
         # Always convert the plugin to a ChainedPlugin so that it can be manipulated if needed
         if not isinstance(plugin, ChainedPlugin):
             plugin = ChainedPlugin(options, [plugin])
@@ -650,6 +696,11 @@ class BuildManager:
             and not has_reporters
         )
         self.fscache = fscache
+        self.fscache.set_hash_algorithm(options.hash_algorithm)
+        self.profiler = BuildProfiler() if options.build_profile else None
+        # Cache metas already loaded for modules that don't have a State yet
+        # (see hash_sources_in_parallel()), keyed by (module id, path)
+        self.prefetched_metas: dict[tuple[str, str], CacheMeta | None] = {}
         self.find_module_cache = FindModuleCache(
             self.search_paths, self.fscache, self.options, source_set=self.source_set
         )
@@ -850,15 +901,34 @@ class BuildManager:
 
     def load_fine_grained_deps(self, id: str) -> dict[str, set[str]]:
         t0 = time.time()
-        if id in self.fg_deps_meta:
-            # TODO: Assert deps file wasn't changed.
-            deps = json.loads(self.metastore.read(self.fg_deps_meta[id]["path"]))
+        if id in self.fg_deps_meta and self.fg_deps_meta[id]["path"] == DEPS_INDEX_FILE:
+            assert self.fg_deps_index is not None
+            val = self.fg_deps_index.module_deps(id)
         else:
-            deps = {}
-        val = {k: set(v) for k, v in deps.items()}
+            if id in self.fg_deps_meta:
+                # TODO: Assert deps file wasn't changed.
+                deps = json.loads(self.metastore.read(self.fg_deps_meta[id]["path"]))
+            else:
+                deps = {}
+            val = {k: set(v) for k, v in deps.items()}
         self.add_stats(load_fg_deps_time=time.time() - t0)
         return val
 
+    def load_fine_grained_trigger_deps(self, triggers: Iterable[str]) -> dict[str, set[str]]:
+        """Load cached dependencies of triggers that haven't been loaded yet.
+
+        This can only be used if fg_deps_by_trigger is set.
+        """
+        assert self.fg_deps_index is not None
+        triggers = [t for t in triggers if t not in self.fg_loaded_triggers]
+        if not triggers:
+            return {}
+        t0 = time.time()
+        self.fg_loaded_triggers.update(triggers)
+        deps = self.fg_deps_index.lookup_many(triggers)
+        self.add_stats(load_fg_deps_time=time.time() - t0, fg_deps_triggers_loaded=len(triggers))
+        return deps
+
     def report_file(
         self, file: MypyFile, type_map: dict[Expression, Type], options: Options
     ) -> None:
@@ -894,6 +964,13 @@ class BuildManager:
             print("TRACE:", *message, file=self.stderr)
             self.stderr.flush()
 
+    def profile(
+        self, phase: str, t0: int, module: str | None = None, scc: list[str] | None = None
+    ) -> None:
+        """Record a build phase that started at t0 (from time_ref()) if profiling."""
+        if self.profiler is not None:
+            self.profiler.record(phase, t0, module, scc)
+
     def add_stats(self, **kwds: Any) -> None:
         for key, value in kwds.items():
             if key in self.stats:
@@ -940,6 +1017,10 @@ def write_deps_cache(
        between the fine-grained dependency cache and module cache metadata
      * We store the mtime of all of the dependency files to verify they
        haven't changed
+
+    With --fine-grained-deps-index, the dependencies are instead stored in
+    an index (see mypy.depsindex), whose generation is stored in the global
+    cache file.
     """
     metastore = manager.metastore
 
@@ -947,6 +1028,25 @@ def write_deps_cache(
 
     fg_deps_meta = manager.fg_deps_meta.copy()
 
+    index_generation = None
+    index = get_deps_index_for_writing(manager)
+    if index is not None:
+        # Move any dependencies still stored in JSON files into the index, so that
+        # all dependencies can be looked up by trigger.
+        rdeps = rdeps.copy()
+        moved = [id for id, meta in fg_deps_meta.items() if meta["path"] != DEPS_INDEX_FILE]
+        for id in moved:
+            if id not in rdeps:
+                rdeps[id] = manager.load_fine_grained_deps(id)
+        index.remove_modules(moved)
+        manager.log(f"Writing fine-grained deps of {len(rdeps)} modules to {DEPS_INDEX_FILE}")
+        index_generation = index.merge(rdeps)
+        for id in rdeps:
+            fg_deps_meta[id] = {"path": DEPS_INDEX_FILE, "mtime": 0}
+        rdeps = {}
+
+    deps_files: dict[str, str] = {}
+    entries: dict[str, str] = {}
     for id in rdeps:
         if id != FAKE_ROOT_MODULE:
             _, _, deps_json = get_cache_names(id, graph[id].xpath, manager.options)
@@ -954,11 +1054,17 @@ def write_deps_cache(
             deps_json = DEPS_ROOT_FILE
         assert deps_json
         manager.log("Writing deps cache", deps_json)
-        if not manager.metastore.write(deps_json, deps_to_json(rdeps[id])):
+        deps_files[id] = deps_json
+        entries[deps_json] = deps_to_json(rdeps[id])
+    # Write all the files in one batch, which is much faster with the sqlite cache.
+    written = metastore.write_many(entries)
+    mtimes = {} if manager.options.bazel else metastore.getmtime_many(written)
+    for id, deps_json in deps_files.items():
+        if deps_json not in written:
             manager.log(f"Error writing fine-grained deps JSON file {deps_json}")
             error = True
         else:
-            fg_deps_meta[id] = {"path": deps_json, "mtime": manager.getmtime(deps_json)}
+            fg_deps_meta[id] = {"path": deps_json, "mtime": int(mtimes.get(deps_json, 0))}
 
     meta_snapshot: dict[str, str] = {}
     for id, st in graph.items():
@@ -972,7 +1078,9 @@ def write_deps_cache(
             hash = st.meta.hash
         meta_snapshot[id] = hash
 
-    meta = {"snapshot": meta_snapshot, "deps_meta": fg_deps_meta}
+    meta: dict[str, Any] = {"snapshot": meta_snapshot, "deps_meta": fg_deps_meta}
+    if index_generation is not None:
+        meta["index_generation"] = index_generation
 
     if not metastore.write(DEPS_META_FILE, json.dumps(meta, separators=(",", ":"))):
         manager.log(f"Error writing fine-grained deps meta JSON file {DEPS_META_FILE}")
@@ -1030,13 +1138,34 @@ def generate_deps_for_cache(manager: BuildManager, graph: Graph) -> dict[str, di
     # We can't just clobber existing dependency information, so we
     # load the deps for every module we've generated new dependencies
     # to and merge the new deps into them.
+    index = get_deps_index_for_writing(manager)
     for module, mdeps in rdeps.items():
+        meta = manager.fg_deps_meta.get(module)
+        if index is not None and meta is not None and meta["path"] == DEPS_INDEX_FILE:
+            # The index merges them when writing, without loading all old deps.
+            continue
         old_deps = manager.load_fine_grained_deps(module)
         merge_dependencies(old_deps, mdeps)
 
     return rdeps
 
 
+def get_deps_index_for_writing(manager: BuildManager) -> FineGrainedDepsIndex | None:
+    """Return the index to write fine-grained dependencies to, if it is enabled."""
+    options = manager.options
+    if not options.fine_grained_deps_index or options.cache_dir == os.devnull:
+        return None
+    if manager.fg_deps_index is None:
+        index = open_deps_index(_cache_dir_prefix(options), options.sqlite_cache_wal)
+        if index is None:
+            manager.log(f"Could not open {DEPS_INDEX_FILE}, using JSON files")
+            return None
+        # Nothing valid refers to the contents, since read_deps_cache() didn't open it.
+        index.clear()
+        manager.fg_deps_index = index
+    return manager.fg_deps_index
+
+
 PLUGIN_SNAPSHOT_FILE: Final = "@plugins_snapshot.json"
 
 
@@ -1084,20 +1213,48 @@ def read_quickstart_file(
     return quickstart
 
 
-def read_deps_cache(manager: BuildManager, graph: Graph) -> dict[str, FgDepMeta] | None:
+def read_deps_cache_files(
+    metastore: MetadataStore,
+) -> tuple[dict[str, Any], dict[str, float]] | None:
+    """Read the deps meta file and the mtimes of the deps cache files that it lists.
+
+    This doesn't use the build manager, so that it can run in a thread while
+    the graph is loaded. Return None on any error; read_deps_cache() then
+    reads the files again and reports the error.
+    """
+    try:
+        deps_meta = json.loads(metastore.read(DEPS_META_FILE))
+        paths = [meta["path"] for meta in deps_meta["deps_meta"].values()]
+    except Exception:
+        return None
+    return deps_meta, metastore.getmtime_many(p for p in paths if p != DEPS_INDEX_FILE)
+
+
+def read_deps_cache(
+    manager: BuildManager,
+    graph: Graph,
+    cache_files: tuple[dict[str, Any], dict[str, float]] | None = None,
+) -> dict[str, FgDepMeta] | None:
     """Read and validate the fine-grained dependencies cache.
 
     See the write_deps_cache documentation for more information on
-    the details of the cache.
+    the details of the cache. If given, cache_files has the deps meta and
+    mtimes already read by read_deps_cache_files().
 
     Returns None if the cache was invalid in some way.
     """
-    deps_meta = _load_json_file(
-        DEPS_META_FILE,
-        manager,
-        log_success="Deps meta ",
-        log_error="Could not load fine-grained dependency metadata: ",
-    )
+    deps_meta: dict[str, Any] | None
+    deps_mtimes = None
+    if cache_files is not None:
+        deps_meta, deps_mtimes = cache_files
+        manager.log("Deps meta read while loading the graph")
+    else:
+        deps_meta = _load_json_file(
+            DEPS_META_FILE,
+            manager,
+            log_success="Deps meta ",
+            log_error="Could not load fine-grained dependency metadata: ",
+        )
     if deps_meta is None:
         return None
     meta_snapshot = deps_meta["snapshot"]
@@ -1116,16 +1273,34 @@ def read_deps_cache(manager: BuildManager, graph: Graph) -> dict[str, FgDepMeta]
 
     module_deps_metas = deps_meta["deps_meta"]
     assert isinstance(module_deps_metas, dict)
+    indexed = [id for id, meta in module_deps_metas.items() if meta["path"] == DEPS_INDEX_FILE]
+    index = None
+    if indexed:
+        index = open_deps_index(
+            _cache_dir_prefix(manager.options), manager.options.sqlite_cache_wal
+        )
+        if index is None or index.generation() != deps_meta.get("index_generation"):
+            manager.log(f"Invalid or missing fine-grained deps index: {DEPS_INDEX_FILE}")
+            return None
     if not manager.options.skip_cache_mtime_checks:
         for id, meta in module_deps_metas.items():
-            try:
-                matched = manager.getmtime(meta["path"]) == meta["mtime"]
-            except FileNotFoundError:
-                matched = False
+            if meta["path"] == DEPS_INDEX_FILE:
+                continue
+            if deps_mtimes is not None:
+                mtime = deps_mtimes.get(meta["path"])
+                matched = mtime is not None and int(mtime) == meta["mtime"]
+            else:
+                try:
+                    matched = manager.getmtime(meta["path"]) == meta["mtime"]
+                except FileNotFoundError:
+                    matched = False
             if not matched:
                 manager.log(f"Invalid or missing fine-grained deps cache: {meta['path']}")
                 return None
 
+    if index is not None:
+        manager.fg_deps_index = index
+        manager.fg_deps_by_trigger = len(indexed) == len(module_deps_metas)
     return module_deps_metas
 
 
@@ -1164,6 +1339,39 @@ def _load_json_file(
         return result
 
 
+def _load_data_file(
+    file: str, manager: BuildManager, log_success: str, log_error: str
+) -> dict[str, Any] | None:
+    """Read a cache data file, which is either JSON or binary (see mypy.binarycache)."""
+    if not is_binary_cache_file(file):
+        return _load_json_file(file, manager, log_success, log_error)
+    t0 = time.time()
+    try:
+        data = manager.metastore.read_bytes(file)
+    except OSError:
+        manager.log(log_error + file)
+        return None
+    manager.add_stats(metastore_read_time=time.time() - t0)
+    manager.trace(log_success + file)
+    try:
+        t1 = time.time()
+        result = decode_cache_data(data)
+        manager.add_stats(data_binary_load_time=time.time() - t1)
+    except BinaryCacheError:
+        manager.errors.set_file(file, None, manager.options)
+        manager.errors.report(
+            -1,
+            -1,
+            "Error reading binary cache file;"
+            " you likely have a bad cache.\n"
+            "Try removing the {cache_dir} directory"
+            " and run mypy again.".format(cache_dir=manager.options.cache_dir),
+            blocker=True,
+        )
+        return None
+    return result
+
+
 def _cache_dir_prefix(options: Options) -> str:
     """Get current cache directory (or file if id is given)."""
     if options.bazel:
@@ -1210,9 +1418,14 @@ def exclude_from_backups(target_dir: str) -> None:
 def create_metastore(options: Options) -> MetadataStore:
     """Create the appropriate metadata store."""
     if options.sqlite_cache:
-        mds: MetadataStore = SqliteMetadataStore(_cache_dir_prefix(options))
+        mds: MetadataStore = SqliteMetadataStore(
+            _cache_dir_prefix(options), wal=options.sqlite_cache_wal
+        )
     else:
         mds = FilesystemMetadataStore(_cache_dir_prefix(options))
+    if options.cache_bundle and options.cache_dir != os.devnull:
+        # Changes go to the regular cache, which shadows the bundle.
+        mds = LayeredMetadataStore(BundleMetadataStore(options.cache_bundle), mds)
     return mds
 
 
@@ -1227,7 +1440,8 @@ def get_cache_names(id: str, path: str, options: Options) -> tuple[str, str, str
 
     Returns:
       A tuple with the file names to be used for the meta JSON, the
-      data JSON, and the fine-grained deps JSON, respectively.
+      data JSON (or binary data, with --binary-cache), and the fine-grained
+      deps JSON, respectively.
     """
     if options.cache_map:
         pair = options.cache_map.get(normpath(path, options))
@@ -1249,7 +1463,8 @@ def get_cache_names(id: str, path: str, options: Options) -> tuple[str, str, str
     deps_json = None
     if options.cache_fine_grained:
         deps_json = prefix + ".deps.json"
-    return (prefix + ".meta.json", prefix + ".data.json", deps_json)
+    data_suffix = BINARY_DATA_SUFFIX if options.binary_cache else ".data.json"
+    return (prefix + ".meta.json", prefix + data_suffix, deps_json)
 
 
 def find_cache_meta(id: str, path: str, manager: BuildManager) -> CacheMeta | None:
@@ -1419,6 +1634,10 @@ def validate_meta(
         manager.log(f"Metadata abandoned for {id}: file {path} has different size")
         return None
 
+    if hash_algorithm(meta.hash) != manager.options.hash_algorithm and not fine_grained_cache:
+        manager.log(f"Metadata abandoned for {id}: hash algorithm differs")
+        return None
+
     # Bazel ensures the cache is valid.
     mtime = 0 if bazel else int(st.st_mtime)
     if not bazel and (mtime != meta.mtime or path != meta.path):
@@ -1492,13 +1711,13 @@ def validate_meta(
     return meta
 
 
-def compute_hash(text: str) -> str:
+def compute_hash(text: str, algorithm: str = DEFAULT_HASH_ALGORITHM) -> str:
     # We use a crypto hash instead of the builtin hash(...) function
     # because the output of hash(...)  can differ between runs due to
     # hash randomization (enabled by default in Python 3.3).  See the
     # note in
     # https://docs.python.org/3/reference/datamodel.html#object.__hash__.
-    return hash_digest(text.encode("utf-8"))
+    return hash_digest(text.encode("utf-8"), algorithm)
 
 
 def json_dumps(obj: Any, debug_cache: bool) -> str:
@@ -1560,10 +1779,13 @@ def write_cache(
 
     # Serialize data and analyze interface
     data = tree.serialize()
-    data_str = json_dumps(data, manager.options.debug_cache)
-    interface_hash = compute_hash(data_str)
-
-    plugin_data = manager.plugin.report_config_data(ReportConfigContext(id, path, is_check=False))
+    data_str: str | bytes
+    if manager.options.binary_cache:
+        data_str = encode_cache_data(data)
+        interface_hash = hash_digest(data_str, manager.options.hash_algorithm)
+    else:
+        data_str = json_dumps(data, manager.options.debug_cache)
+        interface_hash = compute_hash(data_str, manager.options.hash_algorithm)
 
     # Obtain and set up metadata
     try:
@@ -1586,7 +1808,11 @@ def write_cache(
         manager.trace(f"Interface for {id} is unchanged")
     else:
         manager.trace(f"Interface for {id} has changed")
-        if not metastore.write(data_json, data_str):
+        if isinstance(data_str, bytes):
+            written = metastore.write_bytes(data_json, data_str)
+        else:
+            written = metastore.write(data_json, data_str)
+        if not written:
             # Most likely the error is the replace() call
             # (see https://github.com/python/mypy/issues/3215).
             manager.log(f"Error writing data JSON file {data_json}")
@@ -1607,15 +1833,58 @@ def write_cache(
         return interface_hash, None
 
     mtime = 0 if bazel else int(st.st_mtime)
-    size = st.st_size
+    assert source_hash is not None
+    meta = make_cache_meta(
+        id,
+        path,
+        mtime,
+        st.st_size,
+        source_hash,
+        data_mtime,
+        dependencies,
+        suppressed,
+        dep_prios,
+        dep_lines,
+        interface_hash,
+        ignore_all,
+        manager,
+    )
+
+    # Write meta cache file
+    meta_str = json_dumps(meta, manager.options.debug_cache)
+    if not metastore.write(meta_json, meta_str):
+        # Most likely the error is the replace() call
+        # (see https://github.com/python/mypy/issues/3215).
+        # The next run will simply find the cache entry out of date.
+        manager.log(f"Error writing meta JSON file {meta_json}")
+
+    return interface_hash, cache_meta_from_dict(meta, data_json)
+
+
+def make_cache_meta(
+    id: str,
+    path: str,
+    mtime: int,
+    size: int,
+    source_hash: str,
+    data_mtime: int,
+    dependencies: list[str],
+    suppressed: list[str],
+    dep_prios: list[int],
+    dep_lines: list[int],
+    interface_hash: str,
+    ignore_all: bool,
+    manager: BuildManager,
+) -> dict[str, Any]:
+    """Return the contents of the meta cache file of a module (see write_cache())."""
+    plugin_data = manager.plugin.report_config_data(ReportConfigContext(id, path, is_check=False))
     # Note that the options we store in the cache are the options as
     # specified by the command line/config file and *don't* reflect
     # updates made by inline config directives in the file. This is
     # important, or otherwise the options would never match when
     # verifying the cache.
     options = manager.options.clone_for_module(id)
-    assert source_hash is not None
-    meta = {
+    return {
         "id": id,
         "path": path,
         "mtime": mtime,
@@ -1633,16 +1902,6 @@ def write_cache(
         "plugin_data": plugin_data,
     }
 
-    # Write meta cache file
-    meta_str = json_dumps(meta, manager.options.debug_cache)
-    if not metastore.write(meta_json, meta_str):
-        # Most likely the error is the replace() call
-        # (see https://github.com/python/mypy/issues/3215).
-        # The next run will simply find the cache entry out of date.
-        manager.log(f"Error writing meta JSON file {meta_json}")
-
-    return interface_hash, cache_meta_from_dict(meta, data_json)
-
 
 def delete_cache(id: str, path: str, manager: BuildManager) -> None:
     """Delete cache files for a module.
@@ -1877,6 +2136,13 @@ class State:
 
     fine_grained_deps_loaded = False
 
+    # Has the tree been changed by the daemon since it was loaded from the cache?
+    tree_modified = False
+
+    # Encoded tree of a module evicted by the daemon whose tree doesn't match the
+    # cache (see mypy.server.update.evict_module)
+    evicted_tree: bytes | None = None
+
     # Cumulative time spent on this file, in microseconds (for profiling stats)
     time_spent_us: int = 0
 
@@ -1942,7 +2208,10 @@ class State:
             self.abspath = os.path.abspath(path)
         self.xpath = path or "<string>"
         if path and source is None and self.manager.cache_enabled:
-            self.meta = find_cache_meta(self.id, path, manager)
+            if (self.id, path) in manager.prefetched_metas:
+                self.meta = manager.prefetched_metas.pop((self.id, path))
+            else:
+                self.meta = find_cache_meta(self.id, path, manager)
             # TODO: Get mtime if not cached.
             if self.meta is not None:
                 self.interface_hash = self.meta.interface_hash
@@ -1956,17 +2225,7 @@ class State:
         self.meta = validate_meta(self.meta, self.id, self.path, self.ignore_all, manager)
         self.manager.add_stats(validate_meta_time=time.time() - t0)
         if self.meta:
-            # Make copies, since we may modify these and want to
-            # compare them to the originals later.
-            self.dependencies = list(self.meta.dependencies)
-            self.dependencies_set = set(self.dependencies)
-            self.suppressed = list(self.meta.suppressed)
-            self.suppressed_set = set(self.suppressed)
-            all_deps = self.dependencies + self.suppressed
-            assert len(all_deps) == len(self.meta.dep_prios)
-            self.priorities = {id: pri for id, pri in zip(all_deps, self.meta.dep_prios)}
-            assert len(all_deps) == len(self.meta.dep_lines)
-            self.dep_line_map = {id: line for id, line in zip(all_deps, self.meta.dep_lines)}
+            self.load_dependencies_from_meta(self.meta)
             if temporary:
                 self.load_tree(temporary=True)
             if not manager.use_fine_grained_cache():
@@ -1994,6 +2253,48 @@ class State:
             self.parse_file()
             self.compute_dependencies()
 
+    def load_dependencies_from_meta(self, meta: CacheMeta) -> None:
+        # Make copies, since we may modify these and want to
+        # compare them to the originals later.
+        self.dependencies = list(meta.dependencies)
+        self.dependencies_set = set(self.dependencies)
+        self.suppressed = list(meta.suppressed)
+        self.suppressed_set = set(self.suppressed)
+        all_deps = self.dependencies + self.suppressed
+        assert len(all_deps) == len(meta.dep_prios)
+        self.priorities = {id: pri for id, pri in zip(all_deps, meta.dep_prios)}
+        assert len(all_deps) == len(meta.dep_lines)
+        self.dep_line_map = {id: line for id, line in zip(all_deps, meta.dep_lines)}
+
+    def reload_meta(self) -> bool:
+        """Pick up cache files written for this module by another process.
+
+        This is used after a worker process has type checked the module
+        (see warm_cache_in_parallel()). Return True if the new cache
+        metadata is valid, so that the module can be loaded as fresh;
+        otherwise the module is marked as needing to be processed again.
+        """
+        assert self.path is not None
+        meta = validate_meta(
+            find_cache_meta(self.id, self.path, self.manager),
+            self.id,
+            self.path,
+            self.ignore_all,
+            self.manager,
+        )
+        if meta is None:
+            self.meta = None
+            return False
+        self.meta = meta
+        self.interface_hash = meta.interface_hash
+        self.meta_source_hash = meta.hash
+        self.load_dependencies_from_meta(meta)
+        # Forget the AST parsed during graph loading. If it is needed, the
+        # module will be loaded from the cache like any other fresh module.
+        self.tree = None
+        self.manager.modules.pop(self.id, None)
+        return True
+
     @property
     def xmeta(self) -> CacheMeta:
         assert self.meta, "missing meta on allegedly fresh module"
@@ -2082,30 +2383,49 @@ class State:
         return self.manager.load_fine_grained_deps(self.id)
 
     def load_tree(self, temporary: bool = False) -> None:
-        assert (
-            self.meta is not None
-        ), "Internal error: this method must be called only for cached modules"
+        if self.evicted_tree is not None:
+            data: dict[str, Any] | None = decode_cache_data(self.evicted_tree)
+            if not temporary:
+                self.manager.evicted_tree_bytes -= len(self.evicted_tree)
+                self.evicted_tree = None
+        else:
+            assert (
+                self.meta is not None
+            ), "Internal error: this method must be called only for cached modules"
 
-        data = _load_json_file(
-            self.meta.data_json, self.manager, "Load tree ", "Could not load tree: "
-        )
+            data = _load_data_file(
+                self.meta.data_json, self.manager, "Load tree ", "Could not load tree: "
+            )
         if data is None:
             return None
 
         t0 = time.time()
         # TODO: Assert data file wasn't changed.
-        self.tree = MypyFile.deserialize(data)
+        self.tree = MypyFile.deserialize(data, lazy=self.lazy_fixup() and not temporary)
         t1 = time.time()
         self.manager.add_stats(deserialize_time=t1 - t0)
         if not temporary:
             self.manager.modules[self.id] = self.tree
             self.manager.add_stats(fresh_trees=1)
 
+    def lazy_fixup(self) -> bool:
+        """Should module-level symbols be deserialized only when first used?
+
+        The daemon needs complete trees for AST diffing and merging, so
+        laziness wouldn't buy anything there.
+        """
+        return not self.options.fine_grained_incremental
+
     def fix_cross_refs(self) -> None:
         assert self.tree is not None, "Internal error: method must be called on parsed file only"
         # We need to set allow_missing when doing a fine grained cache
         # load because we need to gracefully handle missing modules.
-        fixup_module(self.tree, self.manager.modules, self.options.use_fine_grained_cache)
+        fixup_module(
+            self.tree,
+            self.manager.modules,
+            self.options.use_fine_grained_cache,
+            lazy=self.lazy_fixup(),
+        )
 
     # Methods for processing modules from source code.
 
@@ -2163,7 +2483,7 @@ class State:
                 self.source_hash = ""
             else:
                 assert source is not None
-                self.source_hash = compute_hash(source)
+                self.source_hash = compute_hash(source, manager.options.hash_algorithm)
 
             self.parse_inline_configuration(source)
             if not cached:
@@ -2185,6 +2505,7 @@ class State:
                 )
 
         self.time_spent_us += time_spent_us(t0)
+        manager.profile("parse", t0, self.id)
 
         if not cached:
             # Make a copy of any errors produced during parse time so that
@@ -2243,6 +2564,7 @@ class State:
                 # Perform more renaming across the AST to allow variable redefinitions
                 self.tree.accept(VariableRenameVisitor())
         self.time_spent_us += time_spent_us(t0)
+        self.manager.profile("semanal pass1", t0, self.id)
 
     def add_dependency(self, dep: str) -> None:
         if dep not in self.dependencies_set:
@@ -2305,6 +2627,7 @@ class State:
         with self.wrap_context():
             self.type_checker().check_first_pass()
         self.time_spent_us += time_spent_us(t0)
+        self.manager.profile("check first pass", t0, self.id)
 
     def type_checker(self) -> TypeChecker:
         if not self._type_checker:
@@ -2330,10 +2653,14 @@ class State:
     def type_check_second_pass(self) -> bool:
         if self.options.semantic_analysis_only:
             return False
+        profiler = self.manager.profiler
+        if profiler is not None:
+            profiler.count("deferred nodes", len(self.type_checker().deferred_nodes))
         t0 = time_ref()
         with self.wrap_context():
             result = self.type_checker().check_second_pass()
         self.time_spent_us += time_spent_us(t0)
+        self.manager.profile("check second pass", t0, self.id)
         return result
 
     def detect_possibly_undefined_vars(self) -> None:
@@ -2409,6 +2736,7 @@ class State:
             if not manager.options.fine_grained_incremental and not manager.options.preserve_asts:
                 free_tree(self.tree)
         self.time_spent_us += time_spent_us(t0)
+        manager.profile("finish passes", t0, self.id)
 
     def free_state(self) -> None:
         if self._type_checker:
@@ -2882,7 +3210,22 @@ def dispatch(sources: list[BuildSource], manager: BuildManager, stdout: TextIO)
     log_configuration(manager, sources)
 
     t0 = time.time()
-    graph = load_graph(sources, manager)
+    deps_cache_files = None
+    if (
+        (manager.options.cache_fine_grained or manager.use_fine_grained_cache())
+        and manager.cache_enabled
+        and not manager.options.bazel
+        and manager.metastore.thread_safe()
+    ):
+        # Read the fine-grained deps cache metadata while the graph is loaded.
+        # Lazy import to speed up startup
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            deps_cache_files = executor.submit(read_deps_cache_files, manager.metastore)
+            graph = load_graph(sources, manager)
+    else:
+        graph = load_graph(sources, manager)
 
     # This is a kind of unfortunate hack to work around some of fine-grained's
     # fragility: if we have loaded less than 50% of the specified files from
@@ -2918,7 +3261,9 @@ def dispatch(sources: list[BuildSource], manager: BuildManager, stdout: TextIO)
     # the deps cache against the loaded individual cache files.
     if manager.options.cache_fine_grained or manager.use_fine_grained_cache():
         t2 = time.time()
-        fg_deps_meta = read_deps_cache(manager, graph)
+        fg_deps_meta = read_deps_cache(
+            manager, graph, deps_cache_files.result() if deps_cache_files else None
+        )
         manager.add_stats(load_fg_deps_time=time.time() - t2)
         if fg_deps_meta is not None:
             manager.fg_deps_meta = fg_deps_meta
@@ -2935,6 +3280,8 @@ def dispatch(sources: list[BuildSource], manager: BuildManager, stdout: TextIO)
     # don't want to do a real incremental reprocess of the
     # graph---we'll handle it all later.
     if not manager.use_fine_grained_cache():
+        if can_warm_cache_in_parallel(manager):
+            warm_cache_in_parallel(graph, sources, manager)
         process_graph(graph, manager)
         # Update plugins snapshot.
         write_plugins_snapshot(manager)
@@ -3060,6 +3407,8 @@ def load_graph(
 
     graph: Graph = old_graph if old_graph is not None else {}
 
+    hash_sources_in_parallel(sources, manager)
+
     # The deque is used to implement breadth-first traversal.
     # TODO: Consider whether to go depth-first instead.  This may
     # affect the order in which we process files within import cycles.
@@ -3105,6 +3454,7 @@ def load_graph(
         graph[st.id] = st
         new.append(st)
         entry_points.add(bs.module)
+    manager.prefetched_metas.clear()
 
     # Note: Running this each time could be slow in the daemon. If it's a problem, we
     # can do more work to maintain this incrementally.
@@ -3349,6 +3699,255 @@ def process_graph(graph: Graph, manager: BuildManager) -> None:
         manager.log("No fresh SCCs left in queue")
 
 
+def hash_sources_in_parallel(sources: list[BuildSource], manager: BuildManager) -> None:
+    """Hash the source files that validate_meta() will need to hash, using threads.
+
+    Files need to be hashed when their mtime differs from the one in the
+    cache meta, which after a VCS checkout is often true for all of them.
+    Hashing (and reading) releases the GIL, so this scales with the number
+    of cores. The meta files are also read in parallel (if the metastore
+    supports it), and the loaded metas are kept so that they aren't read again.
+    """
+    if not manager.cache_enabled or manager.options.bazel or len(sources) < 2:
+        return
+    sources = [
+        bs
+        for bs in sources
+        if bs.path is not None and bs.text is None and bs.module not in manager.modules
+    ]
+    manager.metastore.prefetch(
+        get_cache_names(bs.module, bs.path, manager.options)[0]
+        for bs in sources
+        if bs.path is not None
+    )
+    paths = []
+    for bs in sources:
+        assert bs.path is not None
+        meta = find_cache_meta(bs.module, bs.path, manager)
+        manager.prefetched_metas[(bs.module, bs.path)] = meta
+        if meta is None or hash_algorithm(meta.hash) != manager.options.hash_algorithm:
+            continue
+        try:
+            st = manager.get_stat(bs.path)
+        except OSError:
+            continue
+        if (
+            stat.S_ISREG(st.st_mode)
+            and st.st_size == meta.size
+            and (int(st.st_mtime) != meta.mtime or bs.path != meta.path)
+        ):
+            paths.append(bs.path)
+    if len(paths) < 2:
+        return
+
+    # Lazy import to speed up startup
+    from concurrent.futures import ThreadPoolExecutor
+
+    t0 = time.time()
+    with ThreadPoolExecutor() as executor:
+        for _ in executor.map(_hash_source_file, [manager.fscache] * len(paths), paths):
+            pass
+    manager.add_stats(parallel_hashed_files=len(paths), parallel_hash_time=time.time() - t0)
+
+
+def _hash_source_file(fscache: FileSystemCache, path: str) -> None:
+    try:
+        fscache.hash_digest(path)
+    except OSError:
+        # This will be reported when the file is actually needed.
+        pass
+
+
+def can_warm_cache_in_parallel(manager: BuildManager) -> bool:
+    """Can stale SCCs be type checked in worker processes (see --jobs)?
+
+    Workers exchange results only through cache files, so this requires a
+    writable per-module filesystem cache. Fine-grained dependencies are
+    global to the cache and can't be written concurrently.
+    """
+    options = manager.options
+    return (
+        options.jobs > 1
+        and manager.cache_enabled
+        and options.cache_dir != os.devnull
+        and not options.sqlite_cache
+        and not options.bazel
+        and not options.cache_map
+        and not options.cache_fine_grained
+        and not options.fine_grained_incremental
+    )
+
+
+def warm_cache_in_parallel(
+    graph: Graph, sources: list[BuildSource], manager: BuildManager
+) -> None:
+    """Type check stale SCCs in worker processes to bring the cache up to date.
+
+    An SCC is sent to a worker once all SCCs it depends on are fresh in the
+    cache. The worker runs an ordinary build for it, loading its dependencies
+    from the cache and writing cache files for the SCC itself. Independent
+    SCCs are checked concurrently, and SCCs that become ready at the same
+    time are batched together to amortize worker startup.
+
+    Nothing is reported here. Warmed modules are afterwards loaded as fresh
+    by process_graph(), which also reprocesses everything that couldn't be
+    warmed (for example, because it has errors, which are never cached).
+    This way errors are reported exactly as in a sequential build.
+    """
+    # Lazy import to speed up startup
+    from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+
+    t0 = time.time()
+    sccs: list[AbstractSet[str]] = [frozenset(scc) for scc in sorted_components(graph)]
+    edges = {id: deps_filtered(graph, graph.keys(), id, PRI_ALL) for id in graph}
+    scc_deps = prepare_sccs([set(scc) for scc in sccs], edges)
+    for scc in sccs:
+        scc_deps[scc].discard(scc)
+    dependents: dict[AbstractSet[str], list[AbstractSet[str]]] = {scc: [] for scc in sccs}
+    for scc in sccs:
+        for dep in scc_deps[scc]:
+            dependents[dep].append(scc)
+    root_ids = {bs.module for bs in sources if not bs.followed}
+    options = manager.options.apply_changes({"jobs": 1})
+
+    # SCCs that are up to date in the cache, and those among them whose
+    # interface was changed by a worker.
+    done: set[AbstractSet[str]] = set()
+    changed: set[AbstractSet[str]] = set()
+    # SCCs that depend on something that couldn't be warmed.
+    blocked: set[AbstractSet[str]] = set()
+    waiting = {scc: len(scc_deps[scc]) for scc in sccs}
+    ready: list[AbstractSet[str]] = [scc for scc in sccs if not waiting[scc]]
+    running: dict[Future[dict[str, str]], list[AbstractSet[str]]] = {}
+    num_batches = 0
+    num_warmed = 0
+
+    def finish(scc: AbstractSet[str], ok: bool) -> None:
+        if ok:
+            done.add(scc)
+        else:
+            blocked.add(scc)
+        for dependent in dependents[scc]:
+            if not ok:
+                blocked.add(dependent)
+            waiting[dependent] -= 1
+            if not waiting[dependent]:
+                ready.append(dependent)
+
+    def is_fresh(scc: AbstractSet[str]) -> bool:
+        # This mirrors the logic in process_graph().
+        if any(dep in changed for dep in scc_deps[scc]):
+            return False
+        return all(
+            graph[id].is_fresh() and not set(graph[id].suppressed) & graph.keys() for id in scc
+        )
+
+    def closure(batch: Sequence[AbstractSet[str]]) -> set[str]:
+        result: set[str] = set()
+        pending = list(batch)
+        seen = set(batch)
+        while pending:
+            scc = pending.pop()
+            result.update(scc)
+            for dep in scc_deps[scc]:
+                if dep not in seen:
+                    seen.add(dep)
+                    pending.append(dep)
+        return result
+
+    with ProcessPoolExecutor(max_workers=manager.options.jobs) as executor:
+        while ready or running:
+            to_check: list[AbstractSet[str]] = []
+            for scc in ready:
+                if scc in blocked or any(graph[id].path is None for id in scc):
+                    finish(scc, False)
+                elif is_fresh(scc):
+                    finish(scc, True)
+                else:
+                    to_check.append(scc)
+            ready = []
+            if to_check:
+                idle = manager.options.jobs - len(running)
+                batch_size = max(1, -(-len(to_check) // manager.options.jobs))
+                while to_check and idle > 0:
+                    batch, to_check = to_check[:batch_size], to_check[batch_size:]
+                    ids = sorted(id for scc in batch for id in scc)
+                    for id in ids:
+                        # Make sure the worker doesn't mistake the old cache
+                        # files as fresh, since it doesn't know what changed.
+                        delete_cache(id, graph[id].xpath, manager)
+                    batch_sources = [
+                        BuildSource(graph[id].path, id)
+                        if id in root_ids
+                        else BuildSource(None, id, followed=True)
+                        for id in sorted(closure(batch))
+                    ]
+                    manager.log(f"Sending {len(ids)} modules to a worker process")
+                    future = executor.submit(_warm_cache_worker, batch_sources, options, ids)
+                    running[future] = batch
+                    num_batches += 1
+                    idle -= 1
+                # The rest has to wait for an idle worker.
+                ready = to_check
+            if not running:
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                batch = running.pop(future)
+                try:
+                    new_hashes = future.result()
+                except Exception as err:
+                    manager.log(f"Worker process failed: {err!r}")
+                    new_hashes = {}
+                for scc in batch:
+                    ok = all(id in new_hashes for id in scc)
+                    old_hashes = {id: graph[id].interface_hash for id in scc}
+                    for id in scc:
+                        # Even when some SCC members failed, the others
+                        # can't keep their (deleted) cache files.
+                        ok = graph[id].reload_meta() and ok
+                    if ok:
+                        num_warmed += len(scc)
+                        if any(graph[id].interface_hash != old_hashes[id] for id in scc):
+                            changed.add(scc)
+                    finish(scc, ok)
+
+    # Anything that couldn't be warmed is processed from source by process_graph().
+    for scc in blocked:
+        for id in scc:
+            graph[id].meta = None
+    manager.add_stats(
+        parallel_batches=num_batches,
+        parallel_warmed_modules=num_warmed,
+        parallel_time=time.time() - t0,
+    )
+
+
+def _warm_cache_worker(
+    sources: list[BuildSource], options: Options, ids: list[str]
+) -> dict[str, str]:
+    """Build the given sources in a worker process (see warm_cache_in_parallel()).
+
+    Return interface hashes of modules among ids for which cache was written.
+    """
+    try:
+        result = build(
+            sources,
+            options,
+            flush_errors=lambda messages, serious: None,
+            stdout=io.StringIO(),
+            stderr=io.StringIO(),
+        )
+    except CompileError:
+        return {}
+    hashes = {}
+    for id in ids:
+        state = result.graph.get(id)
+        if state is not None and state.meta is not None and not state.transitive_error:
+            hashes[id] = state.interface_hash
+    return hashes
+
+
 def order_ascc(graph: Graph, ascc: AbstractSet[str], pri_max: int = PRI_ALL) -> list[str]:
     """Come up with the ideal processing order within an SCC.
 
@@ -3404,10 +4003,14 @@ def process_fresh_modules(graph: Graph, modules: list[str], manager: BuildManage
     """
     t0 = time.time()
     for id in modules:
+        t = time_ref()
         graph[id].load_tree()
+        manager.profile("load cache", t, id)
     t1 = time.time()
     for id in modules:
+        t = time_ref()
         graph[id].fix_cross_refs()
+        manager.profile("fixup", t, id)
     t2 = time.time()
     manager.add_stats(process_fresh_time=t2 - t0, load_tree_time=t1 - t0)
 
@@ -3417,6 +4020,7 @@ def process_stale_scc(graph: Graph, scc: list[str], manager: BuildManager) -> No
 
     Exception: If quick_and_dirty is set, use the cache for fresh modules.
     """
+    t_scc = time_ref()
     stale = scc
     for id in stale:
         # We may already have parsed the module, or not.
@@ -3428,7 +4032,9 @@ def process_stale_scc(graph: Graph, scc: list[str], manager: BuildManager) -> No
         # SemanticAnalyzerPass2.add_builtin_aliases for details.
         typing_mod = graph["typing"].tree
         assert typing_mod, "The typing module was not parsed"
+    t0 = time_ref()
     mypy.semanal_main.semantic_analysis_for_scc(graph, scc, manager.errors)
+    manager.profile("semanal", t0, scc=scc)
 
     # Track what modules aren't yet done so we can finish them as soon
     # as possible, saving memory.
@@ -3441,6 +4047,8 @@ def process_stale_scc(graph: Graph, scc: list[str], manager: BuildManager) -> No
             graph[id].finish_passes()
 
     while unfinished_modules:
+        if manager.profiler is not None:
+            manager.profiler.count("second pass iterations")
         for id in stale:
             if id not in unfinished_modules:
                 continue
@@ -3456,8 +4064,13 @@ def process_stale_scc(graph: Graph, scc: list[str], manager: BuildManager) -> No
             graph[id].transitive_error = True
     for id in stale:
         manager.flush_errors(manager.errors.file_messages(graph[id].xpath), False)
+        t0 = time_ref()
         graph[id].write_cache()
+        manager.profile("write cache", t0, id)
         graph[id].mark_as_rechecked()
+    if manager.profiler is not None:
+        manager.profiler.count("stale sccs")
+    manager.profile("process stale scc", t_scc, scc=scc)
 
 
 def sorted_components(
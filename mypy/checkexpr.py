@@ -6,7 +6,18 @@ import itertools
 import time
 from collections import defaultdict
 from contextlib import contextmanager
-from typing import Callable, ClassVar, Final, Iterable, Iterator, List, Optional, Sequence, cast
+from typing import (
+    Callable,
+    ClassVar,
+    Final,
+    Hashable,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    cast,
+)
 from typing_extensions import TypeAlias as _TypeAlias, overload
 
 import mypy.checker
@@ -17,7 +28,12 @@ from mypy.checkmember import analyze_member_access, freeze_all_type_vars, type_o
 from mypy.checkstrformat import StringFormatterChecker
 from mypy.erasetype import erase_type, remove_instance_last_known_values, replace_meta_vars
 from mypy.errors import ErrorWatcher, report_internal_error
-from mypy.expandtype import expand_type, expand_type_by_instance, freshen_function_type_vars
+from mypy.expandtype import (
+    expand_type,
+    expand_type_by_instance,
+    freshen_function_type_vars,
+    has_generic_callable,
+)
 from mypy.infer import ArgumentInferContext, infer_function_type_arguments, infer_type_arguments
 from mypy.literals import literal
 from mypy.maptype import map_instance_to_supertype
@@ -100,6 +116,7 @@ from mypy.plugin import (
 from mypy.semanal_enum import ENUM_BASES
 from mypy.state import state
 from mypy.subtypes import (
+    StructuralCacheInfoCollector,
     find_member,
     is_equivalent,
     is_same_type,
@@ -175,7 +192,8 @@ from mypy.types_utils import (
     is_self_type_like,
     remove_optional,
 )
-from mypy.typestate import type_state
+from mypy.typestate import OverloadCallKey, type_state
+from mypy.typetraverser import TypeTraverserVisitor
 from mypy.typevars import fill_typevars
 from mypy.typevartuples import find_unpack_in_list
 from mypy.util import split_module_names
@@ -562,9 +580,15 @@ class ExpressionChecker(ExpressionVisitor[Type]):
             ):
                 member = e.callee.name
                 object_type = self.chk.lookup_type(e.callee.expr)
-        rendered_fullname = call_expr_add_on.render_fullname(fullname, member, object_type, self.chk.tscope.function)
+        rendered_fullname = call_expr_add_on.render_fullname(
+            fullname, member, object_type, self.chk.tscope.function
+        )
         if rendered_fullname:
-            call_expr_add_on.add_if_found(target=rendered_fullname, from_=self.chk.tscope.function.fullname)
+            call_expr_add_on.add_if_found(
+                target=rendered_fullname,
+                from_=self.chk.tscope.function.fullname,
+                module=self.chk.tree.fullname,
+            )
         ret_type = self.check_call_expr_with_callee_type(
             callee_type, e, fullname, object_type, member
         )
@@ -2583,6 +2607,24 @@ class ExpressionChecker(ExpressionVisitor[Type]):
         args_contain_any = any(map(has_any_type, arg_types))
         type_maps: list[dict[Expression, Type]] = []
 
+        cache_key = None
+        if not args_contain_any:
+            # Calls with 'Any' arguments store the types of arguments inferred in the
+            # context of the matching item, so their results aren't cached.
+            cache_key = self.overload_cache_key(
+                plausible_targets,
+                args,
+                arg_types,
+                arg_kinds,
+                arg_names,
+                callable_name,
+                object_type,
+            )
+            if cache_key is not None:
+                cached = type_state.lookup_overload_call(cache_key[0])
+                if cached is not None:
+                    return cached[1]
+
         for typ in plausible_targets:
             assert self.msg is self.chk.msg
             with self.msg.filter_errors() as w:
@@ -2601,6 +2643,10 @@ class ExpressionChecker(ExpressionVisitor[Type]):
                 # Return early if possible; otherwise record info so we can
                 # check for ambiguity due to 'Any' below.
                 if not args_contain_any:
+                    if cache_key is not None:
+                        self.record_overload_call(
+                            cache_key, plausible_targets, (ret_type, infer_type)
+                        )
                     return ret_type, infer_type
                 matches.append(typ)
                 return_types.append(ret_type)
@@ -2608,6 +2654,8 @@ class ExpressionChecker(ExpressionVisitor[Type]):
                 type_maps.append(m)
 
         if not matches:
+            if cache_key is not None:
+                self.record_overload_call(cache_key, plausible_targets, None)
             return None
         elif any_causes_overload_ambiguity(matches, return_types, arg_types, arg_kinds, arg_names):
             # An argument of type or containing the type 'Any' caused ambiguity.
@@ -2633,6 +2681,108 @@ class ExpressionChecker(ExpressionVisitor[Type]):
             self.chk.store_types(type_maps[0])
             return return_types[0], inferred_types[0]
 
+    def overload_cache_key(
+        self,
+        plausible_targets: list[CallableType],
+        args: list[Expression],
+        arg_types: list[Type],
+        arg_kinds: list[ArgKind],
+        arg_names: Sequence[str | None] | None,
+        callable_name: str | None,
+        object_type: Type | None,
+    ) -> tuple[OverloadCallKey, set[TypeInfo], list[Type]] | None:
+        """Return the key of an overloaded call in the overload cache, and its TypeInfos.
+
+        Also return the types that the key refers to by identity.
+
+        Return None if the call can't be cached, since the result may depend on more
+        than the overload items and the argument types.
+        """
+        for arg in args:
+            # These have the same type in any context, apart from literal types of
+            # literal expressions, which are kept as last known values of argument types.
+            if arg not in self.type_overrides and not isinstance(
+                arg, (NameExpr, MemberExpr, IntExpr, StrExpr, BytesExpr, FloatExpr, ComplexExpr)
+            ):
+                return None
+        if self.overload_call_has_plugin_hook(plausible_targets, callable_name, object_type):
+            return None
+        type_context = self.type_context[-1]
+        collector = StructuralCacheInfoCollector(last_known_values=True)
+        collector.traverse_types(arg_types)
+        if object_type is not None:
+            object_type.accept(collector)
+        if type_context is not None:
+            type_context.accept(collector)
+        items: list[Hashable] = []
+        referenced: list[Type] = []
+        for typ in plausible_targets:
+            defn = typ.definition
+            if object_type is not None and isinstance(defn, FuncDef) and defn.type is not None:
+                # Methods are bound to the object type again for each call, so their
+                # items are new objects every time. Instead, they are identified by their
+                # definition and its type (which is replaced when the definition is
+                # processed again), and the type that they were bound to.
+                collector.traverse_types([t for t in typ.bound_args if t is not None])
+                items.append((defn, id(defn.type), tuple(typ.bound_args)))
+                referenced.append(defn.type)
+            else:
+                # Other items are compared by identity, since equal callable types may
+                # still differ in ways that affect the call (see StructuralCacheInfoCollector).
+                items.append(id(typ))
+                referenced.append(typ)
+        if not collector.cacheable:
+            return None
+        key = (
+            tuple(items),
+            tuple(arg_kinds),
+            tuple(arg_names) if arg_names is not None else None,
+            tuple(arg_types),
+            callable_name,
+            object_type,
+            type_context,
+            self.chk.options,
+        )
+        return key, collector.infos, referenced
+
+    def record_overload_call(
+        self,
+        cache_key: tuple[OverloadCallKey, set[TypeInfo], list[Type]],
+        plausible_targets: list[CallableType],
+        result: tuple[Type, Type] | None,
+    ) -> None:
+        if result is not None and any(t.accept(has_generic_callable) for t in result):
+            # Type variables of generic callables must be fresh for each call.
+            return
+        key, infos, referenced = cache_key
+        collector = TypeInfoCollector()
+        collector.traverse_types(plausible_targets)
+        type_state.record_overload_call(key, referenced, result, infos | collector.infos)
+
+    def overload_call_has_plugin_hook(
+        self,
+        plausible_targets: list[CallableType],
+        callable_name: str | None,
+        object_type: Type | None,
+    ) -> bool:
+        """Is there a plugin hook for a call to any of the overload items?
+
+        This follows how the name of the hook is chosen in check_callable_call().
+        """
+        for typ in plausible_targets:
+            name = callable_name
+            if name is None and typ.name:
+                name = typ.name
+            ret_type = get_proper_type(typ.ret_type)
+            if typ.is_type_obj() and isinstance(ret_type, Instance):
+                name = ret_type.type.fullname
+            if name and (
+                (object_type is None and self.plugin.get_function_hook(name))
+                or (object_type is not None and self.plugin.get_method_hook(name))
+            ):
+                return True
+        return False
+
     def overload_erased_call_targets(
         self,
         plausible_targets: list[CallableType],
@@ -5739,6 +5889,28 @@ class HasUninhabitedComponentsQuery(types.BoolTypeQuery):
         return True
 
 
+class TypeInfoCollector(TypeTraverserVisitor):
+    """Find the TypeInfos that a type refers to, including through type aliases."""
+
+    def __init__(self) -> None:
+        self.infos: set[TypeInfo] = set()
+        self.seen_aliases: set[TypeAlias] = set()
+
+    def visit_instance(self, t: Instance) -> None:
+        self.infos.add(t.type)
+        super().visit_instance(t)
+
+    def visit_type_var(self, t: TypeVarType) -> None:
+        t.upper_bound.accept(self)
+        self.traverse_types(t.values)
+
+    def visit_type_alias_type(self, t: TypeAliasType) -> None:
+        if t.alias is not None and t.alias not in self.seen_aliases:
+            self.seen_aliases.add(t.alias)
+            t.alias.target.accept(self)
+        super().visit_type_alias_type(t)
+
+
 def arg_approximate_similarity(actual: Type, formal: Type) -> bool:
     """Return if caller argument (actual) is roughly compatible with signature arg (formal).
 
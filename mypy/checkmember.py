@@ -10,6 +10,7 @@ from mypy.expandtype import (
     expand_self_type,
     expand_type_by_instance,
     freshen_all_functions_type_vars,
+    has_generic_callable,
 )
 from mypy.maptype import map_instance_to_supertype
 from mypy.messages import MessageBuilder
@@ -70,6 +71,7 @@ from mypy.types import (
     UnionType,
     get_proper_type,
 )
+from mypy.typestate import type_state
 from mypy.typetraverser import TypeTraverserVisitor
 
 if TYPE_CHECKING:  # import for forward declaration only
@@ -109,6 +111,10 @@ class MemberContext:
         self.module_symbol_table = module_symbol_table
         self.no_deferral = no_deferral
         self.is_self = is_self
+        # Set to False if the result depends on more than the receiver type and the
+        # flags above (such as partial types or plugins), or if the analysis had other
+        # side effects, so that it can't be cached (see analyze_instance_member_access).
+        self.cacheable = True
 
     def named_type(self, name: str) -> Instance:
         return self.chk.named_type(name)
@@ -198,7 +204,11 @@ def analyze_member_access(
         no_deferral=no_deferral,
         is_self=is_self,
     )
-    result = _analyze_member_access(name, typ, mx, override_info)
+    proper_type = get_proper_type(typ)
+    if isinstance(proper_type, Instance) and module_symbol_table is None:
+        result = analyze_cached_instance_member_access(name, proper_type, mx, override_info)
+    else:
+        result = _analyze_member_access(name, typ, mx, override_info)
     possible_literal = get_proper_type(result)
     if (
         in_literal_context
@@ -210,6 +220,50 @@ def analyze_member_access(
         return result
 
 
+def analyze_cached_instance_member_access(
+    name: str, typ: Instance, mx: MemberContext, override_info: TypeInfo | None
+) -> Type:
+    """Analyze an attribute access on an instance, using the member access cache.
+
+    A result is only cached if the analysis reported no errors and the result only
+    depends on the key (see MemberContext.cacheable). Generic function types aren't
+    cached, since their type variables must be fresh for each access.
+    """
+    active_self_type = mx.chk.scope.active_self_type() if mx.is_self else None
+    key = (
+        name,
+        typ,
+        mx.original_type,
+        mx.self_type,
+        override_info,
+        mx.is_lvalue,
+        # Assignments to final attributes are only allowed in final definitions.
+        mx.is_lvalue and mx.chk.get_final_context(),
+        mx.is_super,
+        mx.is_operator,
+        mx.is_self,
+        active_self_type,
+        mx.chk.options,
+    )
+    result = type_state.lookup_member_access(key)
+    if result is not None:
+        return result
+    with mx.msg.filter_errors(filter_errors=False) as w:
+        result = analyze_instance_member_access(name, typ, mx, override_info)
+    if mx.cacheable and not w.has_new_errors() and not result.accept(has_generic_callable):
+        collector = subtypes.StructuralCacheInfoCollector(last_known_values=True)
+        collector.traverse_types([typ, mx.original_type, mx.self_type])
+        if active_self_type is not None:
+            active_self_type.accept(collector)
+        if collector.cacheable:
+            # The member may be defined in any class in the MRO.
+            infos = collector.infos.union(typ.type.mro)
+            if override_info is not None:
+                infos.update(override_info.mro)
+            type_state.record_member_access(key, result, infos)
+    return result
+
+
 def _analyze_member_access(
     name: str, typ: Type, mx: MemberContext, override_info: TypeInfo | None = None
 ) -> Type:
@@ -317,6 +371,9 @@ def analyze_instance_member_access(
             return analyze_var(name, first_item.var, typ, info, mx)
         if mx.is_lvalue:
             mx.msg.cant_assign_to_method(mx.context)
+        if isinstance(method, FuncDef) and method.is_awaitable_coroutine:
+            # The type checker updates the return types of these.
+            mx.cacheable = False
         signature = function_type(method, mx.named_type("builtins.function"))
         signature = freshen_all_functions_type_vars(signature)
         if not method.is_static:
@@ -493,6 +550,9 @@ def analyze_member_var_access(
         if mx.is_super:
             validate_super_call(vv.func, mx)
 
+    if isinstance(vv, (TypeInfo, TypeAlias, MypyFile)):
+        mx.cacheable = False
+
     if isinstance(vv, TypeInfo):
         # If the associated variable is a TypeInfo synthesize a Var node for
         # the purposes of type checking.  This enables us to type check things
@@ -536,6 +596,7 @@ def analyze_member_var_access(
         # Above we skip ModuleType.__getattr__ etc. if we have a
         # module symbol table, since the symbol table allows precise
         # checking.
+        mx.cacheable = False
         if not mx.is_lvalue:
             for method_name in ("__getattribute__", "__getattr__"):
                 method = info.get_method(method_name)
@@ -633,6 +694,8 @@ def analyze_descriptor_access(descriptor_type: Type, mx: MemberContext) -> Type:
 
     if not descriptor_type.type.has_readable_member("__get__"):
         return orig_descriptor_type
+    # Checking the call to __get__ may use plugins and defer the current node.
+    mx.cacheable = False
 
     dunder_get = descriptor_type.type.get_method("__get__")
     if dunder_get is None:
@@ -741,6 +804,7 @@ def analyze_var(
     typ = var.type
     if typ:
         if isinstance(typ, PartialType):
+            mx.cacheable = False
             return mx.chk.handle_partial_var_type(typ, mx.is_lvalue, var, mx.context)
         if mx.is_lvalue and var.is_property and not var.is_settable_property:
             # TODO allow setting attributes in subclass (although it is probably an error)
@@ -808,6 +872,7 @@ def analyze_var(
                 else:
                     result = expanded_signature
     else:
+        mx.cacheable = False
         if not var.is_ready and not mx.no_deferral:
             mx.not_ready_callback(var.name, mx.context)
         # Implicit 'Any' type.
@@ -817,6 +882,7 @@ def analyze_var(
     if result and not mx.is_lvalue and not implicit:
         result = analyze_descriptor_access(result, mx)
     if hook:
+        mx.cacheable = False
         result = hook(
             AttributeContext(get_proper_type(mx.original_type), result, mx.context, mx.chk)
         )
@@ -0,0 +1,154 @@
+"""Indexed storage for the fine-grained dependency cache.
+
+By default the fine-grained dependencies of each module are stored in a
+JSON file per module (see mypy.build.write_deps_cache), which must be
+loaded in full as soon as any trigger in the module fires. With
+--fine-grained-deps-index, they are instead stored in a single SQLite
+database, indexed by trigger. A daemon using the fine-grained cache can
+then look up only the triggers that actually fire, and writing the cache
+merges new dependencies into existing ones per trigger, instead of
+loading and rewriting all dependencies of each affected module.
+
+The index has a generation token that is changed on every write and
+recorded in the deps meta file, so that an index that doesn't match
+the rest of the cache is never used.
+"""
+
+from __future__ import annotations
+
+import binascii
+import json
+import os
+from typing import TYPE_CHECKING, Final, Iterable
+
+from mypy.metastore import MAX_QUERY_PARAMS, WAL_PRAGMAS
+
+if TYPE_CHECKING:
+    # We avoid importing sqlite3 unless we are using it (see mypy.metastore).
+    import sqlite3
+
+# Name of the index in the cache directory; also used as the path of entries
+# in the deps meta file for modules whose dependencies are in the index
+DEPS_INDEX_FILE: Final = "@deps.index.sqlite"
+
+SCHEMA: Final = """
+CREATE TABLE IF NOT EXISTS deps (
+    trigger TEXT NOT NULL,
+    module TEXT NOT NULL,
+    targets TEXT NOT NULL,
+    PRIMARY KEY (trigger, module)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS deps_module ON deps(module);
+CREATE TABLE IF NOT EXISTS info (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class FineGrainedDepsIndex:
+    """Map from fine-grained dependency triggers to targets, stored in SQLite.
+
+    Each trigger is associated with the module that stores it (the module
+    of the trigger, or its nearest parent in the build, or the fake root
+    module), like the per-module JSON files.
+    """
+
+    def __init__(self, cache_dir_prefix: str, wal: bool = False) -> None:
+        import sqlite3.dbapi2
+
+        self.path = os.path.join(cache_dir_prefix, DEPS_INDEX_FILE)
+        os.makedirs(cache_dir_prefix, exist_ok=True)
+        self.db: sqlite3.Connection = sqlite3.dbapi2.connect(self.path)
+        if wal:
+            self.db.executescript(WAL_PRAGMAS)
+        self.db.executescript(SCHEMA)
+
+    def generation(self) -> str | None:
+        """Return the token identifying the current contents of the index."""
+        row = self.db.execute("SELECT value FROM info WHERE key = 'generation'").fetchone()
+        return row[0] if row else None
+
+    def lookup(self, trigger: str) -> set[str]:
+        """Return the targets of a trigger."""
+        targets: set[str] = set()
+        for (data,) in self.db.execute("SELECT targets FROM deps WHERE trigger = ?", (trigger,)):
+            targets.update(json.loads(data))
+        return targets
+
+    def lookup_many(self, triggers: Iterable[str]) -> dict[str, set[str]]:
+        """Return the targets of several triggers (triggers without targets are omitted)."""
+        triggers = list(triggers)
+        result: dict[str, set[str]] = {}
+        for i in range(0, len(triggers), MAX_QUERY_PARAMS):
+            chunk = triggers[i : i + MAX_QUERY_PARAMS]
+            placeholders = ",".join("?" * len(chunk))
+            cur = self.db.execute(
+                f"SELECT trigger, targets FROM deps WHERE trigger IN ({placeholders})", chunk
+            )
+            for trigger, data in cur:
+                result.setdefault(trigger, set()).update(json.loads(data))
+        return result
+
+    def module_deps(self, module: str) -> dict[str, set[str]]:
+        """Return all dependencies stored with a module."""
+        cur = self.db.execute("SELECT trigger, targets FROM deps WHERE module = ?", (module,))
+        return {trigger: set(json.loads(data)) for trigger, data in cur}
+
+    def merge(self, rdeps: dict[str, dict[str, set[str]]]) -> str:
+        """Merge dependencies (module -> trigger -> targets) into the index.
+
+        Targets are added to the existing targets of each trigger, like
+        mypy.server.deps.merge_dependencies(). Return the new generation.
+        """
+        rows = []
+        for module, deps in rdeps.items():
+            old = self._targets_many(module, deps)
+            for trigger, targets in deps.items():
+                merged = old.get(trigger, set()) | targets
+                rows.append((trigger, module, json.dumps(sorted(merged), separators=(",", ":"))))
+        generation = binascii.hexlify(os.urandom(8)).decode()
+        with self.db:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO deps(trigger, module, targets) VALUES (?, ?, ?)", rows
+            )
+            self.db.execute(
+                "INSERT OR REPLACE INTO info(key, value) VALUES ('generation', ?)", (generation,)
+            )
+        return generation
+
+    def _targets_many(self, module: str, triggers: Iterable[str]) -> dict[str, set[str]]:
+        triggers = list(triggers)
+        result: dict[str, set[str]] = {}
+        for i in range(0, len(triggers), MAX_QUERY_PARAMS - 1):
+            chunk = triggers[i : i + MAX_QUERY_PARAMS - 1]
+            placeholders = ",".join("?" * len(chunk))
+            cur = self.db.execute(
+                "SELECT trigger, targets FROM deps"
+                f" WHERE module = ? AND trigger IN ({placeholders})",
+                [module] + chunk,
+            )
+            result.update((trigger, set(json.loads(data))) for trigger, data in cur)
+        return result
+
+    def remove_modules(self, modules: Iterable[str]) -> None:
+        """Remove all dependencies stored with the given modules."""
+        with self.db:
+            self.db.executemany("DELETE FROM deps WHERE module = ?", [(m,) for m in modules])
+
+    def clear(self) -> None:
+        with self.db:
+            self.db.execute("DELETE FROM deps")
+            self.db.execute("DELETE FROM info")
+
+    def close(self) -> None:
+        self.db.close()
+
+
+def open_deps_index(cache_dir_prefix: str, wal: bool = False) -> FineGrainedDepsIndex | None:
+    """Open the index in a cache directory, or return None if that fails."""
+    try:
+        return FineGrainedDepsIndex(cache_dir_prefix, wal)
+    except Exception:
+        # sqlite3 is missing or the file is broken; the caller falls back.
+        return None
@@ -17,7 +17,7 @@ import traceback
 from typing import Any, Callable, Mapping, NoReturn
 
 from mypy.dmypy_os import alive, kill
-from mypy.dmypy_util import DEFAULT_STATUS_FILE, receive
+from mypy.dmypy_util import DEFAULT_STATUS_FILE, receive, send
 from mypy.ipc import IPCClient, IPCException
 from mypy.util import check_python_version, get_terminal_width, should_force_color
 from mypy.version import __version__
@@ -52,6 +52,7 @@ p.add_argument("--log-file", metavar="FILE", type=str, help="Direct daemon stdou
 p.add_argument(
     "--timeout", metavar="TIMEOUT", type=int, help="Server shutdown timeout (in seconds)"
 )
+p.add_argument("--from-snapshot", metavar="FILE", help="Load the build state from a snapshot file")
 p.add_argument(
     "flags", metavar="FLAG", nargs="*", type=str, help="Regular mypy flags (precede with --)"
 )
@@ -63,6 +64,7 @@ p.add_argument("--log-file", metavar="FILE", type=str, help="Direct daemon stdou
 p.add_argument(
     "--timeout", metavar="TIMEOUT", type=int, help="Server shutdown timeout (in seconds)"
 )
+p.add_argument("--from-snapshot", metavar="FILE", help="Load the build state from a snapshot file")
 p.add_argument(
     "flags", metavar="FLAG", nargs="*", type=str, help="Regular mypy flags (precede with --)"
 )
@@ -73,6 +75,11 @@ p.add_argument("--fswatcher-dump-file", help="Collect information about the curr
 
 stop_parser = p = subparsers.add_parser("stop", help="Stop daemon (asks it politely to go away)")
 
+snapshot_parser = p = subparsers.add_parser(
+    "snapshot", help="Write the build state of the daemon to a file (see start --from-snapshot)"
+)
+p.add_argument("file", metavar="FILE", help="Snapshot file to write")
+
 kill_parser = p = subparsers.add_parser("kill", help="Kill daemon (kills the process)")
 
 check_parser = p = subparsers.add_parser(
@@ -82,6 +89,7 @@ p.add_argument("-v", "--verbose", action="store_true", help="Print detailed stat
 p.add_argument("-q", "--quiet", action="store_true", help=argparse.SUPPRESS)  # Deprecated
 p.add_argument("--junit-xml", help="Write junit.xml to the given file")
 p.add_argument("--perf-stats-file", help="write performance information to the given file")
+p.add_argument("--trace-file", help="write the work done by the update to the given file")
 p.add_argument("files", metavar="FILE", nargs="+", help="File (or directory) to check")
 p.add_argument(
     "--export-types",
@@ -97,6 +105,7 @@ run_parser = p = subparsers.add_parser(
 p.add_argument("-v", "--verbose", action="store_true", help="Print detailed status")
 p.add_argument("--junit-xml", help="Write junit.xml to the given file")
 p.add_argument("--perf-stats-file", help="write performance information to the given file")
+p.add_argument("--trace-file", help="write the work done by the update to the given file")
 p.add_argument(
     "--timeout", metavar="TIMEOUT", type=int, help="Server shutdown timeout (in seconds)"
 )
@@ -123,6 +132,7 @@ p.add_argument("-v", "--verbose", action="store_true", help="Print detailed stat
 p.add_argument("-q", "--quiet", action="store_true", help=argparse.SUPPRESS)  # Deprecated
 p.add_argument("--junit-xml", help="Write junit.xml to the given file")
 p.add_argument("--perf-stats-file", help="write performance information to the given file")
+p.add_argument("--trace-file", help="write the work done by the update to the given file")
 p.add_argument(
     "--export-types",
     action="store_true",
@@ -245,6 +255,7 @@ p.add_argument(
     "--timeout", metavar="TIMEOUT", type=int, help="Server shutdown timeout (in seconds)"
 )
 p.add_argument("--log-file", metavar="FILE", type=str, help="Direct daemon stdout/stderr to FILE")
+p.add_argument("--from-snapshot", metavar="FILE", help=argparse.SUPPRESS)
 p.add_argument(
     "flags", metavar="FLAG", nargs="*", type=str, help="Regular mypy flags (precede with --)"
 )
@@ -351,7 +362,24 @@ def start_server(args: argparse.Namespace, allow_sources: bool = False) -> None:
     from mypy.dmypy_server import daemonize, process_start_options
 
     start_options = process_start_options(args.flags, allow_sources)
-    if daemonize(start_options, args.status_file, timeout=args.timeout, log_file=args.log_file):
+    snapshot = getattr(args, "from_snapshot", None)
+    if snapshot:
+        # Lazy import so this import doesn't slow down other commands.
+        from mypy.server.snapshot import read_snapshot_info
+
+        snapshot = os.path.abspath(snapshot)
+        info = read_snapshot_info(snapshot)
+        if info is None:
+            fail(f"Invalid snapshot file: {args.from_snapshot}")
+        if info.get("version_id") != __version__:
+            fail("Snapshot was written by a different version of mypy")
+    if daemonize(
+        start_options,
+        args.status_file,
+        timeout=args.timeout,
+        log_file=args.log_file,
+        snapshot=snapshot,
+    ):
         sys.exit(2)
     wait_for_server(args.status_file)
 
@@ -400,6 +428,7 @@ def do_run(args: argparse.Namespace) -> None:
         version=__version__,
         args=args.flags,
         export_types=args.export_types,
+        trace=args.trace_file is not None,
     )
     # If the daemon signals that a restart is necessary, do it
     if "restart" in response:
@@ -411,11 +440,12 @@ def do_run(args: argparse.Namespace) -> None:
             version=__version__,
             args=args.flags,
             export_types=args.export_types,
+            trace=args.trace_file is not None,
         )
 
     t1 = time.time()
     response["roundtrip_time"] = t1 - t0
-    check_output(response, args.verbose, args.junit_xml, args.perf_stats_file)
+    check_output(response, args.verbose, args.junit_xml, args.perf_stats_file, args.trace_file)
 
 
 @action(status_parser)
@@ -452,6 +482,13 @@ def do_stop(args: argparse.Namespace) -> None:
         print("Daemon stopped")
 
 
+@action(snapshot_parser)
+def do_snapshot(args: argparse.Namespace) -> None:
+    """Ask the daemon to write its build state to a snapshot file."""
+    response = request(args.status_file, "snapshot", path=os.path.abspath(args.file))
+    check_output(response, verbose=False, junit_xml=None, perf_stats_file=None)
+
+
 @action(kill_parser)
 def do_kill(args: argparse.Namespace) -> None:
     """Kill daemon process with SIGKILL."""
@@ -468,10 +505,16 @@ def do_kill(args: argparse.Namespace) -> None:
 def do_check(args: argparse.Namespace) -> None:
     """Ask the daemon to check a list of files."""
     t0 = time.time()
-    response = request(args.status_file, "check", files=args.files, export_types=args.export_types)
+    response = request(
+        args.status_file,
+        "check",
+        files=args.files,
+        export_types=args.export_types,
+        trace=args.trace_file is not None,
+    )
     t1 = time.time()
     response["roundtrip_time"] = t1 - t0
-    check_output(response, args.verbose, args.junit_xml, args.perf_stats_file)
+    check_output(response, args.verbose, args.junit_xml, args.perf_stats_file, args.trace_file)
 
 
 @action(recheck_parser)
@@ -497,12 +540,18 @@ def do_recheck(args: argparse.Namespace) -> None:
             export_types=args.export_types,
             remove=args.remove,
             update=args.update,
+            trace=args.trace_file is not None,
         )
     else:
-        response = request(args.status_file, "recheck", export_types=args.export_types)
+        response = request(
+            args.status_file,
+            "recheck",
+            export_types=args.export_types,
+            trace=args.trace_file is not None,
+        )
     t1 = time.time()
     response["roundtrip_time"] = t1 - t0
-    check_output(response, args.verbose, args.junit_xml, args.perf_stats_file)
+    check_output(response, args.verbose, args.junit_xml, args.perf_stats_file, args.trace_file)
 
 
 @action(suggest_parser)
@@ -547,7 +596,11 @@ def do_inspect(args: argparse.Namespace) -> None:
 
 
 def check_output(
-    response: dict[str, Any], verbose: bool, junit_xml: str | None, perf_stats_file: str | None
+    response: dict[str, Any],
+    verbose: bool,
+    junit_xml: str | None,
+    perf_stats_file: str | None,
+    trace_file: str | None = None,
 ) -> None:
     """Print the output from a check or recheck command.
 
@@ -562,6 +615,7 @@ def check_output(
     sys.stdout.write(out)
     sys.stdout.flush()
     sys.stderr.write(err)
+    trace = response.pop("trace", None)
     if verbose:
         show_stats(response)
     if junit_xml:
@@ -581,6 +635,9 @@ def check_output(
         telemetry = response.get("stats", {})
         with open(perf_stats_file, "w") as f:
             json.dump(telemetry, f)
+    if trace_file:
+        with open(trace_file, "w") as f:
+            json.dump(trace or {}, f, indent=2)
 
     if status_code:
         sys.exit(status_code)
@@ -624,7 +681,7 @@ def do_daemon(args: argparse.Namespace) -> None:
     else:
         options = process_start_options(args.flags, allow_sources=False)
 
-    Server(options, args.status_file, timeout=args.timeout).serve()
+    Server(options, args.status_file, timeout=args.timeout, snapshot=args.from_snapshot).serve()
 
 
 @action(help_parser)
@@ -637,7 +694,12 @@ def do_help(args: argparse.Namespace) -> None:
 
 
 def request(
-    status_file: str, command: str, *, timeout: int | None = None, **kwds: object
+    status_file: str,
+    command: str,
+    *,
+    timeout: int | None = None,
+    on_diagnostics: Callable[[list[str]], None] | None = None,
+    **kwds: object,
 ) -> dict[str, Any]:
     """Send a request to the daemon.
 
@@ -651,18 +713,14 @@ def request(
     closed prematurely as well as invalid JSON received.
     """
     response: dict[str, str] = {}
-    args = dict(kwds)
-    args["command"] = command
-    # Tell the server whether this request was initiated from a human-facing terminal,
-    # so that it can format the type checking output accordingly.
-    args["is_tty"] = sys.stdout.isatty() or should_force_color()
-    args["terminal_width"] = get_terminal_width()
-    bdata = json.dumps(args).encode("utf8")
-    _, name = get_status(status_file)
+    status = read_status(status_file)
+    _, name = check_status(status)
+    # A daemon started by an older version may use the old protocol. We must still
+    # be able to talk to it, in particular to find out that it needs a restart.
+    framed = status.get("ipc_protocol", 1) != 1
     try:
-        with IPCClient(name, timeout) as client:
-            client.write(bdata)
-            response = receive(client)
+        with IPCClient(name, timeout, framed=framed) as client:
+            response = send_request(client, command, on_diagnostics=on_diagnostics, **kwds)
     except (OSError, IPCException) as err:
         return {"error": str(err)}
     # TODO: Other errors, e.g. ValueError, UnicodeError
@@ -679,6 +737,41 @@ def request(
         return response
 
 
+def send_request(
+    client: IPCClient,
+    command: str,
+    *,
+    on_diagnostics: Callable[[list[str]], None] | None = None,
+    **kwds: object,
+) -> dict[str, Any]:
+    """Send a request over an open connection to the daemon and return the response.
+
+    A connection can be used for any number of requests, so editors can keep one
+    open instead of connecting for each request (unless the daemon uses the old
+    IPC protocol). If on_diagnostics is given, it is called with error messages
+    as the daemon finds them, before the response (which still includes all
+    messages) arrives.
+
+    Raise OSError or IPCException if communication fails.
+    """
+    args = dict(kwds)
+    args["command"] = command
+    # Tell the server whether this request was initiated from a human-facing terminal,
+    # so that it can format the type checking output accordingly.
+    args["is_tty"] = sys.stdout.isatty() or should_force_color()
+    args["terminal_width"] = get_terminal_width()
+    if on_diagnostics is not None and client.framed:
+        # Servers using the old protocol can only send a single response.
+        args["stream_diagnostics"] = True
+    send(client, args)
+    while True:
+        response: dict[str, Any] = receive(client)
+        if not response.get("partial"):
+            return response
+        if on_diagnostics is not None:
+            on_diagnostics(response["diagnostics"])
+
+
 def get_status(status_file: str) -> tuple[int, str]:
     """Read status file and check if the process is alive.
 
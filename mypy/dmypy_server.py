@@ -8,32 +8,39 @@ from __future__ import annotations
 
 import argparse
 import base64
+import gc
 import io
 import json
 import os
 import pickle
+import select
+import shutil
 import subprocess
 import sys
+import tempfile
+import threading
 import time
 import traceback
-from contextlib import redirect_stderr, redirect_stdout
-from typing import AbstractSet, Any, Callable, Final, List, Sequence, Tuple
+from collections import Counter, deque
+from contextlib import contextmanager, redirect_stderr, redirect_stdout
+from typing import AbstractSet, Any, Callable, Final, Iterator, List, Sequence, TextIO, Tuple
 from typing_extensions import TypeAlias as _TypeAlias
 
 import mypy.build
 import mypy.errors
 import mypy.main
-from mypy.dmypy_util import receive
+from mypy.dmypy_util import receive, send
 from mypy.find_sources import InvalidSourceList, create_source_list
 from mypy.fscache import FileSystemCache
-from mypy.fswatcher import FileData, FileSystemWatcher
-from mypy.inspections import InspectionEngine
-from mypy.ipc import IPCServer
+from mypy.fswatcher import FileData, FileSystemWatcher, create_watcher
+from mypy.inspections import InspectionEngine, ReloadRequired
+from mypy.ipc import IPC_PROTOCOL_VERSION, IPCBase, IPCException, IPCServer
 from mypy.modulefinder import BuildSource, FindModuleCache, SearchPaths, compute_search_paths
 from mypy.options import Options
-from mypy.server.update import FineGrainedBuildManager, refresh_suppressed_submodules
+from mypy.server.snapshot import write_snapshot
+from mypy.server.update import FineGrainedBuildManager, UpdateWork, refresh_suppressed_submodules
 from mypy.suggestions import SuggestionEngine, SuggestionFailure
-from mypy.typestate import reset_global_state
+from mypy.typestate import reset_global_state, type_state
 from mypy.util import FancyFormatter, count_stats
 from mypy.version import __version__
 
@@ -43,7 +50,11 @@ if sys.platform == "win32":
     from subprocess import STARTUPINFO
 
     def daemonize(
-        options: Options, status_file: str, timeout: int | None = None, log_file: str | None = None
+        options: Options,
+        status_file: str,
+        timeout: int | None = None,
+        log_file: str | None = None,
+        snapshot: str | None = None,
     ) -> int:
         """Create the daemon process via "dmypy daemon" and pass options via command line
 
@@ -62,6 +73,8 @@ if sys.platform == "win32":
             command.append(f"--timeout={timeout}")
         if log_file:
             command.append(f"--log-file={log_file}")
+        if snapshot:
+            command.append(f"--from-snapshot={snapshot}")
         info = STARTUPINFO()
         info.dwFlags = 0x1  # STARTF_USESHOWWINDOW aka use wShowWindow's value
         info.wShowWindow = 0  # SW_HIDE aka make the window invisible
@@ -119,14 +132,18 @@ else:
             os._exit(1)
 
     def daemonize(
-        options: Options, status_file: str, timeout: int | None = None, log_file: str | None = None
+        options: Options,
+        status_file: str,
+        timeout: int | None = None,
+        log_file: str | None = None,
+        snapshot: str | None = None,
     ) -> int:
         """Run the mypy daemon in a grandchild of the current process
 
         Return 0 for success, exit status for failure, negative if
         subprocess killed by signal.
         """
-        return _daemonize_cb(Server(options, status_file, timeout).serve, log_file)
+        return _daemonize_cb(Server(options, status_file, timeout, snapshot).serve, log_file)
 
 
 # Server code.
@@ -165,18 +182,154 @@ ModulePathPair: _TypeAlias = Tuple[str, str]
 ModulePathPairs: _TypeAlias = List[ModulePathPair]
 ChangesAndRemovals: _TypeAlias = Tuple[ModulePathPairs, ModulePathPairs]
 
+# Commands that never update the build, and can run at any time
+READ_ONLY_COMMANDS: Final = frozenset({"status"})
+
+
+class Request:
+    """A request received by the server, and its response once done."""
+
+    def __init__(self, command: str, data: dict[str, Any]) -> None:
+        self.command = command
+        self.data = data
+        self.response: dict[str, Any] = {}
+        # Exception that crashed the daemon while running the request, if any
+        self.error: Exception | None = None
+        # Connection to send diagnostics to while the request runs, if requested
+        self.stream_to: IPCBase | None = None
+        self.done = threading.Event()
+
+
+# Arguments of recheck that affect the output, and must match to merge requests
+RECHECK_OUTPUT_ARGS: Final = ("is_tty", "terminal_width", "export_types")
+
+
+def can_merge_rechecks(first: Request, other: Request) -> bool:
+    """Can other be merged into first, a recheck request?"""
+    if other.command != "recheck":
+        return False
+    if any(first.data.get(k) != other.data.get(k) for k in RECHECK_OUTPUT_ARGS):
+        return False
+    # A plain recheck finds changes using the fswatcher, while a recheck with explicit
+    # remove/update lists assumes everything else is unchanged, so don't mix them.
+    return is_explicit_recheck(first) == is_explicit_recheck(other)
+
+
+def is_explicit_recheck(request: Request) -> bool:
+    return request.data.get("remove") is not None or request.data.get("update") is not None
+
+
+def merge_rechecks(requests: list[Request]) -> Request:
+    """Merge consecutive recheck requests into a single request with the same effect."""
+    data = dict(requests[0].data)
+    if is_explicit_recheck(requests[0]):
+        # Dicts are used as ordered sets; later requests override earlier ones.
+        remove: dict[str, None] = {}
+        update: dict[str, None] = {}
+        for request in requests:
+            for path in request.data.get("remove") or []:
+                update.pop(path, None)
+                remove[path] = None
+            for path in request.data.get("update") or []:
+                remove.pop(path, None)
+                update[path] = None
+        data["remove"] = list(remove)
+        data["update"] = list(update)
+    return Request("recheck", data)
+
+
+def partial_sender(connections: list[IPCBase]) -> Callable[[dict[str, Any]], None]:
+    """Return a function that sends partial responses to the given connections."""
+
+    def send_partial(data: dict[str, Any]) -> None:
+        for conn in connections:
+            try:
+                send(conn, data)
+            except OSError:
+                pass  # Maybe the client hung up; it will notice when reading the response
+
+    return send_partial
+
+
+class ThreadLocalStream:
+    """Text stream that writes to a separate target stream in each thread.
+
+    This is used as sys.stdout and sys.stderr so that requests served
+    concurrently can each capture their own output.
+    """
+
+    def __init__(self, default: TextIO) -> None:
+        self.default = default
+        self.local = threading.local()
+
+    def set_target(self, stream: TextIO | None) -> None:
+        self.local.target = stream
+
+    def current_target(self) -> TextIO | None:
+        """Return the target stream of the current thread, if set."""
+        target: TextIO | None = getattr(self.local, "target", None)
+        return target
+
+    def target(self) -> TextIO:
+        target = self.current_target()
+        return target if target is not None else self.default
+
+    def write(self, s: str) -> int:
+        return self.target().write(s)
+
+    def flush(self) -> None:
+        self.target().flush()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.target(), name)
+
+
+@contextmanager
+def redirect_output(stdout: TextIO, stderr: TextIO) -> Iterator[None]:
+    """Redirect sys.stdout and sys.stderr, only in the current thread if possible.
+
+    When requests are served concurrently, these are ThreadLocalStreams, and
+    replacing them would also redirect the output of other threads.
+    """
+    out, err = sys.stdout, sys.stderr
+    if isinstance(out, ThreadLocalStream) and isinstance(err, ThreadLocalStream):
+        saved_out, saved_err = out.current_target(), err.current_target()
+        out.set_target(stdout)
+        err.set_target(stderr)
+        try:
+            yield
+        finally:
+            out.set_target(saved_out)
+            err.set_target(saved_err)
+    else:
+        with redirect_stderr(stderr), redirect_stdout(stdout):
+            yield
+
 
 class Server:
     # NOTE: the instance is constructed in the parent process but
     # serve() is called in the grandchild (by daemonize()).
 
-    def __init__(self, options: Options, status_file: str, timeout: int | None = None) -> None:
-        """Initialize the server with the desired mypy flags."""
+    def __init__(
+        self,
+        options: Options,
+        status_file: str,
+        timeout: int | None = None,
+        snapshot: str | None = None,
+    ) -> None:
+        """Initialize the server with the desired mypy flags.
+
+        If snapshot is given, the initial build state is loaded from this
+        snapshot file (see mypy.server.snapshot).
+        """
         self.options = options
         # Snapshot the options info before we muck with it, to detect changes
         self.options_snapshot = options.snapshot()
         self.timeout = timeout
         self.fine_grained_manager: FineGrainedBuildManager | None = None
+        # Sends partial responses (such as diagnostics) to the client(s) of the
+        # request being run, if they asked for them
+        self.send_partial: Callable[[dict[str, Any]], None] | None = None
 
         if os.path.isfile(status_file):
             os.unlink(status_file)
@@ -187,6 +340,14 @@ class Server:
         options.incremental = True
         options.fine_grained_incremental = True
         options.show_traceback = True
+        # Empty cache directory used when loading a snapshot, so that the cache
+        # directory doesn't shadow the snapshot
+        self.snapshot_cache_dir: str | None = None
+        if snapshot is not None:
+            self.snapshot_cache_dir = tempfile.mkdtemp(prefix="dmypy-snapshot-")
+            options.use_fine_grained_cache = True
+            options.cache_bundle = snapshot
+            options.cache_dir = self.snapshot_cache_dir
         if options.use_fine_grained_cache:
             # Using fine_grained_cache implies generating and caring
             # about the fine grained cache
@@ -207,50 +368,82 @@ class Server:
         return {"platform": self.options.platform, "python_version": py_version}
 
     def serve(self) -> None:
+        """Serve requests until stopped (or until the timeout expires).
+
+        On Unix, requests are served concurrently (see serve_concurrently).
+        Named pipes only allow one connection at a time, so on Windows we
+        serve requests one at a time.
+        """
+        if sys.platform == "win32":
+            self.serve_sequentially()
+        else:
+            self.serve_concurrently()
+
+    def write_status_file(self, server: IPCServer) -> None:
+        """Record how clients can connect to this server in the status file."""
+        status = {
+            "pid": os.getpid(),
+            "connection_name": server.connection_name,
+            # Clients need this to know how to talk to the server (see mypy.ipc).
+            "ipc_protocol": IPC_PROTOCOL_VERSION,
+        }
+        with open(self.status_file, "w") as f:
+            json.dump(status, f)
+            f.write("\n")  # I like my JSON with a trailing newline
+
+    def serve_sequentially(self) -> None:
         """Serve requests, synchronously (no thread or fork)."""
         command = None
         server = IPCServer(CONNECTION_NAME, self.timeout)
         try:
-            with open(self.status_file, "w") as f:
-                json.dump({"pid": os.getpid(), "connection_name": server.connection_name}, f)
-                f.write("\n")  # I like my JSON with a trailing newline
+            self.write_status_file(server)
             while True:
                 with server:
                     data = receive(server)
-                    debug_stdout = io.StringIO()
-                    debug_stderr = io.StringIO()
-                    sys.stdout = debug_stdout
-                    sys.stderr = debug_stderr
-                    resp: dict[str, Any] = {}
-                    if "command" not in data:
-                        resp = {"error": "No command found in request"}
-                    else:
-                        command = data["command"]
-                        if not isinstance(command, str):
-                            resp = {"error": "Command is not a string"}
+                    while True:
+                        debug_stdout = io.StringIO()
+                        debug_stderr = io.StringIO()
+                        sys.stdout = debug_stdout
+                        sys.stderr = debug_stderr
+                        resp: dict[str, Any] = {}
+                        if "command" not in data:
+                            resp = {"error": "No command found in request"}
                         else:
-                            command = data.pop("command")
-                            try:
-                                resp = self.run_command(command, data)
-                            except Exception:
-                                # If we are crashing, report the crash to the client
-                                tb = traceback.format_exception(*sys.exc_info())
-                                resp = {"error": "Daemon crashed!\n" + "".join(tb)}
-                                resp.update(self._response_metadata())
-                                resp["stdout"] = debug_stdout.getvalue()
-                                resp["stderr"] = debug_stderr.getvalue()
-                                server.write(json.dumps(resp).encode("utf8"))
-                                raise
-                    resp["stdout"] = debug_stdout.getvalue()
-                    resp["stderr"] = debug_stderr.getvalue()
-                    try:
-                        resp.update(self._response_metadata())
-                        server.write(json.dumps(resp).encode("utf8"))
-                    except OSError:
-                        pass  # Maybe the client hung up
-                    if command == "stop":
-                        reset_global_state()
-                        sys.exit(0)
+                            command = data["command"]
+                            if not isinstance(command, str):
+                                resp = {"error": "Command is not a string"}
+                            else:
+                                command = data.pop("command")
+                                if data.pop("stream_diagnostics", False):
+                                    self.send_partial = partial_sender([server])
+                                try:
+                                    resp = self.run_command(command, data)
+                                except Exception:
+                                    # If we are crashing, report the crash to the client
+                                    tb = traceback.format_exception(*sys.exc_info())
+                                    resp = {"error": "Daemon crashed!\n" + "".join(tb)}
+                                    resp.update(self._response_metadata())
+                                    resp["stdout"] = debug_stdout.getvalue()
+                                    resp["stderr"] = debug_stderr.getvalue()
+                                    send(server, resp)
+                                    raise
+                                finally:
+                                    self.send_partial = None
+                        resp["stdout"] = debug_stdout.getvalue()
+                        resp["stderr"] = debug_stderr.getvalue()
+                        try:
+                            resp.update(self._response_metadata())
+                            send(server, resp)
+                        except OSError:
+                            pass  # Maybe the client hung up
+                        if command == "stop":
+                            reset_global_state()
+                            sys.exit(0)
+                        # Serve further requests until the client closes the connection.
+                        try:
+                            data = receive(server)
+                        except (OSError, IPCException):
+                            break
         finally:
             # If the final command is something other than a clean
             # stop, remove the status file. (We can't just
@@ -267,6 +460,203 @@ class Server:
             if exc_info[0] and exc_info[0] is not SystemExit:
                 traceback.print_exception(*exc_info)
 
+    def serve_concurrently(self) -> None:
+        """Serve requests, handling each connection in a separate thread.
+
+        Commands that may update the build are queued and run one at a time by
+        a worker thread (see process_requests). The status command, and inspections
+        that don't need to reload modules, are answered right away, in parallel
+        with each other, provided that no update is queued or running. Recheck
+        requests that arrive while an update is running are merged into one.
+        """
+        command = None
+        server = IPCServer(CONNECTION_NAME, self.timeout)
+        self.queue: deque[Request] = deque()
+        # Protects the fields below, and is notified whenever they change
+        self.cond = threading.Condition()
+        self.readers = 0
+        self.updating = False
+        self.connections = 0
+        # The stop (or crashed) request that ends serving
+        self.final_request: Request | None = None
+        wakeup_read, self.wakeup_write = os.pipe()
+        self.stdout = ThreadLocalStream(sys.stdout)
+        self.stderr = ThreadLocalStream(sys.stderr)
+        sys.stdout = self.stdout  # type: ignore[assignment]
+        sys.stderr = self.stderr  # type: ignore[assignment]
+        threading.Thread(target=self.process_requests, daemon=True).start()
+        try:
+            self.write_status_file(server)
+            while self.final_request is None:
+                ready, _, _ = select.select([server.fileno(), wakeup_read], [], [], self.timeout)
+                if not ready:
+                    if self.is_idle():
+                        raise IPCException("The socket timed out")
+                    continue
+                if server.fileno() in ready:
+                    conn = server.accept()
+                    with self.cond:
+                        self.connections += 1
+                    threading.Thread(
+                        target=self.handle_connection, args=(conn,), daemon=True
+                    ).start()
+            command = self.final_request.command
+            if self.final_request.error is not None:
+                raise self.final_request.error
+            reset_global_state()
+            sys.exit(0)
+        finally:
+            # See serve_sequentially() for why we don't always remove the status file.
+            if command != "stop":
+                os.unlink(self.status_file)
+            try:
+                server.cleanup()  # try to remove the socket dir on Linux
+            except OSError:
+                pass
+            os.close(wakeup_read)
+            os.close(self.wakeup_write)
+            exc_info = sys.exc_info()
+            if exc_info[0] and exc_info[0] is not SystemExit:
+                traceback.print_exception(*exc_info)
+
+    def is_idle(self) -> bool:
+        with self.cond:
+            return not (self.queue or self.updating or self.readers or self.connections)
+
+    def handle_connection(self, conn: IPCBase) -> None:
+        """Serve requests from a connection until the client closes it."""
+        try:
+            while True:
+                try:
+                    data = receive(conn)
+                except (OSError, IPCException):
+                    return  # Client hung up, or sent garbage
+                if "command" not in data:
+                    request = Request("", data)
+                    request.response = {"error": "No command found in request"}
+                elif not isinstance(data["command"], str):
+                    request = Request("", data)
+                    request.response = {"error": "Command is not a string"}
+                else:
+                    request = Request(data.pop("command"), data)
+                    if data.pop("stream_diagnostics", False):
+                        request.stream_to = conn
+                    self.dispatch(request)
+                resp = dict(request.response)
+                resp.update(self._response_metadata())
+                try:
+                    send(conn, resp)
+                except OSError:
+                    pass  # Maybe the client hung up
+                if request.command == "stop" or request.error is not None:
+                    self.final_request = request
+                    os.write(self.wakeup_write, b"\0")
+                    return
+        finally:
+            conn.close()
+            with self.cond:
+                self.connections -= 1
+
+    @contextmanager
+    def reading_build(self) -> Iterator[None]:
+        """Wait for pending updates, and keep updates from starting until done.
+
+        Any number of threads can read the build (or the fswatcher) at once.
+        """
+        with self.cond:
+            while self.queue or self.updating:
+                self.cond.wait()
+            self.readers += 1
+        try:
+            yield
+        finally:
+            with self.cond:
+                self.readers -= 1
+                self.cond.notify_all()
+
+    def dispatch(self, request: Request) -> None:
+        """Run a request, either right away or via the queue of build updates."""
+        if request.command in READ_ONLY_COMMANDS:
+            if request.data.get("fswatcher_dump_file"):
+                # Updates modify the fswatcher.
+                with self.reading_build():
+                    self.run_request(request)
+            else:
+                self.run_request(request)
+            return
+        if request.command == "inspect" and not request.data.get("force_reload"):
+            # Wait for pending updates, so that we inspect an up-to-date build.
+            with self.reading_build():
+                if self.run_request(request, allow_reload=False):
+                    return
+            # Some module needs to be reloaded, so this must be queued like an update.
+        with self.cond:
+            self.queue.append(request)
+            self.cond.notify_all()
+        request.done.wait()
+
+    def process_requests(self) -> None:
+        """Run queued requests one at a time (in the worker thread)."""
+        while True:
+            with self.cond:
+                while not self.queue:
+                    self.cond.wait()
+                batch = [self.queue.popleft()]
+                if batch[0].command == "recheck":
+                    while self.queue and can_merge_rechecks(batch[0], self.queue[0]):
+                        batch.append(self.queue.popleft())
+                self.updating = True
+                while self.readers:
+                    self.cond.wait()
+            request = batch[0] if len(batch) == 1 else merge_rechecks(batch)
+            streams = [r.stream_to for r in batch if r.stream_to is not None]
+            if streams:
+                self.send_partial = partial_sender(streams)
+            try:
+                self.run_request(request)
+            finally:
+                self.send_partial = None
+                with self.cond:
+                    self.updating = False
+                    self.cond.notify_all()
+            for r in batch:
+                r.response = request.response
+                r.error = request.error
+                r.done.set()
+            if request.command == "stop" or request.error is not None:
+                return
+
+    def run_request(self, request: Request, allow_reload: bool = True) -> bool:
+        """Run a request in the current thread, capturing its output.
+
+        Return False if the request was not run because it needs to reload
+        modules, which isn't allowed.
+        """
+        stdout = io.StringIO()
+        stderr = io.StringIO()
+        self.stdout.set_target(stdout)
+        self.stderr.set_target(stderr)
+        # run_command() modifies the data, and merged requests share it
+        data = dict(request.data)
+        if not allow_reload:
+            data["allow_reload"] = False
+        try:
+            resp = self.run_command(request.command, data)
+        except ReloadRequired:
+            return False
+        except Exception as e:
+            # If we are crashing, report the crash to the client
+            tb = traceback.format_exception(*sys.exc_info())
+            resp = {"error": "Daemon crashed!\n" + "".join(tb)}
+            request.error = e
+        finally:
+            self.stdout.set_target(None)
+            self.stderr.set_target(None)
+        resp["stdout"] = stdout.getvalue()
+        resp["stderr"] = stderr.getvalue()
+        request.response = resp
+        return True
+
     def run_command(self, command: str, data: dict[str, object]) -> dict[str, object]:
         """Run a specific command from the registry."""
         key = "cmd_" + command
@@ -287,7 +677,7 @@ class Server:
     def cmd_status(self, fswatcher_dump_file: str | None = None) -> dict[str, object]:
         """Return daemon status."""
         res: dict[str, object] = {}
-        res.update(get_meminfo())
+        res.update(get_meminfo(self.fine_grained_manager))
         if fswatcher_dump_file:
             data = self.fswatcher.dump_file_data() if hasattr(self, "fswatcher") else {}
             # Using .dumps and then writing was noticeably faster than using dump
@@ -303,6 +693,8 @@ class Server:
         # command can see a status file from a dying server and think
         # it is a live one.
         os.unlink(self.status_file)
+        if self.snapshot_cache_dir is not None:
+            shutil.rmtree(self.snapshot_cache_dir, ignore_errors=True)
         return {}
 
     def cmd_run(
@@ -312,6 +704,7 @@ class Server:
         export_types: bool,
         is_tty: bool,
         terminal_width: int,
+        trace: bool = False,
     ) -> dict[str, object]:
         """Check a list of files, triggering a restart if needed."""
         stderr = io.StringIO()
@@ -319,16 +712,15 @@ class Server:
         try:
             # Process options can exit on improper arguments, so we need to catch that and
             # capture stderr so the client can report it
-            with redirect_stderr(stderr):
-                with redirect_stdout(stdout):
-                    sources, options = mypy.main.process_options(
-                        ["-i"] + list(args),
-                        require_targets=True,
-                        server_options=True,
-                        fscache=self.fscache,
-                        program="mypy-daemon",
-                        header=argparse.SUPPRESS,
-                    )
+            with redirect_output(stdout, stderr):
+                sources, options = mypy.main.process_options(
+                    ["-i"] + list(args),
+                    require_targets=True,
+                    server_options=True,
+                    fscache=self.fscache,
+                    program="mypy-daemon",
+                    header=argparse.SUPPRESS,
+                )
             # Signal that we need to restart if the options have changed
             if not options.compare_stable(self.options_snapshot):
                 return {"restart": "configuration changed"}
@@ -346,17 +738,22 @@ class Server:
             return {"out": "", "err": str(err), "status": 2}
         except SystemExit as e:
             return {"out": stdout.getvalue(), "err": stderr.getvalue(), "status": e.code}
-        return self.check(sources, export_types, is_tty, terminal_width)
+        return self.check(sources, export_types, is_tty, terminal_width, trace)
 
     def cmd_check(
-        self, files: Sequence[str], export_types: bool, is_tty: bool, terminal_width: int
+        self,
+        files: Sequence[str],
+        export_types: bool,
+        is_tty: bool,
+        terminal_width: int,
+        trace: bool = False,
     ) -> dict[str, object]:
         """Check a list of files."""
         try:
             sources = create_source_list(files, self.options, self.fscache)
         except InvalidSourceList as err:
             return {"out": "", "err": str(err), "status": 2}
-        return self.check(sources, export_types, is_tty, terminal_width)
+        return self.check(sources, export_types, is_tty, terminal_width, trace)
 
     def cmd_recheck(
         self,
@@ -365,11 +762,13 @@ class Server:
         export_types: bool,
         remove: list[str] | None = None,
         update: list[str] | None = None,
+        trace: bool = False,
     ) -> dict[str, object]:
         """Check the same list of files we checked most recently.
 
         If remove/update is given, they modify the previous list;
         if all are None, stat() is called for each file in the previous list.
+        If trace is True, include the work done by the update in the response.
         """
         t0 = time.time()
         if not self.fine_grained_manager:
@@ -395,18 +794,26 @@ class Server:
         else:
             assert remove is None and update is None
             messages = self.fine_grained_increment_follow_imports(sources)
+        self.stream_diagnostics(messages)
         res = self.increment_output(messages, sources, is_tty, terminal_width)
         self.flush_caches()
-        self.update_stats(res)
+        self.enforce_memory_budget()
+        self.update_stats(res, trace)
         return res
 
     def check(
-        self, sources: list[BuildSource], export_types: bool, is_tty: bool, terminal_width: int
+        self,
+        sources: list[BuildSource],
+        export_types: bool,
+        is_tty: bool,
+        terminal_width: int,
+        trace: bool = False,
     ) -> dict[str, Any]:
         """Check using fine-grained incremental mode.
 
         If is_tty is True format the output nicely with colors and summary line
         (unless disabled in self.options). Also pass the terminal_width to formatter.
+        If trace is True, include the work done by the update in the response.
         """
         self.options.export_types = export_types
         if not self.fine_grained_manager:
@@ -416,19 +823,59 @@ class Server:
                 messages = self.fine_grained_increment(sources)
             else:
                 messages = self.fine_grained_increment_follow_imports(sources)
+            self.stream_diagnostics(messages)
             res = self.increment_output(messages, sources, is_tty, terminal_width)
         self.flush_caches()
-        self.update_stats(res)
+        self.enforce_memory_budget()
+        self.update_stats(res, trace)
         return res
 
+    def stream_diagnostics(self, messages: list[str]) -> None:
+        """Send error messages to clients that asked to receive them as they are found.
+
+        During the initial build, the messages for each module are sent once the
+        module has been checked. Fine-grained increments send their messages once
+        the update is done, since errors in a module can change until then. The
+        messages are not formatted for a terminal, and the final response always
+        includes all messages.
+        """
+        if self.send_partial is not None and messages:
+            self.send_partial({"partial": True, "diagnostics": messages})
+
     def flush_caches(self) -> None:
         self.fscache.flush()
         if self.fine_grained_manager:
             self.fine_grained_manager.flush_cache()
 
-    def update_stats(self, res: dict[str, Any]) -> None:
+    def enforce_memory_budget(self) -> None:
+        """Evict cold modules if the daemon uses more memory than its budget.
+
+        This evicts at most once per request. Freed memory is often not returned
+        to the OS, so the RSS may stay over the budget after an eviction, and
+        evicting until it drops would evict every module that can be evicted.
+        """
+        budget = self.options.memory_budget
+        if budget is None or not self.fine_grained_manager:
+            return
+        rss = get_rss_mib()
+        if rss is None or rss <= budget:
+            return
+        fine_grained_manager = self.fine_grained_manager
+        # Evict a quarter of the loaded modules, least recently used first.
+        count = max(1, len(fine_grained_manager.manager.modules) // 4)
+        if fine_grained_manager.evict_cold_modules(count):
+            gc.collect()
+
+    def update_stats(self, res: dict[str, Any], trace: bool = False) -> None:
         if self.fine_grained_manager:
             manager = self.fine_grained_manager.manager
+            work = manager.fg_work
+            if work is not None and not work.is_empty():
+                manager.add_stats(**work.stats())
+            manager.add_stats(**type_state.take_cache_stats())
+            if trace:
+                res["trace"] = work.serialize() if work is not None else {}
+            manager.fg_work = UpdateWork()
             manager.dump_stats()
             res["stats"] = manager.stats
             manager.stats = {}
@@ -441,20 +888,37 @@ class Server:
     def initialize_fine_grained(
         self, sources: list[BuildSource], is_tty: bool, terminal_width: int
     ) -> dict[str, Any]:
-        self.fswatcher = FileSystemWatcher(self.fscache)
+        if hasattr(self, "fswatcher"):
+            self.fswatcher.close()
+        self.fswatcher: FileSystemWatcher = create_watcher(
+            self.fscache, use_inotify=self.options.use_inotify
+        )
         t0 = time.time()
         self.update_sources(sources)
         t1 = time.time()
+        build_messages: list[str] = []
+
+        def flush_errors(new_messages: list[str], is_serious: bool) -> None:
+            build_messages.extend(new_messages)
+            self.stream_diagnostics(new_messages)
+
         try:
-            result = mypy.build.build(sources=sources, options=self.options, fscache=self.fscache)
+            result = mypy.build.build(
+                sources=sources,
+                options=self.options,
+                flush_errors=flush_errors,
+                fscache=self.fscache,
+            )
         except mypy.errors.CompileError as e:
-            output = "".join(s + "\n" for s in e.messages)
+            output = "".join(s + "\n" for s in build_messages)
             if e.use_stdout:
                 out, err = output, ""
             else:
                 out, err = "", output
             return {"out": out, "err": err, "status": 2}
-        messages = result.errors
+        # The result has no errors when using flush_errors, but the fine-grained manager
+        # needs them as the messages of the previous update.
+        result.errors = messages = build_messages
         self.fine_grained_manager = FineGrainedBuildManager(result)
 
         if self.following_imports():
@@ -500,6 +964,15 @@ class Server:
             if self.following_imports():
                 # We need to do another update to any new files found by following imports.
                 messages = self.fine_grained_increment_follow_imports(sources)
+            # Messages from the build were already streamed by flush_errors().
+            already_streamed = Counter(build_messages)
+            new_messages = []
+            for message in messages:
+                if already_streamed[message]:
+                    already_streamed[message] -= 1
+                else:
+                    new_messages.append(message)
+            self.stream_diagnostics(new_messages)
 
             t4 = time.time()
             self.fine_grained_manager.manager.add_stats(
@@ -559,6 +1032,12 @@ class Server:
         manager.search_paths = compute_search_paths(sources, manager.options, manager.data_dir)
         t1 = time.time()
         manager.log(f"fine-grained increment: find_changed: {t1 - t0:.3f}s")
+        if len(changed) + len(removed) > get_rebuild_threshold(self.options, sources):
+            manager.log(
+                f"fine-grained increment: {len(changed) + len(removed)} files changed,"
+                " doing a full build"
+            )
+            return self.rebuild(sources)
         messages = self.fine_grained_manager.update(changed, removed)
         t2 = time.time()
         manager.log(f"fine-grained increment: update: {t2 - t1:.3f}s")
@@ -571,6 +1050,33 @@ class Server:
         self.previous_sources = sources
         return messages
 
+    def rebuild(self, sources: list[BuildSource]) -> list[str]:
+        """Check sources with a full build, replacing the fine-grained state.
+
+        This is used instead of a fine-grained increment when so many files have
+        changed that the increment would likely be slower. The cache (if any) is
+        used like in a non-daemon incremental run, and so only the stale SCCs and
+        their dependents are checked again.
+        """
+        self.fine_grained_manager = None
+        reset_global_state()
+        # The fine-grained cache would defer all the changes to a fine-grained update.
+        use_fine_grained_cache = self.options.use_fine_grained_cache
+        self.options.use_fine_grained_cache = False
+        # A fine-grained update treats deleted files as removed modules, so skip them.
+        existing = [s for s in sources if not s.path or self.fscache.isfile(s.path)]
+        try:
+            result = mypy.build.build(sources=existing, options=self.options, fscache=self.fscache)
+        except mypy.errors.CompileError as e:
+            # Like after an initial build with blocking errors, the next check starts over.
+            return e.messages
+        finally:
+            self.options.use_fine_grained_cache = use_fine_grained_cache
+        self.fine_grained_manager = FineGrainedBuildManager(result)
+        self.fine_grained_manager.manager.add_stats(rebuilds=1)
+        self.previous_sources = sources
+        return result.errors
+
     def fine_grained_increment_follow_imports(self, sources: list[BuildSource]) -> list[str]:
         """Like fine_grained_increment, but follow imports."""
         t0 = time.time()
@@ -894,8 +1400,13 @@ class Server:
         include_object_attrs: bool = False,
         union_attrs: bool = False,
         force_reload: bool = False,
+        allow_reload: bool = True,
     ) -> dict[str, object]:
-        """Locate and inspect expression(s)."""
+        """Locate and inspect expression(s).
+
+        If allow_reload is False, raise ReloadRequired instead of updating
+        the build (this is used to run inspections concurrently).
+        """
         if not self.fine_grained_manager:
             return {
                 "error": 'Command "inspect" is only valid after a "check" command'
@@ -910,9 +1421,12 @@ class Server:
             include_object_attrs=include_object_attrs,
             union_attrs=union_attrs,
             force_reload=force_reload,
+            allow_reload=allow_reload,
         )
         old_inspections = self.options.inspections
-        self.options.inspections = True
+        if allow_reload:
+            # This only matters when reloading, and other inspections may be running otherwise.
+            self.options.inspections = True
         try:
             if show == "type":
                 result = engine.get_type(location)
@@ -953,6 +1467,16 @@ class Server:
         finally:
             self.flush_caches()
 
+    def cmd_snapshot(self, path: str) -> dict[str, object]:
+        """Write the current build state to a snapshot file."""
+        if not self.fine_grained_manager or self.fine_grained_manager.blocking_error:
+            return {
+                "error": "Command 'snapshot' is only valid after a 'check' command"
+                " (that produces no blocking errors)"
+            }
+        count = write_snapshot(self.fine_grained_manager, self.fswatcher.dump_file_data(), path)
+        return {"out": "Snapshot written\n", "err": "", "status": 0, "modules": count}
+
     def cmd_hang(self) -> dict[str, object]:
         """Hang for 100 seconds, as a debug hack."""
         time.sleep(100)
@@ -965,8 +1489,17 @@ class Server:
 MiB: Final = 2**20
 
 
-def get_meminfo() -> dict[str, Any]:
+def get_meminfo(fine_grained_manager: FineGrainedBuildManager | None = None) -> dict[str, Any]:
     res: dict[str, Any] = {}
+    if fine_grained_manager is not None:
+        # This runs while updates may change the build (status is a read-only command),
+        # so it must not iterate over the modules or the graph.
+        manager = fine_grained_manager.manager
+        res["memory_budget_mib"] = manager.options.memory_budget
+        res["loaded_modules"] = len(manager.modules)
+        res["evicted_modules"] = fine_grained_manager.evicted_modules
+        res["evictions"] = fine_grained_manager.evictions
+        res["evicted_trees_mib"] = manager.evicted_tree_bytes / MiB
     try:
         import psutil
     except ImportError:
@@ -994,6 +1527,35 @@ def get_meminfo() -> dict[str, Any]:
     return res
 
 
+# Without --rebuild-threshold, an update does a full build when more than half of the
+# sources have changed, since a fine-grained update then does more work than a full
+# build that only checks the stale SCCs. Small builds are always updated.
+MIN_REBUILD_THRESHOLD: Final = 100
+
+
+def get_rebuild_threshold(options: Options, sources: list[BuildSource]) -> int:
+    """Return the number of changed files above which an update does a full build."""
+    if options.rebuild_threshold is not None:
+        return options.rebuild_threshold
+    return max(MIN_REBUILD_THRESHOLD, len(sources) // 2)
+
+
+def get_rss_mib() -> float | None:
+    """Return the resident set size of the process in MiB, if it can be determined."""
+    try:
+        import psutil
+    except ImportError:
+        pass
+    else:
+        return float(psutil.Process().memory_info().rss / MiB)
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE") / MiB
+
+
 def find_all_sources_in_build(
     graph: mypy.build.Graph, extra: Sequence[BuildSource] = ()
 ) -> list[BuildSource]:
@@ -14,10 +14,10 @@ DEFAULT_STATUS_FILE: Final = ".dmypy.json"
 
 
 def receive(connection: IPCBase) -> Any:
-    """Receive JSON data from a connection until EOF.
+    """Receive a JSON message from a connection.
 
-    Raise OSError if the data received is not valid JSON or if it is
-    not a dict.
+    Raise OSError if the connection was closed, or if the data received
+    is not valid JSON or if it is not a dict.
     """
     bdata = connection.read()
     if not bdata:
@@ -29,3 +29,8 @@ def receive(connection: IPCBase) -> Any:
     if not isinstance(data, dict):
         raise OSError(f"Data received is not a dict ({type(data)})")
     return data
+
+
+def send(connection: IPCBase, data: Any) -> None:
+    """Send data as a JSON message to a connection."""
+    connection.write(json.dumps(data).encode("utf8"))
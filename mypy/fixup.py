@@ -10,10 +10,14 @@ from mypy.nodes import (
     ClassDef,
     Decorator,
     FuncDef,
+    JsonDict,
     MypyFile,
     OverloadedFuncDef,
     ParamSpecExpr,
+    SymbolNode,
     SymbolTable,
+    SymbolTableNode,
+    SymbolTableNodeLoader,
     TypeAlias,
     TypeInfo,
     TypeVarExpr,
@@ -40,6 +44,7 @@ from mypy.types import (
     UnboundType,
     UnionType,
     UnpackType,
+    type_interner,
 )
 from mypy.visitor import NodeVisitor
 
@@ -47,9 +52,47 @@ from mypy.visitor import NodeVisitor
 # N.B: we do a allow_missing fixup when fixing up a fine-grained
 # incremental cache load (since there may be cross-refs into deleted
 # modules)
-def fixup_module(tree: MypyFile, modules: dict[str, MypyFile], allow_missing: bool) -> None:
+def fixup_module(
+    tree: MypyFile, modules: dict[str, MypyFile], allow_missing: bool, lazy: bool = False
+) -> None:
+    """Fix up cross-references in a deserialized module.
+
+    If lazy is True, module-level symbols are fixed up only when their
+    node is first accessed. The tree should have been deserialized with
+    lazy=True, so that unused symbols are never deserialized at all.
+    """
     node_fixer = NodeFixer(modules, allow_missing)
-    node_fixer.visit_symbol_table(tree.names, tree.fullname)
+    if lazy:
+        loader = LazyNodeFixer(node_fixer, tree.fullname)
+        for key, value in tree.names.items():
+            if value.is_deferred():
+                value.defer_loading(loader)
+            else:
+                node_fixer.visit_symbol_table_node(value, tree.fullname + "." + key)
+    else:
+        node_fixer.visit_symbol_table(tree.names, tree.fullname)
+
+
+class LazyNodeFixer(SymbolTableNodeLoader):
+    """Deserialize and fix up deferred module-level symbols on first access."""
+
+    __slots__ = ("node_fixer", "table_fullname")
+
+    def __init__(self, node_fixer: NodeFixer, table_fullname: str) -> None:
+        self.node_fixer = node_fixer
+        self.table_fullname = table_fullname
+
+    def load(self, stnode: SymbolTableNode, data: JsonDict | None) -> None:
+        if data is not None:
+            # Set the node before fixing it up, since it may refer to itself.
+            stnode.node = SymbolNode.deserialize(data)
+        # This may be triggered while fixing up a class in another module.
+        save_info = self.node_fixer.current_info
+        self.node_fixer.current_info = None
+        try:
+            self.node_fixer.visit_symbol_table_node(stnode, self.table_fullname)
+        finally:
+            self.node_fixer.current_info = save_info
 
 
 # TODO: Fix up .info when deserializing, i.e. much earlier.
@@ -112,31 +155,35 @@ class NodeFixer(NodeVisitor[None]):
     def visit_symbol_table(self, symtab: SymbolTable, table_fullname: str) -> None:
         # Copy the items because we may mutate symtab.
         for key, value in list(symtab.items()):
-            cross_ref = value.cross_ref
-            if cross_ref is not None:  # Fix up cross-reference.
-                value.cross_ref = None
-                if cross_ref in self.modules:
-                    value.node = self.modules[cross_ref]
-                else:
-                    stnode = lookup_fully_qualified(
-                        cross_ref, self.modules, raise_on_missing=not self.allow_missing
-                    )
-                    if stnode is not None:
-                        assert stnode.node is not None, (table_fullname + "." + key, cross_ref)
-                        value.node = stnode.node
-                    elif not self.allow_missing:
-                        assert False, f"Could not find cross-ref {cross_ref}"
-                    else:
-                        # We have a missing crossref in allow missing mode, need to put something
-                        value.node = missing_info(self.modules)
+            self.visit_symbol_table_node(value, table_fullname + "." + key)
+
+    # NOTE: Neither is this one.
+    def visit_symbol_table_node(self, value: SymbolTableNode, fullname: str) -> None:
+        cross_ref = value.cross_ref
+        if cross_ref is not None:  # Fix up cross-reference.
+            value.cross_ref = None
+            if cross_ref in self.modules:
+                value.node = self.modules[cross_ref]
             else:
-                if isinstance(value.node, TypeInfo):
-                    # TypeInfo has no accept().  TODO: Add it?
-                    self.visit_type_info(value.node)
-                elif value.node is not None:
-                    value.node.accept(self)
+                stnode = lookup_fully_qualified(
+                    cross_ref, self.modules, raise_on_missing=not self.allow_missing
+                )
+                if stnode is not None:
+                    assert stnode.node is not None, (fullname, cross_ref)
+                    value.node = stnode.node
+                elif not self.allow_missing:
+                    assert False, f"Could not find cross-ref {cross_ref}"
                 else:
-                    assert False, f"Unexpected empty node {key!r}: {value}"
+                    # We have a missing crossref in allow missing mode, need to put something
+                    value.node = missing_info(self.modules)
+        else:
+            if isinstance(value.node, TypeInfo):
+                # TypeInfo has no accept().  TODO: Add it?
+                self.visit_type_info(value.node)
+            elif value.node is not None:
+                value.node.accept(self)
+            else:
+                assert False, f"Unexpected empty node {fullname!r}: {value}"
 
     def visit_func_def(self, func: FuncDef) -> None:
         if self.current_info is not None:
@@ -212,6 +259,10 @@ class TypeFixer(TypeVisitor[None]):
         inst.type = lookup_fully_qualified_typeinfo(
             self.modules, type_ref, allow_missing=self.allow_missing
         )
+        if self.allow_missing and inst.type.module_name == "<missing>":
+            # The type may be found when more modules are loaded, so later
+            # modules shouldn't share this instance.
+            type_interner.forget(type_ref)
         # TODO: Is this needed or redundant?
         # Also fix up the bases, just in case.
         for base in inst.type.bases:
@@ -35,7 +35,7 @@ import stat
 
 from mypy_extensions import mypyc_attr
 
-from mypy.util import hash_digest
+from mypy.util import DEFAULT_HASH_ALGORITHM, hash_digest
 
 
 @mypyc_attr(allow_interpreted_subclasses=True)  # for tests
@@ -44,11 +44,18 @@ class FileSystemCache:
         # The package root is not flushed with the caches.
         # It is set by set_package_root() below.
         self.package_root: list[str] = []
+        # The hash algorithm is not flushed with the caches either.
+        self.hash_algorithm = DEFAULT_HASH_ALGORITHM
         self.flush()
 
     def set_package_root(self, package_root: list[str]) -> None:
         self.package_root = package_root
 
+    def set_hash_algorithm(self, algorithm: str) -> None:
+        if algorithm != self.hash_algorithm:
+            self.hash_algorithm = algorithm
+            self.hash_cache.clear()
+
     def flush(self) -> None:
         """Start another transaction and empty all caches."""
         self.stat_cache: dict[str, os.stat_result] = {}
@@ -285,12 +292,15 @@ class FileSystemCache:
                 raise
 
         self.read_cache[path] = data
-        self.hash_cache[path] = hash_digest(data)
+        self.hash_cache[path] = hash_digest(data, self.hash_algorithm)
         return data
 
     def hash_digest(self, path: str) -> str:
         if path not in self.hash_cache:
-            self.read(path)
+            data = self.read(path)
+            if path not in self.hash_cache:
+                # The hash algorithm changed after the file was read.
+                self.hash_cache[path] = hash_digest(data, self.hash_algorithm)
         return self.hash_cache[path]
 
     def samefile(self, f1: str, f2: str) -> bool:
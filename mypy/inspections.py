@@ -190,8 +190,17 @@ def find_all_by_location(tree: MypyFile, line: int, column: int) -> list[Express
     return list(reversed(visitor.result))
 
 
+class ReloadRequired(Exception):
+    """An inspection needs to reload a module, but reloading is not allowed."""
+
+
 class InspectionEngine:
-    """Engine for locating and statically inspecting expressions."""
+    """Engine for locating and statically inspecting expressions.
+
+    If allow_reload is False, the engine never updates the build (which makes
+    it safe to run concurrently with other inspections), and ReloadRequired is
+    raised instead if a module needs to be reloaded.
+    """
 
     def __init__(
         self,
@@ -204,6 +213,7 @@ class InspectionEngine:
         include_object_attrs: bool = False,
         union_attrs: bool = False,
         force_reload: bool = False,
+        allow_reload: bool = True,
     ) -> None:
         self.fg_manager = fg_manager
         self.finder = SourceFinder(
@@ -216,6 +226,7 @@ class InspectionEngine:
         self.include_object_attrs = include_object_attrs
         self.union_attrs = union_attrs
         self.force_reload = force_reload
+        self.allow_reload = allow_reload
         # Module for which inspection was requested.
         self.module: State | None = None
 
@@ -228,6 +239,8 @@ class InspectionEngine:
 
     def reload_module(self, state: State) -> None:
         """Reload given module while temporary exporting types."""
+        if not self.allow_reload:
+            raise ReloadRequired(state.id)
         old = self.fg_manager.manager.options.export_types
         self.fg_manager.manager.options.export_types = True
         try:
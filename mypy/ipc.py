@@ -2,6 +2,12 @@
 
 On Unix, this uses AF_UNIX sockets.
 On Windows, this uses NamedPipes.
+
+A connection carries a sequence of messages in each direction. Named pipes
+preserve message boundaries, while on Unix each message is prefixed by its
+length (see FRAME_HEADER). Older versions sent a single message in each
+direction on Unix, terminated by shutting down the write side of the socket;
+this is still supported to talk to older peers (see IPCBase.framed).
 """
 
 from __future__ import annotations
@@ -9,6 +15,7 @@ from __future__ import annotations
 import base64
 import os
 import shutil
+import struct
 import sys
 import tempfile
 from types import TracebackType
@@ -31,6 +38,15 @@ else:
     _IPCHandle = socket.socket
 
 
+# Length of the message that follows, as an unsigned 32-bit big-endian integer
+FRAME_HEADER: Final = struct.Struct("!I")
+
+# Version of the protocol, which servers record in their status file so that
+# clients know how to talk to them. Version 1 (no version recorded) only
+# supports a single message in each direction, without a FRAME_HEADER.
+IPC_PROTOCOL_VERSION: Final = 2
+
+
 class IPCException(Exception):
     """Exception for IPC issues."""
 
@@ -47,9 +63,18 @@ class IPCBase:
     def __init__(self, name: str, timeout: float | None) -> None:
         self.name = name
         self.timeout = timeout
+        # Data received after the last message that was read (only used on Unix)
+        self.buffer = bytearray()
+        # Whether messages have a FRAME_HEADER (only used on Unix). None means
+        # that this is detected from the first message received, since messages
+        # of older peers are JSON objects, which start with "{".
+        self.framed: bool | None = True
 
     def read(self, size: int = 100000) -> bytes:
-        """Read bytes from an IPC connection until its empty."""
+        """Read a single message from an IPC connection.
+
+        Return b"" if the connection was closed before a message was received.
+        """
         bdata = bytearray()
         if sys.platform == "win32":
             while True:
@@ -76,15 +101,42 @@ class IPCBase:
                 elif err == _winapi.ERROR_OPERATION_ABORTED:
                     raise IPCException("ReadFile operation aborted.")
         else:
+            if self.framed is None:
+                while not self.buffer:
+                    more = self.connection.recv(size)
+                    if not more:
+                        return b""
+                    self.buffer.extend(more)
+                self.framed = self.buffer[0] != ord("{")
+            if not self.framed:
+                # The message ends when the peer shuts down its write side.
+                bdata, self.buffer = self.buffer, bytearray()
+                while True:
+                    more = self.connection.recv(size)
+                    if not more:
+                        break
+                    bdata.extend(more)
+                return bytes(bdata)
+            header_size = FRAME_HEADER.size
             while True:
+                if len(self.buffer) >= header_size:
+                    (length,) = FRAME_HEADER.unpack_from(self.buffer)
+                    end = header_size + length
+                    if len(self.buffer) >= end:
+                        bdata = self.buffer[header_size:end]
+                        del self.buffer[:end]
+                        break
+                    size = max(size, end - len(self.buffer))
                 more = self.connection.recv(size)
                 if not more:
+                    if self.buffer:
+                        raise IPCException("Connection closed in the middle of a message")
                     break
-                bdata.extend(more)
+                self.buffer.extend(more)
         return bytes(bdata)
 
     def write(self, data: bytes) -> None:
-        """Write bytes to an IPC connection."""
+        """Write a single message to an IPC connection."""
         if sys.platform == "win32":
             try:
                 ov, err = _winapi.WriteFile(self.connection, data, overlapped=True)
@@ -104,9 +156,12 @@ class IPCBase:
                 assert bytes_written == len(data)
             except OSError as e:
                 raise IPCException(f"Failed to write with error: {e.winerror}") from e
-        else:
+        elif self.framed is False:
             self.connection.sendall(data)
             self.connection.shutdown(socket.SHUT_WR)
+        else:
+            self.connection.sendall(FRAME_HEADER.pack(len(data)))
+            self.connection.sendall(data)
 
     def close(self) -> None:
         if sys.platform == "win32":
@@ -117,10 +172,14 @@ class IPCBase:
 
 
 class IPCClient(IPCBase):
-    """The client side of an IPC connection."""
+    """The client side of an IPC connection.
 
-    def __init__(self, name: str, timeout: float | None) -> None:
+    Use framed=False to talk to a server that predates IPC_PROTOCOL_VERSION 2.
+    """
+
+    def __init__(self, name: str, timeout: float | None, framed: bool = True) -> None:
         super().__init__(name, timeout)
+        self.framed = framed
         if sys.platform == "win32":
             timeout = int(self.timeout * 1000) if self.timeout else _winapi.NMPWAIT_WAIT_FOREVER
             try:
@@ -232,6 +291,8 @@ class IPCServer(IPCBase):
                 self.connection, _ = self.sock.accept()
             except socket.timeout as e:
                 raise IPCException("The socket timed out") from e
+            self.buffer.clear()
+            self.framed = None
         return self
 
     def __exit__(
@@ -252,6 +313,27 @@ class IPCServer(IPCBase):
         else:
             self.close()
 
+    def accept(self) -> IPCBase:
+        """Accept a single connection (not supported on Windows).
+
+        Unlike using the server as a context manager, this allows handling
+        several connections at the same time. The caller must close the
+        returned connection.
+        """
+        assert sys.platform != "win32", "Concurrent connections need Unix sockets"
+        conn = IPCBase(self.name, self.timeout)
+        conn.framed = None
+        try:
+            conn.connection, _ = self.sock.accept()
+        except socket.timeout as e:
+            raise IPCException("The socket timed out") from e
+        return conn
+
+    def fileno(self) -> int:
+        """Return the file descriptor to wait on for new connections (only on Unix)."""
+        assert sys.platform != "win32", "Concurrent connections need Unix sockets"
+        return self.sock.fileno()
+
     def cleanup(self) -> None:
         if sys.platform == "win32":
             self.close()
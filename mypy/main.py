@@ -950,11 +950,50 @@ def process_options(
         help="Use a sqlite database to store the cache",
         group=incremental_group,
     )
+    add_invertible_flag(
+        "--sqlite-cache-wal",
+        default=False,
+        help="Use write-ahead logging for the sqlite cache, which makes writes faster"
+        " but doesn't work on network file systems",
+        group=incremental_group,
+    )
+    add_invertible_flag(
+        "--binary-cache",
+        default=False,
+        help="Use a compact binary format for cache data files instead of JSON",
+        group=incremental_group,
+    )
+    incremental_group.add_argument(
+        "--cache-bundle",
+        metavar="FILE",
+        help="Use cache entries from a read-only bundle file (see misc/convert-cache.py), "
+        "storing any changes in the cache directory",
+    )
+    incremental_group.add_argument(
+        "--hash-algorithm",
+        choices=util.HASH_ALGORITHMS,
+        help="Hash algorithm used to detect changed files and interfaces (default: sha256; "
+        "xxh3 requires the xxhash package)",
+    )
     incremental_group.add_argument(
         "--cache-fine-grained",
         action="store_true",
         help="Include fine-grained dependency information in the cache for the mypy daemon",
     )
+    incremental_group.add_argument(
+        "--fine-grained-deps-index",
+        action="store_true",
+        help="Store fine-grained dependencies in a single index that the mypy daemon"
+        " can query by trigger",
+    )
+    incremental_group.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        metavar="N",
+        help="Type check independent modules in N worker processes, "
+        "exchanging results through the cache (default: 1)",
+    )
     incremental_group.add_argument(
         "--skip-version-check",
         action="store_true",
@@ -1091,6 +1130,33 @@ def process_options(
             action="store_true",
             help="Use the cache in fine-grained incremental mode",
         )
+        other_group.add_argument(
+            "--use-inotify",
+            action="store_true",
+            help="Use inotify events to find changed files instead of polling"
+            " (Linux only, falls back to polling elsewhere)",
+        )
+        other_group.add_argument(
+            "--batch-updates",
+            action="store_true",
+            help="Process all changed files before propagating their changes, so that"
+            " affected code is only checked once",
+        )
+        other_group.add_argument(
+            "--rebuild-threshold",
+            type=int,
+            metavar="N",
+            help="Check everything with a full build when more than N files have changed"
+            " (default: half of the files, but at least 100; not supported with"
+            " --follow-imports=normal)",
+        )
+        other_group.add_argument(
+            "--memory-budget",
+            type=int,
+            metavar="MIB",
+            help="Evict cold modules loaded from the cache when the daemon uses more"
+            " than MIB megabytes (needs --use-fine-grained-cache)",
+        )
 
     # hidden options
     parser.add_argument(
@@ -1102,6 +1168,12 @@ def process_options(
     parser.add_argument("--dump-build-stats", action="store_true", help=argparse.SUPPRESS)
     # Dump timing stats for each processed file into the given output file
     parser.add_argument("--timing-stats", dest="timing_stats", help=argparse.SUPPRESS)
+    # Write a profile of the time spent in each build phase of each module or SCC,
+    # in Chrome trace event format, to the given file.
+    parser.add_argument("--build-profile", dest="build_profile", help=argparse.SUPPRESS)
+    # Share common types, such as instances of builtins.str, between modules loaded from
+    # the cache, to reduce memory use (see mypy.types.TypeInterner).
+    parser.add_argument("--intern-types", action="store_true", help=argparse.SUPPRESS)
     # Dump per line type checking timing stats for each processed file into the given
     # output file. Only total time spent in each top level expression will be shown.
     # Times are show in microseconds.
@@ -1362,9 +1434,22 @@ def process_options(
     if special_opts.cache_map:
         if options.sqlite_cache:
             parser.error("--cache-map is incompatible with --sqlite-cache")
+        if options.binary_cache:
+            parser.error("--cache-map is incompatible with --binary-cache")
+        if options.cache_bundle:
+            parser.error("--cache-map is incompatible with --cache-bundle")
 
         process_cache_map(parser, special_opts, options)
 
+    if options.jobs < 1:
+        parser.error("--jobs must be a positive integer")
+
+    if options.hash_algorithm == "xxh3":
+        try:
+            import xxhash  # type: ignore[import, unused-ignore]  # noqa: F401
+        except ImportError:
+            parser.error("--hash-algorithm=xxh3 requires the xxhash package")
+
     # An explicitly specified cache_fine_grained implies local_partial_types
     # (because otherwise the cache is not compatible with dmypy)
     if options.cache_fine_grained:
@@ -12,7 +12,7 @@ from collections import defaultdict
 from typing import Dict, Iterable, cast
 
 from mypy.nodes import FakeInfo, Node
-from mypy.types import Type
+from mypy.types import Type, type_interner
 from mypy.util import get_class_descriptors
 
 
@@ -88,6 +88,15 @@ def print_memory_profile(run_gc: bool = True) -> None:
     print()
     print("Mem usage RSS   ", system_memuse // 1024)
     print("Total reachable ", totalmem // 1024)
+    if type_interner.enabled:
+        # Estimate the memory saved by sharing types using the average size of each kind.
+        saved = sum(
+            count * memuse[n] // freqs[n]
+            for n, count in type_interner.reused.items()
+            if n in freqs
+        )
+        print("Interned types  ", type_interner.size())
+        print("Interning saved ", saved // 1024)
 
 
 def find_recursive_objects(objs: list[object]) -> None:
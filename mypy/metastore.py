@@ -6,15 +6,22 @@ We provide two implementations.
  * A hokey sqlite backed implementation, which basically simulates
    the file system in an effort to work around poor file system performance
    on OS X.
+
+Additionally, a read-only cache bundle (a single packed file, typically
+produced by a reference build in CI) can be layered below either of these
+(see LayeredMetadataStore).
 """
 
 from __future__ import annotations
 
 import binascii
+import json
+import mmap
 import os
+import struct
 import time
 from abc import abstractmethod
-from typing import TYPE_CHECKING, Any, Iterable
+from typing import TYPE_CHECKING, Any, Final, Iterable, Mapping
 
 if TYPE_CHECKING:
     # We avoid importing sqlite3 unless we are using it so we can mostly work
@@ -49,10 +56,61 @@ class MetadataStore:
         Returns True if the entry is successfully written, False otherwise.
         """
 
+    @abstractmethod
+    def read_bytes(self, name: str) -> bytes:
+        """Read the contents of a binary metadata entry.
+
+        Raises FileNotFound if the entry does not exist.
+        """
+
+    @abstractmethod
+    def write_bytes(self, name: str, data: bytes, mtime: float | None = None) -> bool:
+        """Write a binary metadata entry (see write())."""
+
     @abstractmethod
     def remove(self, name: str) -> None:
         """Delete a metadata entry"""
 
+    def read_many(self, names: Iterable[str]) -> dict[str, str]:
+        """Read the contents of several metadata entries.
+
+        Entries that don't exist are omitted from the result.
+        """
+        result = {}
+        for name in names:
+            try:
+                result[name] = self.read(name)
+            except OSError:
+                pass
+        return result
+
+    def getmtime_many(self, names: Iterable[str]) -> dict[str, float]:
+        """Read the mtimes of several metadata entries (see read_many())."""
+        result = {}
+        for name in names:
+            try:
+                result[name] = self.getmtime(name)
+            except OSError:
+                pass
+        return result
+
+    def write_many(self, entries: Mapping[str, str], mtime: float | None = None) -> set[str]:
+        """Write several metadata entries (see write()).
+
+        Returns the names of the entries that were successfully written.
+        """
+        return {name for name, data in entries.items() if self.write(name, data, mtime)}
+
+    def prefetch(self, names: Iterable[str]) -> None:
+        """Start loading metadata entries that will be read soon.
+
+        This is only a hint; entries that don't exist are ignored.
+        """
+
+    def thread_safe(self) -> bool:
+        """Can entries be read from threads other than the one that created the store?"""
+        return False
+
     @abstractmethod
     def commit(self) -> None:
         """If the backing store requires a commit, do it.
@@ -71,8 +129,15 @@ def random_string() -> str:
     return binascii.hexlify(os.urandom(8)).decode("ascii")
 
 
+# Minimum number of files to read in a thread pool in FilesystemMetadataStore.prefetch()
+PARALLEL_READ_THRESHOLD: Final = 16
+
+
 class FilesystemMetadataStore(MetadataStore):
     def __init__(self, cache_dir_prefix: str) -> None:
+        # Contents of entries read by prefetch(). Entries are dropped once
+        # used or modified, so they never go stale.
+        self._prefetched_data: dict[str, str] = {}
         # We check startswith instead of equality because the version
         # will have already been appended by the time the cache dir is
         # passed here.
@@ -93,20 +158,38 @@ class FilesystemMetadataStore(MetadataStore):
         if not self.cache_dir_prefix:
             raise FileNotFoundError()
 
+        if name in self._prefetched_data:
+            return self._prefetched_data.pop(name)
         with open(os.path.join(self.cache_dir_prefix, name)) as f:
             return f.read()
 
+    def read_bytes(self, name: str) -> bytes:
+        assert os.path.normpath(name) != os.path.abspath(name), "Don't use absolute paths!"
+
+        if not self.cache_dir_prefix:
+            raise FileNotFoundError()
+
+        with open(os.path.join(self.cache_dir_prefix, name), "rb") as f:
+            return f.read()
+
     def write(self, name: str, data: str, mtime: float | None = None) -> bool:
+        return self._write(name, data, "w", mtime)
+
+    def write_bytes(self, name: str, data: bytes, mtime: float | None = None) -> bool:
+        return self._write(name, data, "wb", mtime)
+
+    def _write(self, name: str, data: str | bytes, mode: str, mtime: float | None) -> bool:
         assert os.path.normpath(name) != os.path.abspath(name), "Don't use absolute paths!"
 
         if not self.cache_dir_prefix:
             return False
 
+        self._prefetched_data.pop(name, None)
         path = os.path.join(self.cache_dir_prefix, name)
         tmp_filename = path + "." + random_string()
         try:
             os.makedirs(os.path.dirname(path), exist_ok=True)
-            with open(tmp_filename, "w") as f:
+            with open(tmp_filename, mode) as f:
                 f.write(data)
             os.replace(tmp_filename, path)
             if mtime is not None:
@@ -120,8 +203,41 @@ class FilesystemMetadataStore(MetadataStore):
         if not self.cache_dir_prefix:
             raise FileNotFoundError()
 
+        self._prefetched_data.pop(name, None)
         os.remove(os.path.join(self.cache_dir_prefix, name))
 
+    def prefetch(self, names: Iterable[str]) -> None:
+        """Read entries in a thread pool.
+
+        Reading files releases the GIL, so this is much faster than reading
+        them one by one when they aren't in the OS page cache (for example,
+        when the daemon starts after a reboot).
+        """
+        if not self.cache_dir_prefix:
+            return
+        names = [name for name in names if name not in self._prefetched_data]
+        if len(names) < PARALLEL_READ_THRESHOLD:
+            return
+
+        # Lazy import to speed up startup
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor() as executor:
+            for name, data in zip(names, executor.map(self._read_or_none, names)):
+                if data is not None:
+                    self._prefetched_data[name] = data
+
+    def _read_or_none(self, name: str) -> str | None:
+        assert self.cache_dir_prefix
+        try:
+            with open(os.path.join(self.cache_dir_prefix, name)) as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def thread_safe(self) -> bool:
+        return True
+
     def commit(self) -> None:
         pass
 
@@ -143,14 +259,25 @@ CREATE TABLE IF NOT EXISTS files (
 );
 CREATE INDEX IF NOT EXISTS path_idx on files(path);
 """
+# Write-ahead logging makes commits much cheaper, and lets readers (such as
+# other mypy processes) proceed while a build is writing the cache. It needs
+# shared memory, so it doesn't work on network file systems and is opt-in.
+WAL_PRAGMAS = """
+PRAGMA journal_mode=WAL;
+PRAGMA synchronous=NORMAL;
+"""
+# Stay below the default SQLITE_MAX_VARIABLE_NUMBER of older sqlite versions.
+MAX_QUERY_PARAMS: Final = 900
 # No migrations yet
 MIGRATIONS: list[str] = []
 
 
-def connect_db(db_file: str) -> sqlite3.Connection:
+def connect_db(db_file: str, wal: bool = False) -> sqlite3.Connection:
     import sqlite3.dbapi2
 
     db = sqlite3.dbapi2.connect(db_file)
+    if wal:
+        db.executescript(WAL_PRAGMAS)
     db.executescript(SCHEMA)
     for migr in MIGRATIONS:
         try:
@@ -161,7 +288,15 @@ def connect_db(db_file: str) -> sqlite3.Connection:
 
 
 class SqliteMetadataStore(MetadataStore):
-    def __init__(self, cache_dir_prefix: str) -> None:
+    def __init__(self, cache_dir_prefix: str, wal: bool = False) -> None:
+        # Contents of meta files and mtimes of all entries, which are loaded
+        # with a single query on first access (see _prefetch()). Entries are
+        # dropped once used or modified by us, and all of them are dropped if
+        # another connection commits changes (see _check_prefetched()).
+        self._prefetched_data: dict[str, str] | None = None
+        self._prefetched_mtimes: dict[str, float] | None = None
+        # The data_version of the database when the entries were prefetched.
+        self._prefetched_version = 0
         # We check startswith instead of equality because the version
         # will have already been appended by the time the cache dir is
         # passed here.
@@ -170,7 +305,55 @@ class SqliteMetadataStore(MetadataStore):
             return
 
         os.makedirs(cache_dir_prefix, exist_ok=True)
-        self.db = connect_db(os.path.join(cache_dir_prefix, "cache.db"))
+        self.db = connect_db(os.path.join(cache_dir_prefix, "cache.db"), wal)
+
+    def _prefetch(self) -> None:
+        """Load all meta files and mtimes at once.
+
+        Meta files (and the mtimes of data files) of all modules in a build
+        are needed to check whether the cache is fresh, so this is much faster
+        than querying for each one separately.
+        """
+        assert self.db is not None
+        self._prefetched_data = {}
+        self._prefetched_mtimes = {}
+        # Query the version first, so that commits racing with the query are noticed.
+        self._prefetched_version = self._data_version()
+        cur = self.db.execute(
+            "SELECT path, mtime, CASE WHEN path LIKE '%.meta.json' THEN data END FROM files"
+        )
+        for path, mtime, data in cur:
+            self._prefetched_mtimes[path] = mtime
+            if data is not None:
+                self._prefetched_data[path] = data
+
+    def _data_version(self) -> int:
+        assert self.db is not None
+        version = self.db.execute("PRAGMA data_version").fetchone()[0]
+        assert isinstance(version, int)
+        return version
+
+    def _check_prefetched(self) -> None:
+        """Prefetch entries on first use, and drop them once they may be stale.
+
+        The data_version of a database changes whenever another connection (for
+        example, another mypy process sharing the cache) commits changes to it.
+        """
+        if not self.db:
+            return
+        if self._prefetched_data is None or self._prefetched_mtimes is None:
+            self._prefetch()
+        elif (
+            self._prefetched_data or self._prefetched_mtimes
+        ) and self._data_version() != self._prefetched_version:
+            self._prefetched_data.clear()
+            self._prefetched_mtimes.clear()
+
+    def _forget(self, name: str) -> None:
+        if self._prefetched_data is not None:
+            self._prefetched_data.pop(name, None)
+        if self._prefetched_mtimes is not None:
+            self._prefetched_mtimes.pop(name, None)
 
     def _query(self, name: str, field: str) -> Any:
         # Raises FileNotFound for consistency with the file system version
@@ -184,36 +367,86 @@ class SqliteMetadataStore(MetadataStore):
         assert len(results) == 1
         return results[0][0]
 
+    def _query_many(self, names: Iterable[str], field: str) -> dict[str, Any]:
+        if not self.db:
+            return {}
+        names = list(names)
+        result: dict[str, Any] = {}
+        for i in range(0, len(names), MAX_QUERY_PARAMS):
+            chunk = names[i : i + MAX_QUERY_PARAMS]
+            placeholders = ",".join("?" * len(chunk))
+            cur = self.db.execute(
+                f"SELECT path, {field} FROM files WHERE path IN ({placeholders})", chunk
+            )
+            result.update(cur.fetchall())
+        return result
+
     def getmtime(self, name: str) -> float:
-        mtime = self._query(name, "mtime")
+        self._check_prefetched()
+        if self._prefetched_mtimes is not None and name in self._prefetched_mtimes:
+            mtime = self._prefetched_mtimes.pop(name)
+        else:
+            mtime = self._query(name, "mtime")
         assert isinstance(mtime, float)
         return mtime
 
     def read(self, name: str) -> str:
-        data = self._query(name, "data")
+        self._check_prefetched()
+        if self._prefetched_data is not None and name in self._prefetched_data:
+            data = self._prefetched_data.pop(name)
+        else:
+            data = self._query(name, "data")
         assert isinstance(data, str)
         return data
 
+    def read_bytes(self, name: str) -> bytes:
+        data = self._query(name, "data")
+        assert isinstance(data, bytes)
+        return data
+
+    def read_many(self, names: Iterable[str]) -> dict[str, str]:
+        return self._query_many(names, "data")
+
+    def getmtime_many(self, names: Iterable[str]) -> dict[str, float]:
+        return self._query_many(names, "mtime")
+
     def write(self, name: str, data: str, mtime: float | None = None) -> bool:
+        return self._write(name, data, mtime)
+
+    def write_bytes(self, name: str, data: bytes, mtime: float | None = None) -> bool:
+        # Bytes are stored as a BLOB, despite the declared column type.
+        return self._write(name, data, mtime)
+
+    def _write(self, name: str, data: str | bytes, mtime: float | None) -> bool:
+        return bool(self._write_rows([(name, data)], mtime))
+
+    def write_many(self, entries: Mapping[str, str], mtime: float | None = None) -> set[str]:
+        return self._write_rows(list(entries.items()), mtime)
+
+    def _write_rows(self, rows: list[tuple[str, str | bytes]], mtime: float | None) -> set[str]:
         import sqlite3
 
         if not self.db:
-            return False
+            return set()
+        if mtime is None:
+            mtime = time.time()
         try:
-            if mtime is None:
-                mtime = time.time()
-            self.db.execute(
+            # Note that sqlite3 caches the prepared statement.
+            self.db.executemany(
                 "INSERT OR REPLACE INTO files(path, mtime, data) VALUES(?, ?, ?)",
-                (name, mtime, data),
+                [(name, mtime, data) for name, data in rows],
             )
         except sqlite3.OperationalError:
-            return False
-        return True
+            return set()
+        for name, _ in rows:
+            self._forget(name)
+        return {name for name, _ in rows}
 
     def remove(self, name: str) -> None:
         if not self.db:
             raise FileNotFoundError()
 
+        self._forget(name)
         self.db.execute("DELETE FROM files WHERE path = ?", (name,))
 
     def commit(self) -> None:
@@ -224,3 +457,189 @@ class SqliteMetadataStore(MetadataStore):
         if self.db:
             for row in self.db.execute("SELECT path FROM files"):
                 yield row[0]
+
+
+# Prefix identifying cache bundle files (and the format version).
+BUNDLE_MAGIC: Final = b"\x93mypy-bundle\x01"
+
+# The bundle header is the magic followed by the size of the index.
+BUNDLE_HEADER: Final = struct.Struct(f"<{len(BUNDLE_MAGIC)}sQ")
+
+
+def write_cache_bundle(store: MetadataStore, path: str) -> int:
+    """Pack all entries of store into a cache bundle file.
+
+    The bundle consists of a header, a JSON index mapping entry names to
+    their [offset, size, mtime] and the contents of all entries.
+
+    Returns the number of entries.
+    """
+    entries = {}
+    for name in store.list_all():
+        data = store.read_bytes(name) if name.endswith(".bin") else store.read(name).encode()
+        # Names from list_all() may be prefixed with "./".
+        entries[os.path.normpath(name)] = (data, store.getmtime(name))
+    write_bundle(entries, path)
+    return len(entries)
+
+
+def write_bundle(entries: Mapping[str, tuple[bytes, float]], path: str) -> None:
+    """Write a cache bundle file with the given contents and mtimes of entries."""
+    index: dict[str, list[float]] = {}
+    contents = []
+    offset = 0
+    for name in sorted(entries):
+        data, mtime = entries[name]
+        index[name] = [offset, len(data), mtime]
+        contents.append(data)
+        offset += len(data)
+    index_data = json.dumps(index, separators=(",", ":")).encode()
+    tmp_filename = path + "." + random_string()
+    with open(tmp_filename, "wb") as f:
+        f.write(BUNDLE_HEADER.pack(BUNDLE_MAGIC, len(index_data)))
+        f.write(index_data)
+        for data in contents:
+            f.write(data)
+    os.replace(tmp_filename, path)
+
+
+class BundleMetadataStore(MetadataStore):
+    """Read-only store backed by a memory-mapped cache bundle file.
+
+    Writes always fail, so this is only useful as the base of a
+    LayeredMetadataStore.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.index: dict[str, list[float]] = {}
+        self.mmap: mmap.mmap | None = None
+        self.data_start = 0
+        try:
+            with open(path, "rb") as f:
+                if os.fstat(f.fileno()).st_size < BUNDLE_HEADER.size:
+                    return
+                self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except OSError:
+            # A missing bundle is the same as an empty one.
+            return
+        magic, index_size = BUNDLE_HEADER.unpack_from(self.mmap)
+        if magic != BUNDLE_MAGIC:
+            self.mmap = None
+            return
+        start = BUNDLE_HEADER.size
+        self.index = json.loads(self.mmap[start : start + index_size])
+        self.data_start = start + index_size
+
+    def _entry(self, name: str) -> list[float]:
+        entry = self.index.get(os.path.normpath(name))
+        if entry is None:
+            raise FileNotFoundError()
+        return entry
+
+    def getmtime(self, name: str) -> float:
+        return self._entry(name)[2]
+
+    def read(self, name: str) -> str:
+        return self.read_bytes(name).decode()
+
+    def read_bytes(self, name: str) -> bytes:
+        offset, size, _ = self._entry(name)
+        assert self.mmap is not None
+        start = self.data_start + int(offset)
+        return self.mmap[start : start + int(size)]
+
+    def write(self, name: str, data: str, mtime: float | None = None) -> bool:
+        return False
+
+    def write_bytes(self, name: str, data: bytes, mtime: float | None = None) -> bool:
+        return False
+
+    def remove(self, name: str) -> None:
+        raise FileNotFoundError()
+
+    def thread_safe(self) -> bool:
+        return True
+
+    def commit(self) -> None:
+        pass
+
+    def list_all(self) -> Iterable[str]:
+        return iter(self.index)
+
+
+class LayeredMetadataStore(MetadataStore):
+    """A writable overlay store on top of a read-only base store.
+
+    Entries are looked up in the overlay first. All changes go to the
+    overlay, so the base (usually a BundleMetadataStore) is never modified.
+    Cache entries in the base can still be used after the source files have
+    been touched, since validate_meta() accepts entries with matching hashes
+    and then writes updated meta files to the overlay.
+    """
+
+    def __init__(self, base: MetadataStore, overlay: MetadataStore) -> None:
+        self.base = base
+        self.overlay = overlay
+        # Entries removed during this build. They can't be removed from the
+        # base, but since mypy compares data file mtimes, base entries that
+        # are used again in a later build are correctly seen as older than
+        # everything written to the overlay.
+        self.removed: set[str] = set()
+
+    def getmtime(self, name: str) -> float:
+        try:
+            return self.overlay.getmtime(name)
+        except FileNotFoundError:
+            if name in self.removed:
+                raise
+            return self.base.getmtime(name)
+
+    def read(self, name: str) -> str:
+        try:
+            return self.overlay.read(name)
+        except FileNotFoundError:
+            if name in self.removed:
+                raise
+            return self.base.read(name)
+
+    def read_bytes(self, name: str) -> bytes:
+        try:
+            return self.overlay.read_bytes(name)
+        except FileNotFoundError:
+            if name in self.removed:
+                raise
+            return self.base.read_bytes(name)
+
+    def write(self, name: str, data: str, mtime: float | None = None) -> bool:
+        self.removed.discard(name)
+        return self.overlay.write(name, data, mtime)
+
+    def write_bytes(self, name: str, data: bytes, mtime: float | None = None) -> bool:
+        self.removed.discard(name)
+        return self.overlay.write_bytes(name, data, mtime)
+
+    def remove(self, name: str) -> None:
+        self.removed.add(name)
+        try:
+            self.overlay.remove(name)
+        except FileNotFoundError:
+            pass
+
+    def prefetch(self, names: Iterable[str]) -> None:
+        # The base is memory-mapped, so there is nothing to gain there.
+        self.overlay.prefetch(names)
+
+    def thread_safe(self) -> bool:
+        return self.base.thread_safe() and self.overlay.thread_safe()
+
+    def commit(self) -> None:
+        self.overlay.commit()
+
+    def list_all(self) -> Iterable[str]:
+        seen = set()
+        for name in self.overlay.list_all():
+            seen.add(os.path.normpath(name))
+            yield name
+        for name in self.base.list_all():
+            if name not in seen and name not in self.removed:
+                yield name
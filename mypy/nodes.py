@@ -3,7 +3,7 @@
 from __future__ import annotations
 
 import os
-from abc import abstractmethod
+from abc import ABCMeta, abstractmethod
 from collections import defaultdict
 from enum import Enum, unique
 from typing import (
@@ -394,11 +394,16 @@ class MypyFile(SymbolNode):
         }
 
     @classmethod
-    def deserialize(cls, data: JsonDict) -> MypyFile:
+    def deserialize(cls, data: JsonDict, lazy: bool = False) -> MypyFile:
+        """Deserialize a module.
+
+        If lazy is True, module-level definitions are only deserialized
+        when they are first accessed, after fixup_module(..., lazy=True).
+        """
         assert data[".class"] == "MypyFile", data
         tree = MypyFile([], [])
         tree._fullname = data["_fullname"]
-        tree.names = SymbolTable.deserialize(data["names"])
+        tree.names = SymbolTable.deserialize(data["names"], lazy)
         tree.is_stub = data["is_stub"]
         tree.path = data["path"]
         tree.is_partial_stub_package = data["is_partial_stub_package"]
@@ -3765,13 +3770,15 @@ class SymbolTableNode:
 
     __slots__ = (
         "kind",
-        "node",
+        "_node",
         "module_public",
         "module_hidden",
         "cross_ref",
         "implicit",
         "plugin_generated",
         "no_serialize",
+        "_lazy_data",
+        "_loader",
     )
 
     def __init__(
@@ -3786,13 +3793,48 @@ class SymbolTableNode:
         no_serialize: bool = False,
     ) -> None:
         self.kind = kind
-        self.node = node
+        self._node = node
         self.module_public = module_public
         self.implicit = implicit
         self.module_hidden = module_hidden
         self.cross_ref: str | None = None
         self.plugin_generated = plugin_generated
         self.no_serialize = no_serialize
+        # Serialized node that hasn't been deserialized yet (see deserialize()).
+        self._lazy_data: JsonDict | None = None
+        # Used to complete a node that was deferred during cache loading.
+        self._loader: SymbolTableNodeLoader | None = None
+
+    @property
+    def node(self) -> SymbolNode | None:
+        if self._loader is not None:
+            self._load()
+        return self._node
+
+    @node.setter
+    def node(self, node: SymbolNode | None) -> None:
+        self._node = node
+        self._lazy_data = None
+        self._loader = None
+
+    def _load(self) -> None:
+        loader = self._loader
+        assert loader is not None
+        data = self._lazy_data
+        # Drop the serialized data before loading, so that it isn't kept alive
+        # once the node exists (also if loading fails).
+        self._loader = None
+        self._lazy_data = None
+        loader.load(self, data)
+
+    def is_deferred(self) -> bool:
+        """Is this a deserialized node that hasn't been loaded and fixed up yet?"""
+        return self._lazy_data is not None or self.cross_ref is not None
+
+    def defer_loading(self, loader: SymbolTableNodeLoader) -> None:
+        """Complete a deferred node using loader on first access of the node attribute."""
+        assert self.is_deferred()
+        self._loader = loader
 
     @property
     def fullname(self) -> str | None:
@@ -3863,13 +3905,22 @@ class SymbolTableNode:
         return data
 
     @classmethod
-    def deserialize(cls, data: JsonDict) -> SymbolTableNode:
+    def deserialize(cls, data: JsonDict, lazy: bool = False) -> SymbolTableNode:
+        """Deserialize a SymbolTableNode.
+
+        If lazy is True, the node itself is kept in serialized form until
+        it is needed (see mypy.fixup.fixup_module()).
+        """
         assert data[".class"] == "SymbolTableNode"
         kind = inverse_node_kinds[data["kind"]]
         if "cross_ref" in data:
             # This will be fixed up later.
             stnode = SymbolTableNode(kind, None)
             stnode.cross_ref = data["cross_ref"]
+        elif lazy:
+            assert "node" in data, data
+            stnode = SymbolTableNode(kind, None)
+            stnode._lazy_data = data["node"]
         else:
             assert "node" in data, data
             node = SymbolNode.deserialize(data["node"])
@@ -3926,15 +3977,28 @@ class SymbolTable(Dict[str, SymbolTableNode]):
         return data
 
     @classmethod
-    def deserialize(cls, data: JsonDict) -> SymbolTable:
+    def deserialize(cls, data: JsonDict, lazy: bool = False) -> SymbolTable:
         assert data[".class"] == "SymbolTable"
         st = SymbolTable()
         for key, value in data.items():
             if key != ".class":
-                st[key] = SymbolTableNode.deserialize(value)
+                st[key] = SymbolTableNode.deserialize(value, lazy)
         return st
 
 
+class SymbolTableNodeLoader(metaclass=ABCMeta):
+    """Completes deferred symbol table nodes (see SymbolTableNode.defer_loading()).
+
+    The implementation lives in mypy.fixup.
+    """
+
+    __slots__ = ()
+
+    @abstractmethod
+    def load(self, stnode: SymbolTableNode, data: JsonDict | None) -> None:
+        """Deserialize data (if not None) as the node of stnode, and fix it up."""
+
+
 class DataclassTransformSpec:
     """Specifies how a dataclass-like transform should be applied. The fields here are based on the
     parameters accepted by `typing.dataclass_transform`."""
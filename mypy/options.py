@@ -252,6 +252,14 @@ class Options:
         self.incremental = True
         self.cache_dir = defaults.CACHE_DIR
         self.sqlite_cache = False
+        # Use write-ahead logging for the sqlite cache (not on network file systems)
+        self.sqlite_cache_wal = False
+        # Store cache data files in a binary format instead of JSON
+        self.binary_cache = False
+        # Read-only cache bundle file to use below the cache directory
+        self.cache_bundle: str | None = None
+        # Algorithm used for source and interface hashes (see mypy.util.hash_digest)
+        self.hash_algorithm = "sha256"
         self.debug_cache = False
         self.skip_version_check = False
         self.skip_cache_mtime_checks = False
@@ -260,6 +268,23 @@ class Options:
         self.cache_fine_grained = False
         # Read cache files in fine-grained incremental mode (cache must include dependencies)
         self.use_fine_grained_cache = False
+        # Store fine-grained dependencies in an index that can be queried by trigger
+        self.fine_grained_deps_index = False
+        # Use inotify events to find changed files in the daemon (Linux only)
+        self.use_inotify = False
+        # Propagate the changes of all changed modules at once in the daemon, instead of
+        # after processing each changed module
+        self.batch_updates = False
+        # Do a full build instead of a fine-grained update in the daemon when more files
+        # than this have changed (if None, this depends on the number of files, see
+        # mypy.dmypy_server.get_rebuild_threshold)
+        self.rebuild_threshold: int | None = None
+        # Memory budget of the daemon in MiB; above it, the trees of cold modules loaded
+        # from the fine-grained cache are evicted
+        self.memory_budget: int | None = None
+        # Number of worker processes used to type check independent modules
+        # (only effective in incremental mode, see build.warm_cache_in_parallel)
+        self.jobs = 1
 
         # Run tree.serialize() even if cache generation is disabled
         self.debug_serialize = False
@@ -298,6 +323,10 @@ class Options:
         self.enable_incomplete_features = False  # deprecated
         self.enable_incomplete_feature: list[str] = []
         self.timing_stats: str | None = None
+        # Write a profile of the build phases (in Chrome trace format) to this file
+        self.build_profile: str | None = None
+        # Share common types deserialized from the cache between modules
+        self.intern_types = False
         self.line_checking_stats: str | None = None
 
         # -- test options --
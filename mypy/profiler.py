@@ -0,0 +1,98 @@
+"""Profiler for the phases of a build.
+
+This is enabled by --build-profile FILE. It records how long each build
+phase (parsing, semantic analysis, type checking passes, cache loading,
+fixup and cache writing) takes for each module or SCC, and counts events
+such as deferred nodes and type checking passes.
+
+The result is written in the Chrome trace event format, which can be
+viewed using chrome://tracing or https://ui.perfetto.dev. The file also
+includes a per-module summary of the time spent in each phase, which is
+easy to compare between builds to track regressions.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from collections import defaultdict
+from typing import Any, Final
+
+from mypy.util import time_ref
+
+# Categories of trace events.
+MODULE: Final = "module"
+SCC: Final = "scc"
+
+
+class BuildProfiler:
+    """Collect trace events for the phases of a build.
+
+    Times are given as time_ref() values, in nanoseconds.
+    """
+
+    def __init__(self) -> None:
+        self.start = time_ref()
+        self.pid = os.getpid()
+        self.events: list[dict[str, Any]] = []
+        # Time spent in each phase of each module, in microseconds
+        self.module_times: dict[str, dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        self.counters: dict[str, int] = defaultdict(int)
+
+    def record(
+        self, phase: str, t0: int, module: str | None = None, scc: list[str] | None = None
+    ) -> None:
+        """Record that phase started at t0 and ended now.
+
+        A phase of a single module should give module, while a phase that
+        processes a whole SCC should give its modules as scc.
+        """
+        t1 = time_ref()
+        dur = (t1 - t0) / 1000
+        event: dict[str, Any] = {
+            "name": phase,
+            "cat": SCC if scc is not None else MODULE,
+            "ph": "X",
+            "ts": (t0 - self.start) / 1000,
+            "dur": dur,
+            "pid": self.pid,
+            "tid": 0,
+        }
+        if module is not None:
+            event["name"] = f"{phase} {module}"
+            event["args"] = {"module": module}
+            self.module_times[module][phase] += dur
+        elif scc is not None:
+            event["args"] = {"modules": sorted(scc)}
+        self.events.append(event)
+
+    def count(self, name: str, n: int = 1) -> None:
+        """Increment a counter (emitted as a counter event)."""
+        self.counters[name] += n
+        self.events.append(
+            {
+                "name": name,
+                "ph": "C",
+                "ts": (time_ref() - self.start) / 1000,
+                "pid": self.pid,
+                "tid": 0,
+                "args": {name: self.counters[name]},
+            }
+        )
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        """Return the time spent in each phase for each module (in microseconds)."""
+        return {
+            module: {phase: round(us, 1) for phase, us in sorted(times.items())}
+            for module, times in sorted(self.module_times.items())
+        }
+
+    def write_chrome_trace(self, path: str) -> None:
+        data = {
+            "traceEvents": self.events,
+            "displayTimeUnit": "ms",
+            "otherData": {"counters": dict(sorted(self.counters.items()))},
+            "moduleSummary": self.summary(),
+        }
+        with open(path, "w") as f:
+            json.dump(data, f, separators=(",", ":"))
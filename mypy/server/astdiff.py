@@ -16,6 +16,10 @@ A summary of the module contents:
   module id and returns fully qualified names of differences (which act as
   triggers).
 
+* SymbolTableSnapshots keeps the latest snapshot of each module, so that
+  a new snapshot only needs to recompute the entries of the definitions that
+  were processed again, and only those entries need to be compared.
+
 To compare two versions of a module symbol table, take snapshots of both
 versions and compare the snapshots. The use of snapshots makes it easy to
 compare two versions of the *same* symbol table that is being mutated.
@@ -52,7 +56,7 @@ Summary of how this works for certain kinds of differences:
 
 from __future__ import annotations
 
-from typing import Sequence, Tuple, Union
+from typing import AbstractSet, Sequence, Tuple, Union
 from typing_extensions import TypeAlias as _TypeAlias
 
 from mypy.expandtype import expand_type
@@ -67,6 +71,7 @@ from mypy.nodes import (
     ParamSpecExpr,
     SymbolNode,
     SymbolTable,
+    SymbolTableNode,
     TypeAlias,
     TypeInfo,
     TypeVarExpr,
@@ -120,7 +125,10 @@ SymbolSnapshot: _TypeAlias = Tuple[object, ...]
 
 
 def compare_symbol_table_snapshots(
-    name_prefix: str, snapshot1: dict[str, SymbolSnapshot], snapshot2: dict[str, SymbolSnapshot]
+    name_prefix: str,
+    snapshot1: dict[str, SymbolSnapshot],
+    snapshot2: dict[str, SymbolSnapshot],
+    names: AbstractSet[str] | None = None,
 ) -> set[str]:
     """Return names that are different in two snapshots of a symbol table.
 
@@ -129,8 +137,14 @@ def compare_symbol_table_snapshots(
 
     Recurse into class symbol tables (if the class is defined in the target module).
 
+    If names is given, only compare these (top-level) entries; the caller knows that
+    other entries are the same in both snapshots.
+
     Return a set of fully-qualified names (e.g., 'mod.func' or 'mod.Class.method').
     """
+    if names is not None:
+        snapshot1 = {name: snapshot1[name] for name in names if name in snapshot1}
+        snapshot2 = {name: snapshot2[name] for name in names if name in snapshot2}
     # Find names only defined only in one version.
     names1 = {f"{name_prefix}.{name}" for name in snapshot1}
     names2 = {f"{name_prefix}.{name}" for name in snapshot2}
@@ -172,56 +186,58 @@ def snapshot_symbol_table(name_prefix: str, table: SymbolTable) -> dict[str, Sym
     things defined in other modules are represented just by the names of
     the targets.
     """
-    result: dict[str, SymbolSnapshot] = {}
-    for name, symbol in table.items():
-        node = symbol.node
-        # TODO: cross_ref?
-        fullname = node.fullname if node else None
-        common = (fullname, symbol.kind, symbol.module_public)
-        if isinstance(node, MypyFile):
-            # This is a cross-reference to another module.
-            # If the reference is busted because the other module is missing,
-            # the node will be a "stale_info" TypeInfo produced by fixup,
-            # but that doesn't really matter to us here.
-            result[name] = ("Moduleref", common)
-        elif isinstance(node, TypeVarExpr):
-            result[name] = (
-                "TypeVar",
-                node.variance,
-                [snapshot_type(value) for value in node.values],
-                snapshot_type(node.upper_bound),
-                snapshot_type(node.default),
-            )
-        elif isinstance(node, TypeAlias):
-            result[name] = (
-                "TypeAlias",
-                snapshot_types(node.alias_tvars),
-                node.normalized,
-                node.no_args,
-                snapshot_optional_type(node.target),
-            )
-        elif isinstance(node, ParamSpecExpr):
-            result[name] = (
-                "ParamSpec",
-                node.variance,
-                snapshot_type(node.upper_bound),
-                snapshot_type(node.default),
-            )
-        elif isinstance(node, TypeVarTupleExpr):
-            result[name] = (
-                "TypeVarTuple",
-                node.variance,
-                snapshot_type(node.upper_bound),
-                snapshot_type(node.default),
-            )
+    return {name: snapshot_symbol(name_prefix, symbol) for name, symbol in table.items()}
+
+
+def snapshot_symbol(name_prefix: str, symbol: SymbolTableNode) -> SymbolSnapshot:
+    """Create a snapshot description of a symbol table entry (see snapshot_symbol_table)."""
+    node = symbol.node
+    # TODO: cross_ref?
+    fullname = node.fullname if node else None
+    common = (fullname, symbol.kind, symbol.module_public)
+    if isinstance(node, MypyFile):
+        # This is a cross-reference to another module.
+        # If the reference is busted because the other module is missing,
+        # the node will be a "stale_info" TypeInfo produced by fixup,
+        # but that doesn't really matter to us here.
+        return ("Moduleref", common)
+    elif isinstance(node, TypeVarExpr):
+        return (
+            "TypeVar",
+            node.variance,
+            [snapshot_type(value) for value in node.values],
+            snapshot_type(node.upper_bound),
+            snapshot_type(node.default),
+        )
+    elif isinstance(node, TypeAlias):
+        return (
+            "TypeAlias",
+            snapshot_types(node.alias_tvars),
+            node.normalized,
+            node.no_args,
+            snapshot_optional_type(node.target),
+        )
+    elif isinstance(node, ParamSpecExpr):
+        return (
+            "ParamSpec",
+            node.variance,
+            snapshot_type(node.upper_bound),
+            snapshot_type(node.default),
+        )
+    elif isinstance(node, TypeVarTupleExpr):
+        return (
+            "TypeVarTuple",
+            node.variance,
+            snapshot_type(node.upper_bound),
+            snapshot_type(node.default),
+        )
+    else:
+        assert symbol.kind != UNBOUND_IMPORTED
+        if node and get_prefix(node.fullname) != name_prefix:
+            # This is a cross-reference to a node defined in another module.
+            return ("CrossRef", common)
         else:
-            assert symbol.kind != UNBOUND_IMPORTED
-            if node and get_prefix(node.fullname) != name_prefix:
-                # This is a cross-reference to a node defined in another module.
-                result[name] = ("CrossRef", common)
-            else:
-                result[name] = snapshot_definition(node, common)
-    return result
+            return snapshot_definition(node, common)
 
 
 def snapshot_definition(node: SymbolNode | None, common: SymbolSnapshot) -> SymbolSnapshot:
@@ -514,3 +530,43 @@ def snapshot_untyped_signature(func: OverloadedFuncDef | FuncItem) -> SymbolSnap
             else:
                 result.append(snapshot_untyped_signature(item))
         return tuple(result)
+
+
+class SymbolTableSnapshots:
+    """The latest symbol table snapshot of each module, for incremental updates.
+
+    A snapshot is stored together with the module tree it was taken from,
+    and it's only reused for the same tree. When processing parts of a module
+    again, the caller snapshots the entries that may change both before and
+    after processing, and the other entries can be reused from the stored
+    snapshot, even if they are out of date, since they compare equal.
+    """
+
+    def __init__(self) -> None:
+        self._snapshots: dict[str, tuple[MypyFile, dict[str, SymbolSnapshot]]] = {}
+
+    def snapshot(
+        self, file: MypyFile, names: AbstractSet[str] | None = None
+    ) -> dict[str, SymbolSnapshot]:
+        """Take a snapshot of the symbol table of a module and store it.
+
+        If names is given, only the entries with these names, and entries that
+        were added or removed, are snapshotted again. The rest are reused from
+        the stored snapshot of the same tree (if there is one).
+        """
+        stored = self._snapshots.get(file.fullname)
+        table = file.names
+        if names is None or stored is None or stored[0] is not file:
+            snapshot = snapshot_symbol_table(file.fullname, table)
+        else:
+            snapshot = stored[1].copy()
+            for name in names | (snapshot.keys() ^ table.keys()):
+                if name in table:
+                    snapshot[name] = snapshot_symbol(file.fullname, table[name])
+                else:
+                    snapshot.pop(name, None)
+        self._snapshots[file.fullname] = (file, snapshot)
+        return snapshot
+
+    def discard(self, id: str) -> None:
+        self._snapshots.pop(id, None)
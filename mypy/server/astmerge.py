@@ -115,7 +115,7 @@ from mypy.util import get_prefix, replace_object_state
 
 def merge_asts(
     old: MypyFile, old_symbols: SymbolTable, new: MypyFile, new_symbols: SymbolTable
-) -> None:
+) -> int:
     """Merge a new version of a module AST to a previous version.
 
     The main idea is to preserve the identities of externally visible
@@ -125,6 +125,8 @@ def merge_asts(
     When this returns, 'old' will refer to the merged AST, but 'new_symbols'
     will be the new symbol table. 'new' and 'old_symbols' will no longer be
     valid.
+
+    Return the number of nodes whose identities were preserved.
     """
     assert new.fullname == old.fullname
     # Find the mapping from new to old node identities for all nodes
@@ -142,6 +144,7 @@ def merge_asts(
     # continue to use the new symbol table since it has all the new definitions
     # that have no correspondence in the old AST).
     replace_nodes_in_symbol_table(new_symbols, replacement_map)
+    return len(replacement_map)
 
 
 def replacement_map_from_symbol_table(
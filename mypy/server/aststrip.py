@@ -166,6 +166,9 @@ class NodeStripVisitor(TraverserVisitor):
             # See also #4814.
             assert isinstance(node.type, CallableType)
             node.type.variables = []
+        if node.info:
+            # Types of members of the class may change when the method is reprocessed.
+            type_state.reset_member_access_cache_for(node.info)
         with self.enter_method(node.info) if node.info else nullcontext():
             super().visit_func_def(node)
 
@@ -0,0 +1,163 @@
+"""Snapshots of the build state of the daemon.
+
+"dmypy snapshot FILE" writes the current build state of the daemon to a
+single file, and "dmypy start --from-snapshot FILE" starts a daemon from it.
+
+A snapshot is a cache bundle (see mypy.metastore) with the same entries as
+a fine-grained incremental cache: meta and data files of the modules and
+the fine-grained dependencies. Unlike a cache written by a regular run with
+--cache-fine-grained, it reflects all the updates done by the daemon, and
+it's loaded with a single memory mapping. The daemon uses it like a
+fine-grained cache (the cache directory is ignored).
+
+The meta files record the size, mtime and hash of each source file as
+last seen by the file system watcher of the daemon. When a snapshot is
+loaded, these are compared with the current files, and files whose hash
+has changed are checked again, as with --use-fine-grained-cache.
+
+Modules with errors are left out, so that their errors are reported again
+when the snapshot is loaded.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import time
+from typing import Any, Final
+
+from mypy.binarycache import decode_cache_data, encode_cache_data
+from mypy.build import (
+    DEPS_META_FILE,
+    DEPS_ROOT_FILE,
+    FAKE_ROOT_MODULE,
+    BuildManager,
+    State,
+    deps_to_json,
+    get_cache_names,
+    invert_deps,
+    json_dumps,
+    make_cache_meta,
+)
+from mypy.metastore import BundleMetadataStore, write_bundle
+from mypy.server.deps import merge_dependencies
+from mypy.server.update import FineGrainedBuildManager, ensure_deps_loaded
+
+# Name of the entry with information about the snapshot itself
+SNAPSHOT_INFO_FILE: Final = "@snapshot.json"
+
+
+def write_snapshot(
+    fine_grained_manager: FineGrainedBuildManager,
+    file_data: dict[str, tuple[float, int, str]],
+    path: str,
+) -> int:
+    """Write a snapshot of the build state to a file.
+
+    The argument file_data has the mtime, size and hash of the watched
+    source files (see FileSystemWatcher.dump_file_data()). Modules whose
+    source hash doesn't match their file aren't included. Return the number
+    of modules in the snapshot.
+    """
+    manager = fine_grained_manager.manager
+    graph = fine_grained_manager.graph
+    # Use the cache file names of a fine-grained cache, even if the daemon doesn't use one.
+    options = manager.options.apply_changes({"cache_fine_grained": True, "cache_map": {}})
+    mtime = int(time.time())
+    entries: dict[str, tuple[bytes, float]] = {}
+    hashes: dict[str, str] = {}
+    with_errors = set(manager.errors.error_info_map)
+    for id, state in graph.items():
+        if state.path is None or state.xpath in with_errors:
+            continue
+        source_hash = state.source_hash or (state.meta.hash if state.meta else None)
+        data = file_data.get(state.path)
+        if data is None:
+            # Files that aren't watched, such as stubs of the standard library
+            try:
+                st = manager.fscache.stat(state.path)
+                data = (st.st_mtime, st.st_size, manager.fscache.hash_digest(state.path))
+            except OSError:
+                continue
+        if data[2] != source_hash:
+            # The file was changed after it was last checked.
+            continue
+        meta_json, data_json, _ = get_cache_names(id, state.path, options)
+        tree_data = serialize_tree(state, manager)
+        if tree_data is None:
+            continue
+        meta = make_cache_meta(
+            id,
+            state.path,
+            int(data[0]),
+            data[1],
+            data[2],
+            mtime,
+            list(state.dependencies),
+            list(state.suppressed),
+            state.dependency_priorities(),
+            state.dependency_lines(),
+            state.interface_hash,
+            state.ignore_all,
+            manager,
+        )
+        entries[os.path.normpath(data_json)] = (tree_data, mtime)
+        meta_str = json_dumps(meta, manager.options.debug_cache)
+        entries[os.path.normpath(meta_json)] = (meta_str.encode(), mtime)
+        hashes[id] = data[2]
+
+    # Include all dependencies, including those that the daemon hasn't needed
+    # (and so hasn't loaded from the cache) yet.
+    deps = fine_grained_manager.deps
+    for id in graph:
+        ensure_deps_loaded(id, deps, graph)
+    if manager.fg_deps_by_trigger:
+        merge_dependencies(manager.load_fine_grained_deps(FAKE_ROOT_MODULE), deps)
+    deps_meta = {}
+    for id, module_deps in invert_deps(deps, graph).items():
+        if id != FAKE_ROOT_MODULE:
+            deps_json = get_cache_names(id, graph[id].xpath, options)[2]
+        else:
+            deps_json = DEPS_ROOT_FILE
+        assert deps_json
+        entries[os.path.normpath(deps_json)] = (deps_to_json(module_deps).encode(), mtime)
+        deps_meta[id] = {"path": deps_json, "mtime": mtime}
+    meta_data = json.dumps({"snapshot": hashes, "deps_meta": deps_meta}, separators=(",", ":"))
+    entries[DEPS_META_FILE] = (meta_data.encode(), mtime)
+
+    info = {"version_id": manager.version_id, "modules": len(hashes)}
+    entries[SNAPSHOT_INFO_FILE] = (json.dumps(info).encode(), mtime)
+    write_bundle(entries, path)
+    return len(hashes)
+
+
+def serialize_tree(state: State, manager: BuildManager) -> bytes | None:
+    """Return the contents of the cache data file for the current tree of a module."""
+    data: dict[str, Any]
+    if state.tree is not None:
+        data = state.tree.serialize()
+    elif state.evicted_tree is not None:
+        data = decode_cache_data(state.evicted_tree)
+    elif state.meta is not None:
+        # The tree was never loaded, so the cache data is still valid.
+        try:
+            if state.meta.data_json.endswith(".bin"):
+                return manager.metastore.read_bytes(state.meta.data_json)
+            return manager.metastore.read(state.meta.data_json).encode()
+        except OSError:
+            return None
+    else:
+        return None
+    if manager.options.binary_cache:
+        return encode_cache_data(data)
+    return json_dumps(data, manager.options.debug_cache).encode()
+
+
+def read_snapshot_info(path: str) -> dict[str, Any] | None:
+    """Return information about a snapshot, or None if it isn't a valid snapshot."""
+    store = BundleMetadataStore(path)
+    try:
+        info = json.loads(store.read(SNAPSHOT_INFO_FILE))
+    except (OSError, ValueError):
+        return None
+    return info if isinstance(info, dict) else None
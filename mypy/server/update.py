@@ -44,7 +44,10 @@ Some program state is maintained across multiple build increments in
 memory:
 
 * The full ASTs of all modules are stored in memory all the time (this
-  includes the type map).
+  includes the type map). When using the fine-grained cache, ASTs are only
+  loaded when needed, and the daemon can evict the ASTs of cold modules
+  that still match the cache to stay within a memory budget (see
+  FineGrainedBuildManager.evict_cold_modules).
 
 * A fine-grained dependency map is maintained, which maps triggers to
   affected program locations (these can be targets, triggers, or
@@ -118,9 +121,10 @@ import os
 import re
 import sys
 import time
-from typing import Callable, Final, NamedTuple, Sequence, Union
+from typing import AbstractSet, Any, Callable, Final, Iterable, NamedTuple, Sequence, Union
 from typing_extensions import TypeAlias as _TypeAlias
 
+from mypy.binarycache import encode_cache_data
 from mypy.build import (
     DEBUG_FINE_GRAINED,
     FAKE_ROOT_MODULE,
@@ -130,6 +134,7 @@ from mypy.build import (
     State,
     load_graph,
     process_fresh_modules,
+    sorted_components,
 )
 from mypy.checker import FineGrainedDeferredNode
 from mypy.errors import CompileError
@@ -144,6 +149,7 @@ from mypy.nodes import (
     SymbolNode,
     SymbolTable,
     TypeInfo,
+    Var,
 )
 from mypy.options import Options
 from mypy.semanal_main import (
@@ -151,8 +157,10 @@ from mypy.semanal_main import (
     semantic_analysis_for_scc,
     semantic_analysis_for_targets,
 )
+from mypy.semanal_shared import find_dataclass_transform_spec
 from mypy.server.astdiff import (
     SymbolSnapshot,
+    SymbolTableSnapshots,
     compare_symbol_table_snapshots,
     snapshot_symbol_table,
 )
@@ -161,6 +169,7 @@ from mypy.server.aststrip import SavedAttributes, strip_target
 from mypy.server.deps import get_dependencies_of_target, merge_dependencies
 from mypy.server.target import trigger_to_target
 from mypy.server.trigger import WILDCARD_TAG, make_trigger
+from mypy.types import type_interner
 from mypy.typestate import type_state
 from mypy.util import module_prefix, split_target
 
@@ -169,6 +178,69 @@ MAX_ITER: Final = 1000
 SENSITIVE_INTERNAL_MODULES = tuple(core_modules) + ("mypy_extensions", "typing_extensions")
 
 
+class UpdateWork:
+    """Work done by fine-grained updates, to find out why an update is slow.
+
+    This records each trigger that fired with the number of triggers and
+    targets that depend on it, the time spent processing each set of targets
+    again, and how much AST merging was done. The daemon collects this for
+    each command (see Server.update_stats()).
+    """
+
+    def __init__(self) -> None:
+        # Fired trigger -> number of dependencies it expanded to
+        self.triggers: dict[str, int] = {}
+        # Module, targets and time of each reprocess_nodes() call
+        self.reprocessed: list[tuple[str, list[str], float]] = []
+        # Number of AST merges, nodes with preserved identities and time spent
+        self.merges = 0
+        self.merged_nodes = 0
+        self.merge_time = 0.0
+
+    def record_trigger(self, trigger: str, fanout: int) -> None:
+        self.triggers[trigger] = fanout
+
+    def record_reprocess(self, module: str, targets: list[str], time: float) -> None:
+        self.reprocessed.append((module, targets, time))
+
+    def record_merge(self, nodes: int, time: float) -> None:
+        self.merges += 1
+        self.merged_nodes += nodes
+        self.merge_time += time
+
+    def is_empty(self) -> bool:
+        return not self.triggers and not self.reprocessed and not self.merges
+
+    def stats(self) -> dict[str, Any]:
+        """Return a summary to be included in build stats."""
+        return {
+            "triggers_fired": len(self.triggers),
+            "max_trigger_fanout": max(self.triggers.values(), default=0),
+            "targets_reprocessed": sum(len(targets) for _, targets, _ in self.reprocessed),
+            "reprocess_time": sum((t for _, _, t in self.reprocessed), 0.0),
+            "astmerge_nodes": self.merged_nodes,
+            "astmerge_time": self.merge_time,
+        }
+
+    def serialize(self) -> dict[str, Any]:
+        """Return all recorded work as JSON data, largest fan-outs and slowest targets first."""
+        triggers = sorted(self.triggers.items(), key=lambda item: (-item[1], item[0]))
+        reprocessed = sorted(self.reprocessed, key=lambda item: -item[2])
+        return {
+            "stats": self.stats(),
+            "triggers": [{"trigger": trigger, "fanout": fanout} for trigger, fanout in triggers],
+            "reprocessed": [
+                {"module": module, "targets": targets, "time": t}
+                for module, targets, t in reprocessed
+            ],
+            "astmerge": {
+                "merges": self.merges,
+                "nodes": self.merged_nodes,
+                "time": self.merge_time,
+            },
+        }
+
+
 class FineGrainedBuildManager:
     def __init__(self, result: BuildResult) -> None:
         """Initialize fine-grained build based on a batch build.
@@ -184,8 +256,11 @@ class FineGrainedBuildManager:
         self.graph = result.graph
         self.previous_modules = get_module_to_path_map(self.graph)
         self.deps = manager.fg_deps
-        # Merge in any root dependencies that may not have been loaded
-        merge_dependencies(manager.load_fine_grained_deps(FAKE_ROOT_MODULE), self.deps)
+        manager.symbol_snapshots = SymbolTableSnapshots()
+        manager.fg_work = UpdateWork()
+        if not manager.fg_deps_by_trigger:
+            # Merge in any root dependencies that may not have been loaded
+            merge_dependencies(manager.load_fine_grained_deps(FAKE_ROOT_MODULE), self.deps)
         self.previous_targets_with_errors = manager.errors.targets()
         self.previous_messages: list[str] = result.errors.copy()
         # Module, if any, that had blocking errors in the last run as (id, path) tuple.
@@ -205,6 +280,10 @@ class FineGrainedBuildManager:
         self.updated_modules: list[str] = []
         # Targets processed during last update (for testing only).
         self.processed_targets: list[str] = []
+        # Total number of modules evicted, and number of evictions
+        self.evicted_modules = 0
+        self.evictions = 0
+        record_module_use(manager, manager.modules)
 
     def update(
         self,
@@ -232,6 +311,7 @@ class FineGrainedBuildManager:
             A list of errors.
         """
         self.processed_targets.clear()
+        self.manager.fg_increment += 1
         changed_modules = changed_modules + removed_modules
         removed_set = {module for module, _ in removed_modules}
         self.changed_modules = changed_modules
@@ -241,6 +321,8 @@ class FineGrainedBuildManager:
 
         # Reset find_module's caches for the new build.
         self.manager.find_module_cache.clear()
+        # Types shared by modules loaded from the cache may refer to deleted classes.
+        type_interner.clear()
 
         self.triggered = []
         self.updated_modules = []
@@ -264,10 +346,17 @@ class FineGrainedBuildManager:
             self.blocking_error = None
 
         while True:
-            result = self.update_one(
-                changed_modules, initial_set, removed_set, blocking_error, followed
-            )
-            changed_modules, (next_id, next_path), blocker_messages = result
+            if self.manager.options.batch_updates:
+                batch_result = self.update_batch(
+                    changed_modules, initial_set, removed_set, blocking_error, followed
+                )
+                changed_modules, (next_id, next_path), blocker_messages, up_to_date = batch_result
+            else:
+                result = self.update_one(
+                    changed_modules, initial_set, removed_set, blocking_error, followed
+                )
+                changed_modules, (next_id, next_path), blocker_messages = result
+                up_to_date = {next_id}
 
             if blocker_messages is not None:
                 self.blocking_error = (next_id, next_path)
@@ -281,16 +370,16 @@ class FineGrainedBuildManager:
             # might trigger loading of a module, but I am not sure
             # if this can really happen.
             if not changed_modules:
-                # N.B: We just checked next_id, so manager.errors contains
-                # the errors from it. Thus we consider next_id up to date
-                # when propagating changes from the errored targets,
+                # N.B: We just checked next_id (or the whole last batch), so
+                # manager.errors contains the errors from it. Thus we consider
+                # it up to date when propagating changes from the errored targets,
                 # which prevents us from reprocessing errors in it.
                 changed_modules = propagate_changes_using_dependencies(
                     self.manager,
                     self.graph,
                     self.deps,
                     set(),
-                    {next_id},
+                    up_to_date,
                     self.previous_targets_with_errors,
                     self.processed_targets,
                 )
@@ -325,6 +414,48 @@ class FineGrainedBuildManager:
         self.previous_messages = self.manager.errors.new_messages().copy()
         return self.update(changed_modules, [])
 
+    def evict_cold_modules(self, count: int) -> list[str]:
+        """Free the ASTs of (about) count least recently used modules.
+
+        Evicted modules are loaded again by ensure_trees_loaded() when needed:
+        from the cache if their ASTs haven't changed since they were loaded from
+        it, and otherwise from an encoded copy of the AST kept in the State.
+        Like other ASTs loaded from the cache, these are skeletons, so stale
+        targets in them are processed by parsing the module again. This is only
+        supported when using the fine-grained cache. Return the evicted modules.
+        """
+        if self.blocking_error or not self.manager.options.use_fine_grained_cache:
+            return []
+        # Targets with errors are reprocessed in the next update, which needs their full ASTs.
+        with_errors = {module_prefix(self.graph, t) for t in self.previous_targets_with_errors}
+        evictable, referrers = find_evictable_modules(self.manager, self.graph, with_errors)
+        selected: set[str] = set()
+        last_used = self.manager.fg_last_used
+        for id in sorted(evictable, key=lambda id: (last_used.get(id, 0), id)):
+            if len(selected) >= count:
+                break
+            # Modules that refer to an evicted module must be evicted with it.
+            worklist = [id]
+            while worklist:
+                node = worklist.pop()
+                if node not in selected:
+                    selected.add(node)
+                    worklist.extend(referrers[node])
+        encoded = {}
+        for id in selected:
+            state = self.graph[id]
+            if state.meta is None or state.tree_modified:
+                encoded[id] = encode_cache_data(self.manager.modules[id].serialize())
+        for id in selected:
+            evict_module(self.manager, self.graph, id, encoded.get(id))
+            last_used.pop(id, None)
+        if selected:
+            self.evicted_modules += len(selected)
+            self.evictions += 1
+            self.manager.log_fine_grained(f"evicted {len(selected)} modules")
+            self.manager.add_stats(evicted_modules=len(selected))
+        return sorted(selected)
+
     def flush_cache(self) -> None:
         """Flush AST cache.
 
@@ -401,32 +532,73 @@ class FineGrainedBuildManager:
             - If there was a blocking error, the error messages from it
         """
         self.manager.log_fine_grained(f"--- update single {module!r} ---")
+        t0 = time.time()
+        result = self.process_changed_module(module, path, force_removed, followed)
+        remaining, (module, path), blocker_messages, triggered = result
+        if blocker_messages is not None or module in SENSITIVE_INTERNAL_MODULES:
+            return remaining, (module, path), blocker_messages
+
+        manager = self.manager
+        graph = self.graph
+        t1 = time.time()
+        remaining += propagate_changes_using_dependencies(
+            manager,
+            graph,
+            self.deps,
+            triggered,
+            {module},
+            targets_with_errors=set(),
+            processed_targets=self.processed_targets,
+        )
+        t2 = time.time()
+        manager.add_stats(update_isolated_time=t1 - t0, propagate_time=t2 - t1)
+
+        # Preserve state needed for the next update.
+        self.previous_targets_with_errors.update(manager.errors.targets())
+        self.previous_modules = get_module_to_path_map(graph)
+
+        return remaining, (module, path), None
+
+    def process_changed_module(
+        self,
+        module: str,
+        path: str,
+        force_removed: bool,
+        followed: bool,
+        reset_errors: bool = True,
+    ) -> tuple[list[tuple[str, str]], tuple[str, str], list[str] | None, set[str]]:
+        """Process a changed module, without propagating the changes to other modules.
+
+        Returns:
+            Like update_module(), and also the triggers fired by the change
+        """
         self.updated_modules.append(module)
 
         # builtins and friends could potentially get triggered because
         # of protocol stuff, but nothing good could possibly come from
         # actually updating them.
         if module in SENSITIVE_INTERNAL_MODULES:
-            return [], (module, path), None
+            return [], (module, path), None, set()
 
         manager = self.manager
         previous_modules = self.previous_modules
         graph = self.graph
 
-        ensure_deps_loaded(module, self.deps, graph)
+        if not manager.fg_deps_by_trigger:
+            ensure_deps_loaded(module, self.deps, graph)
 
         # If this is an already existing module, make sure that we have
         # its tree loaded so that we can snapshot it for comparison.
         ensure_trees_loaded(manager, graph, [module])
 
-        t0 = time.time()
         # Record symbol table snapshot of old version the changed module.
         old_snapshots: dict[str, dict[str, SymbolSnapshot]] = {}
         if module in manager.modules:
             snapshot = snapshot_symbol_table(module, manager.modules[module].names)
             old_snapshots[module] = snapshot
 
-        manager.errors.reset()
+        if reset_errors:
+            manager.errors.reset()
         self.processed_targets.append(module)
         result = update_module_isolated(
             module, path, manager, previous_modules, graph, force_removed, followed
@@ -435,12 +607,11 @@ class FineGrainedBuildManager:
             # Blocking error -- just give up
             module, path, remaining, errors = result
             self.previous_modules = get_module_to_path_map(graph)
-            return remaining, (module, path), errors
+            return remaining, (module, path), errors, set()
         assert isinstance(result, NormalUpdate)  # Work around #4124
         module, path, remaining, tree = result
 
         # TODO: What to do with stale dependencies?
-        t1 = time.time()
         triggered = calculate_active_triggers(manager, old_snapshots, {module: tree})
         if is_verbose(self.manager):
             filtered = [trigger for trigger in triggered if not trigger.endswith("__>")]
@@ -449,23 +620,91 @@ class FineGrainedBuildManager:
         if module in graph:
             graph[module].update_fine_grained_deps(self.deps)
             graph[module].free_state()
+        return remaining, (module, path), None, triggered
+
+    def update_batch(
+        self,
+        changed_modules: list[tuple[str, str]],
+        initial_set: set[str],
+        removed_set: set[str],
+        blocking_error: str | None,
+        followed: bool,
+    ) -> tuple[list[tuple[str, str]], tuple[str, str], list[str] | None, set[str]]:
+        """Process all modules in the list of changed modules as a batch.
+
+        This has the same effect as calling update_one() for each module, but
+        changes are propagated only once, after all the modules have been
+        processed. Targets affected by several changed modules are thus only
+        reprocessed once, and targets in the changed modules aren't reprocessed
+        before the modules themselves. Modules and targets are processed in
+        dependency order.
+
+        The messages are the same as without batching, but their order may differ:
+        messages in files that had none before the update are reported in the order
+        in which the files were processed (see sort_messages_preserving_file_order),
+        and that is the dependency order here.
+
+        Returns:
+            Like update_one(), and also the modules that were processed
+        """
+        t0 = time.time()
+        manager = self.manager
+        graph = self.graph
+        module_order = {id: i for i, scc in enumerate(sorted_components(graph)) for id in scc}
+        # New modules go first, since modules in the graph may import them.
+        batch = sorted(changed_modules, key=lambda m: module_order.get(m[0], -1))
+        if blocking_error is not None:
+            # Check the module with a blocking error first, like update().
+            batch.sort(key=lambda m: m[0] != blocking_error)
+        self.manager.log_fine_grained(f"--- update batch of {len(batch)} modules ---")
+
+        manager.errors.reset()
+        triggered_by: list[tuple[str, set[str]]] = []
+        processed: set[str] = set()
+        remaining: list[tuple[str, str]] = []
+        last = batch[-1]
+        blocker_messages = None
+        for i, (id, path) in enumerate(batch):
+            if id == blocking_error and id not in self.previous_modules and id not in initial_set:
+                self.manager.log_fine_grained(
+                    f"skip {id!r} (module with blocking error not in import graph)"
+                )
+                continue
+            result = self.process_changed_module(
+                id, path, id in removed_set, followed, reset_errors=False
+            )
+            more, last, blocker_messages, more_triggered = result
+            if blocker_messages is not None:
+                # Keep the modules that weren't processed for the next update.
+                remaining = more + remaining + batch[i + 1 :]
+                break
+            processed.add(last[0])
+            remaining += more
+            triggered_by.append((last[0], more_triggered))
+        t1 = time.time()
+
         remaining += propagate_changes_using_dependencies(
             manager,
             graph,
             self.deps,
-            triggered,
-            {module},
+            set().union(*(triggers for _, triggers in triggered_by)),
+            set(),
             targets_with_errors=set(),
             processed_targets=self.processed_targets,
+            up_to_date_targets=find_up_to_date_targets(manager, graph, self.deps, triggered_by),
+            module_order=module_order,
         )
         t2 = time.time()
-        manager.add_stats(update_isolated_time=t1 - t0, propagate_time=t2 - t1)
+        manager.add_stats(
+            update_isolated_time=t1 - t0, propagate_time=t2 - t1, batch_size=len(processed)
+        )
 
         # Preserve state needed for the next update.
         self.previous_targets_with_errors.update(manager.errors.targets())
         self.previous_modules = get_module_to_path_map(graph)
-
-        return remaining, (module, path), None
+        remaining = [(id, path) for id, path in remaining if id not in processed]
+        self.manager.log_fine_grained(f"update batch in {t2 - t0:.3f}s - {len(remaining)} left")
+        return dedupe_modules(remaining), last, blocker_messages, processed
 
 
 def find_unloaded_deps(
@@ -496,6 +735,66 @@ def find_unloaded_deps(
     return unloaded
 
 
+def find_evictable_modules(
+    manager: BuildManager, graph: dict[str, State], pinned: AbstractSet[str | None]
+) -> tuple[set[str], dict[str, set[str]]]:
+    """Find the loaded modules whose ASTs can be freed and reloaded from the cache.
+
+    A module can only be evicted if no module that remains loaded refers to
+    its AST nodes, since these would stay alive and get out of sync with the
+    reloaded AST. A module refers to its dependencies and ancestors, and a
+    package also refers to its submodules. This also keeps the invariant of
+    find_unloaded_deps().
+
+    Modules in pinned (and builtins and friends) are never evicted.
+
+    Return the evictable modules and a map from each loaded module to the
+    loaded modules that refer to it.
+    """
+    loaded = [id for id in manager.modules if id in graph]
+    refs: dict[str, list[str]] = {}
+    for id in loaded:
+        state = graph[id]
+        refs[id] = state.dependencies + (state.ancestors or [])
+    for id in loaded:
+        parent = id.rpartition(".")[0]
+        if parent in refs:
+            refs[parent].append(id)
+    referrers: dict[str, set[str]] = {id: set() for id in loaded}
+    for id, targets in refs.items():
+        for target in targets:
+            if target in referrers:
+                referrers[target].add(id)
+
+    worklist = [id for id in loaded if id in pinned or id in SENSITIVE_INTERNAL_MODULES]
+    kept: set[str] = set()
+    while worklist:
+        id = worklist.pop()
+        if id not in kept:
+            kept.add(id)
+            worklist.extend(target for target in refs[id] if target in refs)
+    return set(loaded) - kept, referrers
+
+
+def evict_module(
+    manager: BuildManager, graph: dict[str, State], id: str, encoded_tree: bytes | None
+) -> None:
+    state = graph[id]
+    tree = manager.modules.pop(id)
+    for _, symnode, _ in tree.local_definitions():
+        if isinstance(symnode.node, TypeInfo):
+            type_state.remove_subtype_caches_for(symnode.node)
+    state.free_state()
+    state.tree = None
+    state.evicted_tree = encoded_tree
+    if encoded_tree is not None:
+        manager.evicted_tree_bytes += len(encoded_tree)
+    # The module gets new TypeInfos when it's loaded again.
+    type_interner.clear()
+    if manager.symbol_snapshots is not None:
+        manager.symbol_snapshots.discard(id)
+
+
 def ensure_deps_loaded(module: str, deps: dict[str, set[str]], graph: dict[str, State]) -> None:
     """Ensure that the dependencies on a module are loaded.
 
@@ -515,10 +814,77 @@ def ensure_deps_loaded(module: str, deps: dict[str, set[str]], graph: dict[str,
             graph[base].fine_grained_deps_loaded = True
 
 
+def load_trigger_deps(
+    manager: BuildManager, graph: Graph, targets: AbstractSet[str], deps: dict[str, set[str]]
+) -> None:
+    """Ensure that the dependencies of the triggers among targets are loaded."""
+    if manager.fg_deps_by_trigger:
+        # Look up only the triggers that fired instead of all deps of their modules.
+        ensure_trigger_deps_loaded(manager, [t for t in targets if t.startswith("<")], deps)
+        return
+    for target in targets:
+        if target.startswith("<"):
+            module_id = module_prefix(graph, trigger_to_target(target))
+            if module_id:
+                ensure_deps_loaded(module_id, deps, graph)
+
+
+def find_up_to_date_targets(
+    manager: BuildManager,
+    graph: Graph,
+    deps: dict[str, set[str]],
+    triggered_by: list[tuple[str, set[str]]],
+) -> set[str]:
+    """Find the targets in a batch of changed modules that don't need reprocessing.
+
+    The argument has the modules of the batch in processing order, with the
+    triggers fired by each. A target in one of these modules only needs to be
+    reprocessed if a trigger fired by a later module reaches it, since each
+    module was processed after the changes of the earlier modules.
+    """
+    position = {id: i for i, (id, _) in enumerate(triggered_by)}
+    # The last position from which each trigger or target is reached (we go backwards,
+    # so each node is only visited once)
+    reached: dict[str, int] = {}
+    for i in reversed(range(len(triggered_by))):
+        worklist = {t for t in triggered_by[i][1] if t not in reached}
+        while worklist:
+            load_trigger_deps(manager, graph, worklist, deps)
+            for node in worklist:
+                reached[node] = i
+            worklist = {
+                t
+                for node in worklist
+                if node.startswith("<")
+                for t in deps.get(node, ())
+                if t not in reached
+            }
+    up_to_date = set()
+    for node, i in reached.items():
+        if not node.startswith("<"):
+            module_id = module_prefix(graph, node)
+            if module_id in position and i <= position[module_id]:
+                up_to_date.add(node)
+    return up_to_date
+
+
+def ensure_trigger_deps_loaded(
+    manager: BuildManager, triggers: list[str], deps: dict[str, set[str]]
+) -> None:
+    """Ensure that the cached dependencies of triggers are loaded into 'deps'.
+
+    This is used instead of ensure_deps_loaded() when the dependencies are
+    stored in an index (see mypy.depsindex).
+    """
+    for trigger, targets in manager.load_fine_grained_trigger_deps(triggers).items():
+        deps.setdefault(trigger, set()).update(targets)
+
+
 def ensure_trees_loaded(
     manager: BuildManager, graph: dict[str, State], initial: Sequence[str]
 ) -> None:
     """Ensure that the modules in initial and their deps have loaded trees."""
+    record_module_use(manager, initial)
     to_process = find_unloaded_deps(manager, graph, initial)
     if to_process:
         if is_verbose(manager):
@@ -528,6 +894,13 @@ def ensure_trees_loaded(
                 )
             )
         process_fresh_modules(graph, to_process, manager)
+        record_module_use(manager, to_process)
+
+
+def record_module_use(manager: BuildManager, ids: Iterable[str]) -> None:
+    """Record that the trees of modules are used by the current update."""
+    for id in ids:
+        manager.fg_last_used[id] = manager.fg_increment
 
 
 # The result of update_module_isolated when no blockers, with these items:
@@ -673,6 +1046,7 @@ def update_module_isolated(
     manager.add_stats(semanal_time=t1 - t0, typecheck_time=t2 - t1, finish_passes_time=t3 - t2)
 
     graph[module] = state
+    record_module_use(manager, [module])
 
     return NormalUpdate(module, path, remaining_modules, state.tree)
 
@@ -711,6 +1085,9 @@ def delete_module(module_id: str, path: str, graph: Graph, manager: BuildManager
         del graph[module_id]
     if module_id in manager.modules:
         del manager.modules[module_id]
+    if manager.symbol_snapshots is not None:
+        manager.symbol_snapshots.discard(module_id)
+    manager.fg_last_used.pop(module_id, None)
     components = module_id.split(".")
     if len(components) > 1:
         # Delete reference to module in parent module.
@@ -773,6 +1150,8 @@ def calculate_active_triggers(
         if new is None:
             snapshot2 = snapshot_symbol_table(id, SymbolTable())
             names.add(id)
+        elif manager.symbol_snapshots is not None:
+            snapshot2 = manager.symbol_snapshots.snapshot(new)
         else:
             snapshot2 = snapshot_symbol_table(id, new.names)
         diff = compare_symbol_table_snapshots(id, snapshot1, snapshot2)
@@ -820,7 +1199,12 @@ def replace_modules_with_new_variants(
         preserved_module = old_modules.get(id)
         new_module = new_modules[id]
         if preserved_module and new_module is not None:
-            merge_asts(preserved_module, preserved_module.names, new_module, new_module.names)
+            t0 = time.time()
+            nodes = merge_asts(
+                preserved_module, preserved_module.names, new_module, new_module.names
+            )
+            if manager.fg_work is not None:
+                manager.fg_work.record_merge(nodes, time.time() - t0)
             manager.modules[id] = preserved_module
             graph[id].tree = preserved_module
 
@@ -833,6 +1217,8 @@ def propagate_changes_using_dependencies(
     up_to_date_modules: set[str],
     targets_with_errors: set[str],
     processed_targets: list[str],
+    up_to_date_targets: AbstractSet[str] = frozenset(),
+    module_order: dict[str, int] | None = None,
 ) -> list[tuple[str, str]]:
     """Transitively rechecks targets based on triggers and the dependency map.
 
@@ -841,6 +1227,11 @@ def propagate_changes_using_dependencies(
 
     Processed targets should be appended to processed_targets (used in tests only,
     to test the order of processing targets).
+
+    Like targets in up_to_date_modules, targets in up_to_date_targets are not
+    reprocessed because of the initial triggers. If module_order is given,
+    targets are processed in this order of their modules (unknown modules last)
+    instead of by module name.
     """
 
     num_iter = 0
@@ -854,7 +1245,7 @@ def propagate_changes_using_dependencies(
             raise RuntimeError("Max number of iterations (%d) reached (endless loop?)" % MAX_ITER)
 
         todo, unloaded, stale_protos = find_targets_recursive(
-            manager, graph, triggered, deps, up_to_date_modules
+            manager, graph, triggered, deps, up_to_date_modules, up_to_date_targets
         )
         # TODO: we sort to make it deterministic, but this is *incredibly* ad hoc
         remaining_modules.extend((id, graph[id].xpath) for id in sorted(unloaded))
@@ -876,13 +1267,19 @@ def propagate_changes_using_dependencies(
             type_state.reset_subtype_caches_for(info)
         # Then fully reprocess all targets.
         # TODO: Preserve order (set is not optimal)
-        for id, nodes in sorted(todo.items(), key=lambda x: x[0]):
+        if module_order is not None:
+            order = module_order
+            ids = sorted(todo, key=lambda id: (order.get(id, len(order)), id))
+        else:
+            ids = sorted(todo)
+        for id in ids:
             assert id not in up_to_date_modules
-            triggered |= reprocess_nodes(manager, graph, id, nodes, deps, processed_targets)
+            triggered |= reprocess_nodes(manager, graph, id, todo[id], deps, processed_targets)
         # Changes elsewhere may require us to reprocess modules that were
         # previously considered up to date. For example, there may be a
         # dependency loop that loops back to an originally processed module.
         up_to_date_modules = set()
+        up_to_date_targets = frozenset()
         targets_with_errors = set()
         if is_verbose(manager):
             manager.log_fine_grained(f"triggered: {list(triggered)!r}")
@@ -896,6 +1293,7 @@ def find_targets_recursive(
     triggers: set[str],
     deps: dict[str, set[str]],
     up_to_date_modules: set[str],
+    up_to_date_targets: AbstractSet[str] = frozenset(),
 ) -> tuple[dict[str, set[FineGrainedDeferredNode]], set[str], set[TypeInfo]]:
     """Find names of all targets that need to reprocessed, given some triggers.
 
@@ -916,19 +1314,19 @@ def find_targets_recursive(
         processed |= worklist
         current = worklist
         worklist = set()
+        load_trigger_deps(manager, graph, current, deps)
         for target in current:
             if target.startswith("<"):
-                module_id = module_prefix(graph, trigger_to_target(target))
-                if module_id:
-                    ensure_deps_loaded(module_id, deps, graph)
-
-                worklist |= deps.get(target, set()) - processed
+                dependents = deps.get(target, set())
+                if manager.fg_work is not None:
+                    manager.fg_work.record_trigger(target, len(dependents))
+                worklist |= dependents - processed
             else:
                 module_id = module_prefix(graph, target)
                 if module_id is None:
                     # Deleted module.
                     continue
-                if module_id in up_to_date_modules:
+                if module_id in up_to_date_modules or target in up_to_date_targets:
                     # Already processed.
                     continue
                 if (
@@ -968,10 +1366,12 @@ def reprocess_nodes(
         manager.log_fine_grained("%s not in graph (blocking errors or deleted?)" % module_id)
         return set()
 
+    t0 = time.time()
+    graph[module_id].tree_modified = True
+    record_module_use(manager, [module_id])
     file_node = manager.modules[module_id]
     old_symbols = find_symbol_tables_recursive(file_node.fullname, file_node.names)
     old_symbols = {name: names.copy() for name, names in old_symbols.items()}
-    old_symbols_snapshot = snapshot_symbol_table(file_node.fullname, file_node.names)
 
     def key(node: FineGrainedDeferredNode) -> int:
         # Unlike modules which are sorted by name within SCC,
@@ -983,6 +1383,13 @@ def reprocess_nodes(
 
     state = graph[module_id]
     options = state.options
+
+    # Only the symbols that may change need to be snapshotted (before and after
+    # processing the nodes) and compared, and the rest of the snapshot is reused.
+    snapshots = manager.symbol_snapshots
+    assert snapshots is not None
+    dirty_symbols = find_dirty_symbols(module_id, file_node, nodes, options)
+    old_symbols_snapshot = snapshots.snapshot(file_node, dirty_symbols)
     manager.errors.set_file_ignored_lines(
         file_node.path, file_node.ignored_lines, options.ignore_errors or state.ignore_all
     )
@@ -1012,9 +1419,12 @@ def reprocess_nodes(
     # the same, but other nodes may have been recreated with different identities, such as
     # NamedTuples defined using assignment statements.
     new_symbols = find_symbol_tables_recursive(file_node.fullname, file_node.names)
+    t1 = time.time()
+    merged_nodes = 0
     for name in old_symbols:
         if name in new_symbols:
-            merge_asts(file_node, old_symbols[name], file_node, new_symbols[name])
+            merged_nodes += merge_asts(file_node, old_symbols[name], file_node, new_symbols[name])
+    t2 = time.time()
 
     # Type check.
     checker = graph[module_id].type_checker()
@@ -1031,10 +1441,12 @@ def reprocess_nodes(
     if manager.options.export_types:
         manager.all_types.update(graph[module_id].type_map())
 
-    new_symbols_snapshot = snapshot_symbol_table(file_node.fullname, file_node.names)
+    new_symbols_snapshot = snapshots.snapshot(file_node, dirty_symbols)
+    if dirty_symbols is not None:
+        dirty_symbols = dirty_symbols | (old_symbols_snapshot.keys() ^ new_symbols_snapshot.keys())
     # Check if any attribute types were changed and need to be propagated further.
     changed = compare_symbol_table_snapshots(
-        file_node.fullname, old_symbols_snapshot, new_symbols_snapshot
+        file_node.fullname, old_symbols_snapshot, new_symbols_snapshot, dirty_symbols
     )
     new_triggered = {make_trigger(name) for name in changed}
 
@@ -1046,9 +1458,52 @@ def reprocess_nodes(
 
     graph[module_id].free_state()
 
+    if manager.fg_work is not None:
+        manager.fg_work.record_merge(merged_nodes, t2 - t1)
+        manager.fg_work.record_reprocess(module_id, sorted(targets), time.time() - t0)
     return new_triggered
 
 
+def find_dirty_symbols(
+    module_id: str, file_node: MypyFile, nodes: list[FineGrainedDeferredNode], options: Options
+) -> set[str] | None:
+    """Find the module-level symbols that may change when processing nodes again.
+
+    These are the functions and classes that contain the nodes, and other
+    symbols that are processed again with any nodes. Return None if any symbol
+    may change (this is the case if the module top level is processed).
+    """
+
+    def top_level_name(fullname: str) -> str:
+        return fullname[len(module_id) + 1 :].split(".", 1)[0]
+
+    dirty = set()
+    for deferred in nodes:
+        target = target_from_node(module_id, deferred.node)
+        if target is None or target == module_id:
+            return None
+        dirty.add(top_level_name(target))
+    for name, sym in file_node.names.items():
+        node = sym.node
+        if "@" in name:
+            # Classes defined in functions
+            dirty.add(name)
+        elif isinstance(node, TypeInfo) and node.module_name == module_id:
+            # Class plugin hooks are applied and class properties are calculated
+            # again for all classes in the module.
+            if node.defn.decorators or find_dataclass_transform_spec(node) is not None:
+                dirty.add(name)
+            elif any(
+                base.module_name == module_id and top_level_name(base.fullname) in dirty
+                for base in node.mro[1:]
+            ):
+                dirty.add(name)
+        elif isinstance(node, Var) and node.is_inferred and not options.local_partial_types:
+            # Functions can complete partial types of module-level variables.
+            dirty.add(name)
+    return dirty
+
+
 def find_symbol_tables_recursive(prefix: str, symbols: SymbolTable) -> dict[str, SymbolTable]:
     """Find all nested symbol tables.
 
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from contextlib import contextmanager
-from typing import Any, Callable, Final, Iterator, List, TypeVar, cast
+from typing import Any, Callable, Final, Iterable, Iterator, List, TypeVar, cast
 from typing_extensions import TypeAlias as _TypeAlias
 
 import mypy.applytype
@@ -44,11 +44,13 @@ from mypy.types import (
     Parameters,
     ParamSpecType,
     PartialType,
+    PlaceholderType,
     ProperType,
     TupleType,
     Type,
     TypeAliasType,
     TypedDictType,
+    TypeGuardedType,
     TypeOfAny,
     TypeType,
     TypeVarTupleType,
@@ -63,6 +65,7 @@ from mypy.types import (
 )
 from mypy.types_utils import flatten_types
 from mypy.typestate import SubtypeKind, type_state
+from mypy.typetraverser import TypeTraverserVisitor
 from mypy.typevars import fill_typevars_with_any
 from mypy.typevartuples import extract_unpack, fully_split_with_mapped_and_template
 
@@ -74,6 +77,10 @@ IS_VAR: Final = 4
 
 TypeParameterChecker: _TypeAlias = Callable[[Type, Type, int, bool, "SubtypeContext"], bool]
 
+# Subtype checks where either side is one of these are cached by the structure
+# of the types (see TypeState.lookup_structural_subtype_check)
+STRUCTURAL_CACHE_TYPES: Final = (CallableType, Overloaded, TupleType, TypedDictType, UnionType)
+
 
 class SubtypeContext:
     def __init__(
@@ -273,6 +280,150 @@ def _is_subtype(
     left: Type, right: Type, subtype_context: SubtypeContext, proper_subtype: bool
 ) -> bool:
     subtype_context.check_context(proper_subtype)
+    proper_left = get_proper_type(left)
+    proper_right = get_proper_type(right)
+    if (
+        isinstance(proper_left, STRUCTURAL_CACHE_TYPES)
+        or isinstance(proper_right, STRUCTURAL_CACHE_TYPES)
+    ) and not (type_state.get_assumptions(is_proper=True) or type_state.get_assumptions(False)):
+        # Results computed while some recursive types are assumed to be subtypes
+        # may depend on the assumptions, so these are never cached.
+        if is_structurally_cacheable(proper_left, proper_right):
+            kind = structural_subtype_kind(subtype_context, proper_subtype)
+            result = type_state.lookup_structural_subtype_check(kind, proper_left, proper_right)
+            if result is None:
+                result = _is_subtype_uncached(left, right, subtype_context, proper_subtype)
+                infos = structural_cache_infos(proper_left, proper_right)
+                type_state.record_structural_subtype_check(
+                    kind, proper_left, proper_right, result, infos
+                )
+            return result
+    return _is_subtype_uncached(left, right, subtype_context, proper_subtype)
+
+
+def structural_subtype_kind(subtype_context: SubtypeContext, proper_subtype: bool) -> SubtypeKind:
+    options = subtype_context.options
+    return SubtypeVisitor.build_subtype_kind(subtype_context, proper_subtype) + (
+        subtype_context.ignore_uninhabited,
+        (options.extra_checks or options.strict_concatenate) if options else True,
+    )
+
+
+def is_structurally_cacheable(left: ProperType, right: ProperType) -> bool:
+    """Can a subtype check between two types be cached by the structure of the types?"""
+    collector = StructuralCacheInfoCollector(collect_infos=False)
+    left.accept(collector)
+    if collector.cacheable:
+        right.accept(collector)
+    return collector.cacheable
+
+
+def structural_cache_infos(left: ProperType, right: ProperType) -> set[TypeInfo]:
+    """Return the TypeInfos that a cacheable subtype check between two types depends on.
+
+    This is only needed when a result is recorded in the cache, not for lookups.
+    """
+    collector = StructuralCacheInfoCollector()
+    left.accept(collector)
+    right.accept(collector)
+    return collector.infos
+
+
+class StructuralCacheInfoCollector(TypeTraverserVisitor):
+    """Find the TypeInfos in a type, and whether equal types are always interchangeable.
+
+    Type equality ignores some details, such as type variables of generic callables,
+    type guards and whether a type object came from Type[...], and type aliases may
+    change meaning in fine-grained mode without any TypeInfo changing, so types with
+    these are not cacheable. Unlike other traversers, this also visits upper bounds
+    and values of type variables, since subtype checks depend on them.
+    """
+
+    def __init__(self, last_known_values: bool = False, collect_infos: bool = True) -> None:
+        self.infos: set[TypeInfo] = set()
+        self.cacheable = True
+        # Only check whether the types are cacheable, without finding the TypeInfos
+        self.collect_infos = collect_infos
+        # Subtype checks aren't cached for instances with last known values, since
+        # there can be arbitrarily many of them, but other caches may use them.
+        self.last_known_values = last_known_values
+
+    def traverse_types(self, types: Iterable[Type]) -> None:
+        for typ in types:
+            if isinstance(typ, TypeGuardedType):  # type: ignore[misc]
+                # Union items narrowed by type guards can't be traversed.
+                self.cacheable = False
+                return
+            typ.accept(self)
+
+    def visit_instance(self, t: Instance) -> None:
+        if t.last_known_value is not None and not self.last_known_values:
+            self.cacheable = False
+            return
+        if self.collect_infos:
+            self.infos.add(t.type)
+        super().visit_instance(t)
+
+    def visit_callable_type(self, t: CallableType) -> None:
+        if (
+            t.variables
+            or t.type_guard is not None
+            or t.from_concatenate
+            or t.implicit
+            or t.unpack_kwargs
+            or t.from_type_type
+        ):
+            self.cacheable = False
+            return
+        super().visit_callable_type(t)
+
+    def visit_parameters(self, t: Parameters) -> None:
+        if t.variables:
+            self.cacheable = False
+            return
+        super().visit_parameters(t)
+
+    def visit_type_var(self, t: TypeVarType) -> None:
+        if t.id.is_meta_var():
+            self.cacheable = False
+            return
+        t.upper_bound.accept(self)
+        self.traverse_types(t.values)
+
+    def visit_param_spec(self, t: ParamSpecType) -> None:
+        if t.id.is_meta_var():
+            self.cacheable = False
+            return
+        t.upper_bound.accept(self)
+
+    def visit_type_var_tuple(self, t: TypeVarTupleType) -> None:
+        if t.id.is_meta_var():
+            self.cacheable = False
+            return
+        t.upper_bound.accept(self)
+
+    def visit_type_alias_type(self, t: TypeAliasType) -> None:
+        self.cacheable = False
+
+    def visit_unbound_type(self, t: UnboundType) -> None:
+        self.cacheable = False
+
+    def visit_erased_type(self, t: ErasedType) -> None:
+        self.cacheable = False
+
+    def visit_deleted_type(self, t: DeletedType) -> None:
+        self.cacheable = False
+
+    def visit_partial_type(self, t: PartialType) -> None:
+        self.cacheable = False
+
+    def visit_placeholder_type(self, t: PlaceholderType) -> None:
+        self.cacheable = False
+
+
+def _is_subtype_uncached(
+    left: Type, right: Type, subtype_context: SubtypeContext, proper_subtype: bool
+) -> bool:
     orig_right = right
     orig_left = left
     left = get_proper_type(left)
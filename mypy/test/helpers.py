@@ -317,9 +317,15 @@ def assert_type(typ: type, value: object) -> None:
 
 
 def parse_options(
-    program_text: str, testcase: DataDrivenTestCase, incremental_step: int
+    program_text: str,
+    testcase: DataDrivenTestCase,
+    incremental_step: int,
+    server_options: bool = False,
 ) -> Options:
-    """Parse comments like '# flags: --foo' in a test case."""
+    """Parse comments like '# flags: --foo' in a test case.
+
+    If server_options is True, also accept the options of the daemon.
+    """
     options = Options()
     flags = re.search("# flags: (.*)$", program_text, flags=re.MULTILINE)
     if incremental_step > 1:
@@ -330,7 +336,9 @@ def parse_options(
     if flags:
         flag_list = flags.group(1).split()
         flag_list.append("--no-site-packages")  # the tests shouldn't need an installed Python
-        targets, options = process_options(flag_list, require_targets=False)
+        targets, options = process_options(
+            flag_list, require_targets=False, server_options=server_options
+        )
         if targets:
             # TODO: support specifying targets via the flags pragma
             raise RuntimeError("Specifying targets via the flags pragma is not supported.")
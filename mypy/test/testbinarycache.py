@@ -0,0 +1,79 @@
+"""Unit tests for the binary cache data format."""
+
+from __future__ import annotations
+
+import json
+import shutil
+import tempfile
+import unittest
+
+from mypy.binarycache import BinaryCacheError, decode_cache_data, encode_cache_data
+from mypy.metastore import FilesystemMetadataStore
+from mypy.nodes import MypyFile, SymbolTable
+
+
+class TestBinaryCache(unittest.TestCase):
+    def test_round_trip(self) -> None:
+        data = {
+            ".class": "MypyFile",
+            "_fullname": "m",
+            "names": {"x": {".class": "SymbolTableNode", "kind": "Gdef", "flags": [1, -1]}},
+            "is_stub": False,
+            "path": None,
+            "value": 1.5,
+            "big": 2**70,
+        }
+        assert decode_cache_data(encode_cache_data(data)) == data
+
+    def test_same_as_json_round_trip(self) -> None:
+        data = {"items": (1, ("a", True)), "nested": [{"a": None}, []]}
+        expected = json.loads(json.dumps(data))
+        assert decode_cache_data(encode_cache_data(data)) == expected
+
+    def test_serialized_tree(self) -> None:
+        tree = MypyFile([], [])
+        tree._fullname = "mod"
+        tree.names = SymbolTable()
+        data = tree.serialize()
+        result = MypyFile.deserialize(decode_cache_data(encode_cache_data(data)))
+        assert result.fullname == "mod"
+
+    def test_deterministic(self) -> None:
+        # Equal data must produce equal bytes regardless of object identity,
+        # since the interface hash is computed from the encoded data.
+        shared = "shared.name"
+        first = {"a": shared, "b": [shared, shared], "c": 12345}
+        second = json.loads(json.dumps(first))
+        assert encode_cache_data(first) == encode_cache_data(second)
+
+    def test_key_order_ignored(self) -> None:
+        first = {"a": 1, "b": {"x": "s", "y": None}}
+        second = {"b": {"y": None, "x": "s"}, "a": 1}
+        assert encode_cache_data(first) == encode_cache_data(second)
+
+    def test_strings_are_deduplicated(self) -> None:
+        name = "some.very.long.module.name.Class"
+        one = encode_cache_data({"x": [name]})
+        many = encode_cache_data({"x": [name[:4] + name[4:] for _ in range(100)]})
+        assert len(many) < len(one) + 100 * 8
+        result = decode_cache_data(many)
+        assert all(item is result["x"][0] for item in result["x"])
+
+    def test_invalid_data(self) -> None:
+        with self.assertRaises(BinaryCacheError):
+            decode_cache_data(b'{"x": 1}')
+        with self.assertRaises(BinaryCacheError):
+            decode_cache_data(encode_cache_data({"x": 1})[:-3])
+        with self.assertRaises(TypeError):
+            encode_cache_data({"x": {1: 2}})
+
+    def test_metastore_bytes(self) -> None:
+        tempdir = tempfile.mkdtemp()
+        try:
+            store = FilesystemMetadataStore(tempdir)
+            data = encode_cache_data({"x": "y"})
+            assert store.write_bytes("a/b.data.bin", data, mtime=1234)
+            assert store.read_bytes("a/b.data.bin") == data
+            assert store.getmtime("a/b.data.bin") == 1234
+        finally:
+            shutil.rmtree(tempdir)
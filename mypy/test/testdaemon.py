@@ -7,18 +7,40 @@ This also includes some unit tests.
 
 from __future__ import annotations
 
+import io
+import json
 import os
+import shutil
+import socket
 import subprocess
 import sys
 import tempfile
+import threading
 import unittest
+from multiprocessing import Process, Queue
 
-from mypy.dmypy_server import filter_out_missing_top_level_packages
+from mypy import build
+from mypy.dmypy.client import request
+from mypy.dmypy_server import (
+    MiB,
+    Request,
+    Server,
+    ThreadLocalStream,
+    can_merge_rechecks,
+    filter_out_missing_top_level_packages,
+    get_meminfo,
+    get_rebuild_threshold,
+    merge_rechecks,
+    redirect_output,
+)
 from mypy.fscache import FileSystemCache
-from mypy.modulefinder import SearchPaths
+from mypy.modulefinder import BuildSource, SearchPaths
+from mypy.options import Options
+from mypy.server.update import ensure_trees_loaded
 from mypy.test.config import PREFIX, test_temp_dir
 from mypy.test.data import DataDrivenTestCase, DataSuite
 from mypy.test.helpers import assert_string_arrays_equal, normalize_error_messages
+from mypy.version import __version__
 
 # Files containing test cases descriptions.
 daemon_files = ["daemon.test"]
@@ -124,9 +146,244 @@ class DaemonUtilitySuite(unittest.TestCase):
             )
             assert res == {"a", "b", "c", "d", "f", "long_name"}
 
+    def test_rebuild_threshold(self) -> None:
+        options = Options()
+        few = [BuildSource(f"m{i}.py", f"m{i}") for i in range(10)]
+        many = [BuildSource(f"m{i}.py", f"m{i}") for i in range(1000)]
+        assert get_rebuild_threshold(options, few) == 100
+        assert get_rebuild_threshold(options, many) == 500
+        options.rebuild_threshold = 3
+        assert get_rebuild_threshold(options, many) == 3
+
     def make_file(self, base: str, path: str) -> None:
         fullpath = os.path.join(base, path)
         os.makedirs(os.path.dirname(fullpath), exist_ok=True)
         if not path.endswith("/"):
             with open(fullpath, "w") as f:
                 f.write("# test file")
+
+    def test_merge_rechecks(self) -> None:
+        def recheck(remove: list[str] | None = None, update: list[str] | None = None) -> Request:
+            data = {"is_tty": False, "terminal_width": 80, "export_types": False}
+            return Request("recheck", dict(data, remove=remove, update=update))
+
+        plain = recheck()
+        assert can_merge_rechecks(plain, recheck())
+        assert not can_merge_rechecks(plain, recheck(update=["a.py"]))
+        assert not can_merge_rechecks(plain, Request("check", dict(plain.data)))
+        assert not can_merge_rechecks(plain, Request("recheck", dict(plain.data, is_tty=True)))
+        assert merge_rechecks([plain, recheck()]).data == plain.data
+
+        first = recheck(remove=["a.py"], update=["b.py"])
+        second = recheck(remove=["b.py"], update=["a.py", "c.py"])
+        assert can_merge_rechecks(first, second)
+        merged = merge_rechecks([first, second])
+        assert merged.command == "recheck"
+        assert merged.data["remove"] == ["b.py"]
+        assert merged.data["update"] == ["a.py", "c.py"]
+
+    def test_redirect_output_per_thread(self) -> None:
+        saved = sys.stdout, sys.stderr
+        sys.stdout = ThreadLocalStream(io.StringIO())  # type: ignore[assignment]
+        sys.stderr = ThreadLocalStream(io.StringIO())  # type: ignore[assignment]
+        barrier = threading.Barrier(2)
+        outputs: dict[str, tuple[str, str]] = {}
+
+        def run(name: str) -> None:
+            stdout, stderr = io.StringIO(), io.StringIO()
+            with redirect_output(stdout, stderr):
+                # Both threads are redirecting their output at this point.
+                barrier.wait()
+                print(name)
+                print(name, file=sys.stderr)
+                barrier.wait()
+            outputs[name] = stdout.getvalue(), stderr.getvalue()
+
+        try:
+            threads = [threading.Thread(target=run, args=(name,)) for name in ("a", "b")]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        finally:
+            sys.stdout, sys.stderr = saved
+        assert outputs == {"a": ("a\n", "a\n"), "b": ("b\n", "b\n")}
+
+
+def old_daemon(q: Queue[str]) -> None:
+    """Answer a single request like a daemon using IPC protocol version 1."""
+    sock_dir = tempfile.mkdtemp()
+    sock = socket.socket(socket.AF_UNIX)
+    sock.bind(os.path.join(sock_dir, "old.sock"))
+    sock.listen(1)
+    q.put(sock.getsockname())
+    conn, _ = sock.accept()
+    data = b""
+    while True:
+        more = conn.recv(1000)
+        if not more:
+            break
+        data += more
+    request = json.loads(data)
+    assert request["command"] == "run" and "stream_diagnostics" not in request, request
+    conn.sendall(json.dumps({"restart": "mypy version changed"}).encode())
+    conn.shutdown(socket.SHUT_WR)
+    conn.close()
+    shutil.rmtree(sock_dir)
+
+
+@unittest.skipIf(sys.platform == "win32", "the IPC protocol only differs on Unix")
+class ProtocolSuite(unittest.TestCase):
+    def test_old_daemon(self) -> None:
+        queue: Queue[str] = Queue()
+        p = Process(target=old_daemon, args=(queue,), daemon=True)
+        p.start()
+        with tempfile.TemporaryDirectory() as td:
+            status_file = os.path.join(td, "status.json")
+            with open(status_file, "w") as f:
+                json.dump({"pid": p.pid, "connection_name": queue.get()}, f)
+            response = request(
+                status_file,
+                "run",
+                timeout=5,
+                on_diagnostics=lambda messages: None,
+                version=__version__,
+                args=[],
+                export_types=False,
+            )
+        p.join()
+        assert p.exitcode == 0
+        assert response["restart"] == "mypy version changed", response
+
+    def test_streamed_diagnostics_from_cache(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            with open(os.path.join(td, "a.py"), "w") as f:
+                f.write("x: int = ''\n")
+            with open(os.path.join(td, "b.py"), "w") as f:
+                f.write("import a\ny: str = 1\n")
+            env = os.environ.copy()
+            env["PYTHONPATH"] = PREFIX
+            subprocess.run(
+                [sys.executable, "-m", "mypy", "--cache-fine-grained", "a.py", "b.py"],
+                cwd=td,
+                env=env,
+                stdout=subprocess.DEVNULL,
+            )
+            # Change b.py, so that the daemon runs an update after loading the cache.
+            with open(os.path.join(td, "b.py"), "w") as f:
+                f.write("import a\ny: str = 2\n")
+            status_file = os.path.join(td, "status.json")
+            subprocess.check_call(
+                [
+                    sys.executable,
+                    "-m",
+                    "mypy.dmypy",
+                    "--status-file",
+                    status_file,
+                    "start",
+                    "--",
+                    "--use-fine-grained-cache",
+                ],
+                cwd=td,
+                env=env,
+                stdout=subprocess.DEVNULL,
+            )
+            try:
+                streamed: list[str] = []
+                response = request(
+                    status_file,
+                    "check",
+                    on_diagnostics=streamed.extend,
+                    files=["a.py", "b.py"],
+                    export_types=False,
+                )
+            finally:
+                request(status_file, "stop")
+        messages = [line for line in str(response["out"]).splitlines() if ": error:" in line]
+        assert len(messages) == 2, response
+        assert sorted(streamed) == sorted(messages)
+
+
+class MemoryBudgetSuite(unittest.TestCase):
+    def test_modules_used_recently_are_evicted_last(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            old_cwd = os.getcwd()
+            os.chdir(td)
+            try:
+                for id in ["hot", "cold"]:
+                    with open(f"{id}.py", "w") as f:
+                        f.write("x = 1\n")
+                options = Options()
+                options.cache_fine_grained = True
+                options.local_partial_types = True
+                sources = [BuildSource(f"{id}.py", id) for id in ["hot", "cold"]]
+                build.build(sources, options)
+                options.use_fine_grained_cache = True
+                server = Server(options, "status.json")
+                server.check(sources, export_types=False, is_tty=False, terminal_width=-1)
+                manager = server.fine_grained_manager
+                assert manager is not None
+                # Use hot, then cold and then hot again.
+                for id in ["hot", "cold", "hot"]:
+                    with open(f"{id}.py", "a") as f:
+                        f.write("y = 1\n")
+                    server.check(sources, export_types=False, is_tty=False, terminal_width=-1)
+                last_used = manager.manager.fg_last_used
+                assert last_used["cold"] < last_used["hot"], last_used
+                assert manager.evict_cold_modules(1) == ["cold"]
+                # The modified tree of cold is kept encoded until it's loaded again.
+                evicted_tree = manager.graph["cold"].evicted_tree
+                assert evicted_tree is not None
+                assert get_meminfo(manager)["evicted_trees_mib"] == len(evicted_tree) / MiB
+                ensure_trees_loaded(manager.manager, manager.graph, ["cold"])
+                assert get_meminfo(manager)["evicted_trees_mib"] == 0
+            finally:
+                os.chdir(old_cwd)
+
+
+@unittest.skipIf(sys.platform == "win32", "requests are served one at a time on Windows")
+class ConcurrentRequestsSuite(unittest.TestCase):
+    def test_concurrent_requests(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            status_file = os.path.join(td, "status.json")
+            dump_file = os.path.join(td, "fswatcher.json")
+            env = os.environ.copy()
+            env["PYTHONPATH"] = PREFIX
+            subprocess.check_call(
+                [sys.executable, "-m", "mypy.dmypy", "--status-file", status_file, "start"],
+                cwd=td,
+                env=env,
+                stdout=subprocess.DEVNULL,
+            )
+            try:
+                responses: dict[str, dict[str, object]] = {}
+
+                def run() -> None:
+                    responses["run"] = request(
+                        status_file,
+                        "run",
+                        version=__version__,
+                        args=["--no-such-flag"],
+                        export_types=False,
+                    )
+
+                def status() -> None:
+                    responses["status"] = request(
+                        status_file, "status", fswatcher_dump_file=dump_file
+                    )
+
+                for _ in range(5):
+                    threads = [threading.Thread(target=run), threading.Thread(target=status)]
+                    for t in threads:
+                        t.start()
+                    for t in threads:
+                        t.join()
+                    run_response = responses["run"]
+                    assert run_response["status"] == 2, run_response
+                    assert "unrecognized arguments" in str(run_response["err"])
+                    assert not run_response["stdout"] and not run_response["stderr"]
+                    assert "error" not in responses["status"], responses["status"]
+                    with open(dump_file) as f:
+                        assert isinstance(json.load(f), dict)
+            finally:
+                request(status_file, "stop")
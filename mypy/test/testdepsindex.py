@@ -0,0 +1,55 @@
+"""Unit tests for the fine-grained dependency index."""
+
+from __future__ import annotations
+
+import shutil
+import tempfile
+import unittest
+
+from mypy.depsindex import FineGrainedDepsIndex
+
+
+class TestFineGrainedDepsIndex(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tempdir = tempfile.mkdtemp()
+        self.index = FineGrainedDepsIndex(self.tempdir)
+
+    def tearDown(self) -> None:
+        self.index.close()
+        shutil.rmtree(self.tempdir)
+
+    def test_lookup(self) -> None:
+        self.index.merge({"a": {"<a.f>": {"b.g", "c"}}, "b": {"<b.x>": {"a"}}})
+        assert self.index.lookup("<a.f>") == {"b.g", "c"}
+        assert self.index.lookup("<b.x>") == {"a"}
+        assert self.index.lookup("<c.y>") == set()
+        assert self.index.lookup_many(["<a.f>", "<b.x>", "<c.y>"]) == {
+            "<a.f>": {"b.g", "c"},
+            "<b.x>": {"a"},
+        }
+
+    def test_merge_adds_targets(self) -> None:
+        self.index.merge({"a": {"<a.f>": {"b"}, "<a.g>": {"c"}}})
+        self.index.merge({"a": {"<a.f>": {"d"}}})
+        assert self.index.module_deps("a") == {"<a.f>": {"b", "d"}, "<a.g>": {"c"}}
+
+    def test_same_trigger_in_several_modules(self) -> None:
+        self.index.merge({"a": {"<x.y>": {"a"}}, "@root": {"<x.y>": {"b"}}})
+        assert self.index.lookup("<x.y>") == {"a", "b"}
+        self.index.remove_modules(["a"])
+        assert self.index.lookup("<x.y>") == {"b"}
+        assert self.index.module_deps("a") == {}
+
+    def test_generation(self) -> None:
+        assert self.index.generation() is None
+        gen = self.index.merge({"a": {"<a.f>": {"b"}}})
+        assert self.index.generation() == gen
+        index = FineGrainedDepsIndex(self.tempdir)
+        try:
+            assert index.generation() == gen
+            assert index.merge({}) != gen
+        finally:
+            index.close()
+        self.index.clear()
+        assert self.index.generation() is None
+        assert self.index.lookup("<a.f>") == set()
@@ -3,14 +3,19 @@
 from __future__ import annotations
 
 import os
+import unittest
 
 from mypy import build
 from mypy.defaults import PYTHON3_VERSION
 from mypy.errors import CompileError
 from mypy.modulefinder import BuildSource
-from mypy.nodes import MypyFile
+from mypy.nodes import MypyFile, Var
 from mypy.options import Options
-from mypy.server.astdiff import compare_symbol_table_snapshots, snapshot_symbol_table
+from mypy.server.astdiff import (
+    SymbolTableSnapshots,
+    compare_symbol_table_snapshots,
+    snapshot_symbol_table,
+)
 from mypy.test.config import test_temp_dir
 from mypy.test.data import DataDrivenTestCase, DataSuite
 from mypy.test.helpers import assert_string_arrays_equal, parse_options
@@ -65,3 +70,36 @@ class ASTDiffSuite(DataSuite):
             # TODO: Is it okay to return None?
             return e.messages, None
         return result.errors, result.files
+
+
+class SymbolTableSnapshotsSuite(unittest.TestCase):
+    def test_snapshot_only_given_names(self) -> None:
+        messages, files = ASTDiffSuite().build("x = 1\ny = ''\ndef f() -> None: pass", Options())
+        assert files is not None, messages
+        tree = files["__main__"]
+        snapshots = SymbolTableSnapshots()
+        snapshot1 = snapshots.snapshot(tree)
+        x = tree.names["x"].node
+        y = tree.names["y"].node
+        assert isinstance(x, Var) and isinstance(y, Var)
+        x.type = y.type
+        del tree.names["f"]
+        snapshot2 = snapshots.snapshot(tree, {"x"})
+        assert snapshot2["y"] is snapshot1["y"]
+        assert "f" not in snapshot2
+        names = {"x"} | (snapshot1.keys() ^ snapshot2.keys())
+        assert compare_symbol_table_snapshots("__main__", snapshot1, snapshot2, names) == {
+            "__main__.x",
+            "__main__.f",
+        }
+        assert snapshot2 == snapshot_symbol_table("__main__", tree.names)
+
+    def test_snapshot_of_other_tree(self) -> None:
+        build = ASTDiffSuite().build
+        _, files1 = build("x = 1", Options())
+        _, files2 = build("x = ''", Options())
+        assert files1 is not None and files2 is not None
+        snapshots = SymbolTableSnapshots()
+        snapshot1 = snapshots.snapshot(files1["__main__"])
+        snapshot2 = snapshots.snapshot(files2["__main__"], set())
+        assert snapshot1["x"] != snapshot2["x"]
@@ -140,7 +140,7 @@ class FineGrainedSuite(DataSuite):
 
     def get_options(self, source: str, testcase: DataDrivenTestCase, build_cache: bool) -> Options:
         # This handles things like '# flags: --foo'.
-        options = parse_options(source, testcase, incremental_step=1)
+        options = parse_options(source, testcase, incremental_step=1, server_options=True)
         options.incremental = True
         options.use_builtins_fixtures = True
         options.show_traceback = True
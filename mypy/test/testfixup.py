@@ -0,0 +1,65 @@
+"""Tests for lazy deserialization and fixup of cached modules."""
+
+from __future__ import annotations
+
+import unittest
+
+from mypy.fixup import fixup_module
+from mypy.nodes import GDEF, MypyFile, SymbolTable, SymbolTableNode, Var
+from mypy.types import AnyType, TypeOfAny
+
+
+def make_module(fullname: str, names: dict[str, SymbolTableNode]) -> MypyFile:
+    tree = MypyFile([], [])
+    tree._fullname = fullname
+    tree.names = SymbolTable(names)
+    tree.is_partial_stub_package = False
+    tree.future_import_flags = set()
+    return tree
+
+
+def make_var(fullname: str) -> Var:
+    var = Var(fullname.rsplit(".", 1)[-1], AnyType(TypeOfAny.special_form))
+    var._fullname = fullname
+    return var
+
+
+class LazyFixupSuite(unittest.TestCase):
+    def round_trip(self, lazy: bool) -> tuple[MypyFile, MypyFile]:
+        x = make_var("a.x")
+        a = make_module("a", {"x": SymbolTableNode(GDEF, x)})
+        b = make_module(
+            "b", {"y": SymbolTableNode(GDEF, make_var("b.y")), "x": SymbolTableNode(GDEF, x)}
+        )
+        new_a = MypyFile.deserialize(a.serialize(), lazy=lazy)
+        new_b = MypyFile.deserialize(b.serialize(), lazy=lazy)
+        modules = {"a": new_a, "b": new_b}
+        fixup_module(new_a, modules, False, lazy=lazy)
+        fixup_module(new_b, modules, False, lazy=lazy)
+        return new_a, new_b
+
+    def test_eager(self) -> None:
+        a, b = self.round_trip(lazy=False)
+        assert not b.names["y"].is_deferred()
+        assert b.names["x"].node is a.names["x"].node
+
+    def test_lazy(self) -> None:
+        a, b = self.round_trip(lazy=True)
+        assert b.names["y"].is_deferred()
+        assert b.names["x"].is_deferred()
+        y = b.names["y"].node
+        assert isinstance(y, Var)
+        assert y.fullname == "b.y"
+        assert not b.names["y"].is_deferred()
+        # The cross-reference is resolved on first access, loading a.x as well.
+        x = b.names["x"].node
+        assert isinstance(x, Var)
+        assert x is a.names["x"].node
+        assert not a.names["x"].is_deferred()
+
+    def test_lazy_node_assignment(self) -> None:
+        _, b = self.round_trip(lazy=True)
+        var = make_var("b.z")
+        b.names["y"].node = var
+        assert not b.names["y"].is_deferred()
+        assert b.names["y"].node is var
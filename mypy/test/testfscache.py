@@ -9,6 +9,7 @@ import tempfile
 import unittest
 
 from mypy.fscache import FileSystemCache
+from mypy.util import hash_digest
 
 
 class TestFileSystemCache(unittest.TestCase):
@@ -88,6 +89,17 @@ class TestFileSystemCache(unittest.TestCase):
                 # this path is not under the prefix, case difference is fine.
                 assert self.isfile_case(os.path.join(other, "PKG/other_dir.py"))
 
+    def test_hash_algorithm(self) -> None:
+        self.make_file("bar.py")
+        sha256 = self.fscache.hash_digest("bar.py")
+        assert sha256 == hash_digest(b"# test file")
+        self.fscache.set_hash_algorithm("blake2b")
+        blake2b = self.fscache.hash_digest("bar.py")
+        assert blake2b == hash_digest(b"# test file", "blake2b")
+        assert blake2b.startswith("blake2b:")
+        self.fscache.flush()
+        assert self.fscache.hash_digest("bar.py") == blake2b
+
     def make_file(self, path: str, base: str | None = None) -> None:
         if base is None:
             base = self.tempdir
@@ -0,0 +1,143 @@
+"""Unit tests for file system watchers."""
+
+from __future__ import annotations
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from mypy.fscache import FileSystemCache
+from mypy.fswatcher import (
+    PARALLEL_CHECK_THRESHOLD,
+    FileSystemWatcher,
+    InotifyFileSystemWatcher,
+    create_watcher,
+)
+
+
+class TestFileSystemWatcher(unittest.TestCase):
+    use_inotify = False
+
+    def setUp(self) -> None:
+        self.tempdir = tempfile.mkdtemp()
+        self.oldcwd = os.getcwd()
+        os.chdir(self.tempdir)
+        self.fscache = FileSystemCache()
+        self.watcher = create_watcher(self.fscache, use_inotify=self.use_inotify)
+
+    def tearDown(self) -> None:
+        self.watcher.close()
+        os.chdir(self.oldcwd)
+        shutil.rmtree(self.tempdir)
+
+    def make_file(self, path: str, content: str = "") -> None:
+        dir = os.path.dirname(path)
+        if dir:
+            os.makedirs(dir, exist_ok=True)
+        with open(path, "w") as f:
+            f.write(content)
+
+    def find_changed(self) -> set[str]:
+        self.fscache.flush()
+        return set(self.watcher.find_changed())
+
+    def test_find_changed(self) -> None:
+        self.make_file("a.py")
+        self.make_file("pkg/b.py")
+        self.watcher.add_watched_paths(["a.py", "pkg/b.py", "pkg/c.py"])
+        assert self.find_changed() == {"a.py", "pkg/b.py"}
+        assert self.find_changed() == set()
+        self.make_file("pkg/b.py", "x = 1")
+        self.make_file("pkg/c.py")
+        assert self.find_changed() == {"pkg/b.py", "pkg/c.py"}
+        os.remove("a.py")
+        assert self.find_changed() == {"a.py"}
+        assert self.find_changed() == set()
+
+    def test_removed_and_recreated_directory(self) -> None:
+        self.make_file("pkg/a.py")
+        self.watcher.add_watched_paths(["pkg/a.py"])
+        assert self.find_changed() == {"pkg/a.py"}
+        shutil.rmtree("pkg")
+        assert self.find_changed() == {"pkg/a.py"}
+        self.make_file("pkg/a.py", "x = 1")
+        assert self.find_changed() == {"pkg/a.py"}
+        self.make_file("pkg/a.py", "x = 12")
+        assert self.find_changed() == {"pkg/a.py"}
+
+    def test_find_changed_many_paths(self) -> None:
+        paths = [f"m{i}.py" for i in range(PARALLEL_CHECK_THRESHOLD)]
+        for path in paths:
+            self.make_file(path)
+        self.watcher.add_watched_paths(paths)
+        assert self.find_changed() == set(paths)
+        assert self.find_changed() == set()
+        self.make_file("m1.py", "x = 1")
+        os.remove("m2.py")
+        assert self.find_changed() == {"m1.py", "m2.py"}
+
+    def test_update_changed(self) -> None:
+        self.make_file("a.py")
+        self.make_file("b.py")
+        self.watcher.add_watched_paths(["a.py"])
+        assert self.find_changed() == {"a.py"}
+        self.make_file("a.py", "x = 1")
+        self.fscache.flush()
+        assert set(self.watcher.update_changed([], ["b.py"])) == {"b.py"}
+        # Changes to other files are still found later.
+        assert self.find_changed() == {"a.py"}
+        self.fscache.flush()
+        assert set(self.watcher.update_changed(["b.py"], [])) == set()
+        assert self.find_changed() == set()
+
+
+@unittest.skipUnless(sys.platform.startswith("linux"), "inotify is only available on Linux")
+class TestInotifyFileSystemWatcher(TestFileSystemWatcher):
+    use_inotify = True
+
+    def test_uses_inotify(self) -> None:
+        assert isinstance(self.watcher, InotifyFileSystemWatcher)
+
+    def test_only_dirty_paths_are_checked(self) -> None:
+        watcher = self.watcher
+        assert isinstance(watcher, InotifyFileSystemWatcher)
+        self.make_file("a.py")
+        self.make_file("b.py")
+        watcher.add_watched_paths(["a.py", "b.py"])
+        assert self.find_changed() == {"a.py", "b.py"}
+        checked: list[str] = []
+        orig_stat = self.fscache.stat
+
+        def stat(path: str) -> os.stat_result:
+            checked.append(path)
+            return orig_stat(path)
+
+        self.fscache.stat = stat  # type: ignore[method-assign]
+        assert self.find_changed() == set()
+        assert checked == []
+        self.make_file("b.py", "x = 1")
+        assert self.find_changed() == {"b.py"}
+        assert set(checked) == {"b.py"}
+
+    def test_overflow_polls_all_paths(self) -> None:
+        watcher = self.watcher
+        assert isinstance(watcher, InotifyFileSystemWatcher)
+        self.make_file("a.py")
+        watcher.add_watched_paths(["a.py"])
+        assert self.find_changed() == {"a.py"}
+        # Simulate a lost event followed by a queue overflow.
+        watcher._inotify.read_events()
+        watcher._overflowed = True
+        self.make_file("a.py", "x = 1")
+        watcher._inotify.read_events()
+        assert self.find_changed() == {"a.py"}
+        assert watcher.full_polls == 1
+        assert self.find_changed() == set()
+
+
+class TestCreateWatcher(unittest.TestCase):
+    def test_polling_by_default(self) -> None:
+        watcher = create_watcher(FileSystemCache())
+        assert type(watcher) is FileSystemWatcher
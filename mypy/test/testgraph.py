@@ -2,14 +2,17 @@
 
 from __future__ import annotations
 
+import os
 import sys
+import tempfile
 from typing import AbstractSet
 
+from mypy import build
 from mypy.build import BuildManager, BuildSourceSet, State, order_ascc, sorted_components
 from mypy.errors import Errors
 from mypy.fscache import FileSystemCache
 from mypy.graph_utils import strongly_connected_components, topsort
-from mypy.modulefinder import SearchPaths
+from mypy.modulefinder import BuildSource, SearchPaths
 from mypy.options import Options
 from mypy.plugin import Plugin
 from mypy.report import Reports
@@ -81,3 +84,29 @@ class GraphSuite(Suite):
         ascc = res[0]
         scc = order_ascc(graph, ascc)
         assert_equal(scc, ["d", "c", "b", "a"])
+
+    def test_parallel_jobs(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            files = {"a": "x = 1", "b": "from a import x\ny: str = x", "c": "import a"}
+            sources = []
+            for id, text in files.items():
+                path = os.path.join(tmpdir, f"{id}.py")
+                with open(path, "w") as f:
+                    f.write(text)
+                sources.append(BuildSource(path, id))
+            options = Options()
+            options.cache_dir = os.path.join(tmpdir, ".mypy_cache")
+            options.jobs = 2
+            result = build.build(sources, options)
+            stats = result.manager.stats
+            assert stats["parallel_batches"] > 0
+            # Modules with errors are left to the sequential pass.
+            assert stats["parallel_warmed_modules"] > 0
+            assert "a" in result.files and "c" in result.files
+            assert_equal(
+                [e.split(": ", 1)[1] for e in result.errors],
+                [
+                    "error: Incompatible types in assignment "
+                    '(expression has type "int", variable has type "str")  [assignment]'
+                ],
+            )
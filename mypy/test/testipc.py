@@ -1,6 +1,10 @@
 from __future__ import annotations
 
+import os
+import shutil
+import socket
 import sys
+import tempfile
 import time
 from multiprocessing import Process, Queue
 from unittest import TestCase, main
@@ -23,6 +27,39 @@ def server(msg: str, q: Queue[str]) -> None:
     server.cleanup()
 
 
+def echo_server(q: Queue[str]) -> None:
+    server = IPCServer(CONNECTION_NAME)
+    q.put(server.connection_name)
+    with server:
+        while True:
+            data = server.read()
+            if not data:
+                break
+            server.write(data.upper())
+    server.cleanup()
+
+
+def legacy_server(q: Queue[str]) -> None:
+    # A server using protocol version 1: one message each way, ended by shutdown().
+    sock_dir = tempfile.mkdtemp()
+    sock = socket.socket(socket.AF_UNIX)
+    sock.bind(os.path.join(sock_dir, "legacy.sock"))
+    sock.listen(1)
+    q.put(sock.getsockname())
+    conn, _ = sock.accept()
+    data = b""
+    while True:
+        more = conn.recv(1000)
+        if not more:
+            break
+        data += more
+    conn.sendall(data.upper())
+    conn.shutdown(socket.SHUT_WR)
+    conn.close()
+    sock.close()
+    shutil.rmtree(sock_dir)
+
+
 class IPCTests(TestCase):
     def test_transaction_large(self) -> None:
         queue: Queue[str] = Queue()
@@ -55,6 +92,63 @@ class IPCTests(TestCase):
         p.join()
         assert p.exitcode == 0
 
+    @pytest.mark.skipif(sys.platform == "win32", reason="Reading a closed pipe raises on Windows")
+    def test_multiple_messages(self) -> None:
+        queue: Queue[str] = Queue()
+        p = Process(target=echo_server, args=(queue,), daemon=True)
+        p.start()
+        connection_name = queue.get()
+        with IPCClient(connection_name, timeout=1) as client:
+            # Messages are delivered separately, even if several are sent at once.
+            client.write(b"first")
+            client.write(b"second" * 100000)
+            assert client.read() == b"FIRST"
+            assert client.read() == b"SECOND" * 100000
+            client.write(b"third")
+            assert client.read() == b"THIRD"
+        queue.close()
+        queue.join_thread()
+        p.join()
+        assert p.exitcode == 0
+
+    @pytest.mark.skipif(sys.platform == "win32", reason="Only Unix sockets have framing")
+    def test_legacy_server(self) -> None:
+        queue: Queue[str] = Queue()
+        p = Process(target=legacy_server, args=(queue,), daemon=True)
+        p.start()
+        connection_name = queue.get()
+        with IPCClient(connection_name, timeout=1, framed=False) as client:
+            client.write(b'{"command": "status"}')
+            assert client.read() == b'{"COMMAND": "STATUS"}'
+        queue.close()
+        queue.join_thread()
+        p.join()
+        assert p.exitcode == 0
+
+    @pytest.mark.skipif(sys.platform == "win32", reason="Only Unix sockets have framing")
+    def test_legacy_client(self) -> None:
+        queue: Queue[str] = Queue()
+        p = Process(target=echo_server, args=(queue,), daemon=True)
+        p.start()
+        connection_name = queue.get()
+        # A client using protocol version 1 doesn't send a frame header.
+        with socket.socket(socket.AF_UNIX) as sock:
+            sock.settimeout(1)
+            sock.connect(connection_name)
+            sock.sendall(b'{"command": "status"}')
+            sock.shutdown(socket.SHUT_WR)
+            data = b""
+            while True:
+                more = sock.recv(1000)
+                if not more:
+                    break
+                data += more
+        assert data == b'{"COMMAND": "STATUS"}'
+        queue.close()
+        queue.join_thread()
+        p.join()
+        assert p.exitcode == 0
+
     # Run test_connect_twice a lot, in the hopes of finding issues.
     # This is really slow, so it is skipped, but can be enabled if
     # needed to debug IPC issues.
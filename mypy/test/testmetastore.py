@@ -0,0 +1,142 @@
+"""Unit tests for the metadata stores."""
+
+from __future__ import annotations
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from mypy.metastore import (
+    PARALLEL_READ_THRESHOLD,
+    BundleMetadataStore,
+    FilesystemMetadataStore,
+    LayeredMetadataStore,
+    MetadataStore,
+    SqliteMetadataStore,
+    write_cache_bundle,
+)
+
+
+class MetastoreSuite(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tempdir = tempfile.mkdtemp()
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.tempdir)
+
+    def stores(self) -> list[MetadataStore]:
+        return [FilesystemMetadataStore(self.tempdir), SqliteMetadataStore(self.tempdir)]
+
+    def test_many(self) -> None:
+        for store in self.stores():
+            written = store.write_many({"a.meta.json": "a", "b/c.data.json": "c"}, mtime=12)
+            assert written == {"a.meta.json", "b/c.data.json"}
+            assert store.read_many(["a.meta.json", "b/c.data.json", "x.meta.json"]) == {
+                "a.meta.json": "a",
+                "b/c.data.json": "c",
+            }
+            assert store.getmtime_many(["a.meta.json", "x.meta.json"]) == {"a.meta.json": 12}
+
+    def test_sqlite_prefetch(self) -> None:
+        store = SqliteMetadataStore(self.tempdir)
+        store.write("a.meta.json", "a", mtime=1)
+        store.write("a.data.json", "data", mtime=2)
+        store.commit()
+
+        store = SqliteMetadataStore(self.tempdir)
+        assert store.read("a.meta.json") == "a"
+        assert store._prefetched_data == {}
+        assert store.getmtime("a.data.json") == 2
+        # Entries are dropped from the prefetched data when modified.
+        assert store.write("a.data.json", "new", mtime=3)
+        assert store.getmtime("a.data.json") == 3
+        store.remove("a.meta.json")
+        with self.assertRaises(FileNotFoundError):
+            store.read("a.meta.json")
+
+    def test_sqlite_prefetch_other_writer(self) -> None:
+        for wal in (False, True):
+            store = SqliteMetadataStore(self.tempdir, wal=wal)
+            store.write_many({"a.meta.json": "a", "b.meta.json": "b"}, mtime=1)
+            store.commit()
+
+            store = SqliteMetadataStore(self.tempdir, wal=wal)
+            assert store.read("a.meta.json") == "a"
+            # Another process changes the cache after the prefetch.
+            other = SqliteMetadataStore(self.tempdir, wal=wal)
+            assert other.write("b.meta.json", "new", mtime=2)
+            other.commit()
+            assert store.read("b.meta.json") == "new"
+            assert store.getmtime("b.meta.json") == 2
+
+    def test_sqlite_wal_is_opt_in(self) -> None:
+        def journal_mode(store: SqliteMetadataStore) -> str:
+            assert store.db is not None
+            mode = store.db.execute("PRAGMA journal_mode").fetchone()[0]
+            assert isinstance(mode, str)
+            return mode
+
+        assert journal_mode(SqliteMetadataStore(os.path.join(self.tempdir, "a"))) != "wal"
+        assert (
+            journal_mode(SqliteMetadataStore(os.path.join(self.tempdir, "b"), wal=True)) == "wal"
+        )
+
+    def test_filesystem_prefetch(self) -> None:
+        store = FilesystemMetadataStore(self.tempdir)
+        entries = {f"m{i}.meta.json": str(i) for i in range(PARALLEL_READ_THRESHOLD)}
+        store.write_many(entries)
+        store.prefetch(list(entries) + ["x.meta.json"])
+        assert store._prefetched_data == entries
+        assert store.read("m0.meta.json") == "0"
+        assert "m0.meta.json" not in store._prefetched_data
+        # Entries are dropped from the prefetched data when modified.
+        assert store.write("m1.meta.json", "new")
+        assert store.read("m1.meta.json") == "new"
+        store.remove("m2.meta.json")
+        with self.assertRaises(FileNotFoundError):
+            store.read("m2.meta.json")
+
+    def test_sqlite_many_names(self) -> None:
+        store = SqliteMetadataStore(self.tempdir)
+        entries = {f"m{i}.meta.json": str(i) for i in range(2000)}
+        assert store.write_many(entries) == set(entries)
+        assert store.read_many(entries) == entries
+
+    def make_bundle(self) -> str:
+        reference = FilesystemMetadataStore(os.path.join(self.tempdir, "reference"))
+        reference.write("a.meta.json", "a", mtime=1)
+        reference.write_bytes("b/c.data.bin", b"\x00c", mtime=2)
+        path = os.path.join(self.tempdir, "cache.bundle")
+        assert write_cache_bundle(reference, path) == 2
+        return path
+
+    def test_bundle(self) -> None:
+        store = BundleMetadataStore(self.make_bundle())
+        assert store.read("a.meta.json") == "a"
+        assert store.read_bytes("b/c.data.bin") == b"\x00c"
+        assert store.getmtime("b/c.data.bin") == 2
+        assert sorted(store.list_all()) == ["a.meta.json", "b/c.data.bin"]
+        with self.assertRaises(FileNotFoundError):
+            store.read("x.meta.json")
+        assert not store.write("x.meta.json", "x")
+
+    def test_missing_bundle(self) -> None:
+        store = BundleMetadataStore(os.path.join(self.tempdir, "missing.bundle"))
+        assert list(store.list_all()) == []
+        with self.assertRaises(FileNotFoundError):
+            store.read("a.meta.json")
+
+    def test_layered(self) -> None:
+        base = BundleMetadataStore(self.make_bundle())
+        overlay = FilesystemMetadataStore(os.path.join(self.tempdir, "local"))
+        store = LayeredMetadataStore(base, overlay)
+        assert store.read("a.meta.json") == "a"
+        assert store.write("a.meta.json", "new", mtime=5)
+        assert store.read("a.meta.json") == "new"
+        assert store.getmtime("a.meta.json") == 5
+        assert BundleMetadataStore(self.make_bundle()).read("a.meta.json") == "a"
+        store.remove("b/c.data.bin")
+        with self.assertRaises(FileNotFoundError):
+            store.read_bytes("b/c.data.bin")
+        assert sorted(os.path.normpath(name) for name in store.list_all()) == ["a.meta.json"]
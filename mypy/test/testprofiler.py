@@ -0,0 +1,47 @@
+"""Unit tests for the build profiler."""
+
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import unittest
+
+from mypy.profiler import BuildProfiler
+from mypy.util import time_ref
+
+
+class BuildProfilerSuite(unittest.TestCase):
+    def test_record(self) -> None:
+        profiler = BuildProfiler()
+        t0 = time_ref()
+        profiler.record("parse", t0, "m")
+        profiler.record("parse", t0, "m")
+        profiler.record("semanal", t0, scc=["b", "a"])
+        profiler.count("deferred nodes", 3)
+        profiler.count("deferred nodes")
+        assert [e["name"] for e in profiler.events] == [
+            "parse m",
+            "parse m",
+            "semanal",
+            "deferred nodes",
+            "deferred nodes",
+        ]
+        assert profiler.events[2]["args"] == {"modules": ["a", "b"]}
+        assert profiler.events[4]["args"] == {"deferred nodes": 4}
+        assert list(profiler.summary()) == ["m"]
+        assert list(profiler.summary()["m"]) == ["parse"]
+
+    def test_write_chrome_trace(self) -> None:
+        profiler = BuildProfiler()
+        profiler.record("parse", time_ref(), "m")
+        profiler.count("stale sccs")
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "trace.json")
+            profiler.write_chrome_trace(path)
+            with open(path) as f:
+                data = json.load(f)
+        assert len(data["traceEvents"]) == 2
+        assert data["traceEvents"][0]["ph"] == "X"
+        assert data["otherData"]["counters"] == {"stale sccs": 1}
+        assert list(data["moduleSummary"]) == ["m"]
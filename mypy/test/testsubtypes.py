@@ -1,10 +1,14 @@
 from __future__ import annotations
 
+from mypy import build
+from mypy.modulefinder import BuildSource
 from mypy.nodes import CONTRAVARIANT, COVARIANT, INVARIANT
+from mypy.options import Options
 from mypy.subtypes import is_subtype
 from mypy.test.helpers import Suite
 from mypy.test.typefixture import InterfaceTypeFixture, TypeFixture
-from mypy.types import Instance, TupleType, Type, UnpackType
+from mypy.types import Instance, TupleType, Type, UnionType, UnpackType
+from mypy.typestate import type_state
 
 
 class SubtypingSuite(Suite):
@@ -380,3 +384,85 @@ class SubtypingSuite(Suite):
     def assert_unrelated(self, s: Type, t: Type) -> None:
         self.assert_not_subtype(s, t)
         self.assert_not_subtype(t, s)
+
+
+class StructuralSubtypeCacheSuite(Suite):
+    def setUp(self) -> None:
+        self.fx = TypeFixture(INVARIANT)
+        type_state.reset_all_subtype_caches()
+        type_state.take_cache_stats()
+
+    def tearDown(self) -> None:
+        type_state.reset_all_subtype_caches()
+        type_state.take_cache_stats()
+
+    def stats(self) -> tuple[int, int]:
+        stats = type_state.take_cache_stats()
+        return stats["subtype_cache_hits"], stats["subtype_cache_misses"]
+
+    def test_equal_types_share_entries(self) -> None:
+        fx = self.fx
+        assert is_subtype(fx.callable(fx.a, fx.b), fx.callable(fx.b, fx.a))
+        assert is_subtype(fx.callable(fx.a, fx.b), fx.callable(fx.b, fx.a))
+        assert not is_subtype(fx.callable(fx.b, fx.a), fx.callable(fx.a, fx.b))
+        assert self.stats() == (1, 2)
+
+    def test_invalidation(self) -> None:
+        fx = self.fx
+        left = UnionType([fx.b, fx.callable(fx.b)])
+        right = UnionType([fx.a, fx.callable(fx.a)])
+        assert is_subtype(left, right)
+        hits, misses = self.stats()
+        assert hits == 0 and misses > 0
+        type_state.reset_subtype_caches_for(fx.di)
+        assert is_subtype(left, right)
+        assert self.stats() == (1, 0)
+        type_state.reset_subtype_caches_for(fx.bi)
+        assert is_subtype(left, right)
+        assert self.stats() == (0, misses)
+
+    def test_generic_callables_are_not_cached(self) -> None:
+        fx = self.fx
+        generic = fx.callable(fx.t, fx.t).copy_modified(variables=[fx.t.copy_modified()])
+        assert is_subtype(generic, fx.callable(fx.a, fx.a))
+        assert is_subtype(generic, fx.callable(fx.a, fx.a))
+        assert self.stats() == (0, 0)
+
+
+class OverloadCacheSuite(Suite):
+    def check(self, program: str) -> tuple[list[str], int, int]:
+        options = Options()
+        options.incremental = False
+        result = build.build([BuildSource("main", "__main__", program)], options)
+        stats = result.manager.stats
+        return result.errors, stats["overload_cache_hits"], stats["overload_cache_misses"]
+
+    def test_method_calls(self) -> None:
+        # The overload items of generic methods are new objects for each call.
+        errors, hits, misses = self.check(
+            """
+from typing import Generic, TypeVar, overload
+T = TypeVar("T")
+S = TypeVar("S")
+class Box(Generic[T]):
+    @overload
+    def get(self, x: int) -> T: ...
+    @overload
+    def get(self, x: list[S]) -> S: ...
+    def get(self, x: object) -> object: ...
+a: Box[int]
+b: Box[str]
+n = 1
+reveal_type(a.get(n))
+reveal_type(a.get(n))
+reveal_type(b.get(n))
+reveal_type(b.get(n))
+"""
+        )
+        assert errors == [
+            'main:14: note: Revealed type is "builtins.int"',
+            'main:15: note: Revealed type is "builtins.int"',
+            'main:16: note: Revealed type is "builtins.str"',
+            'main:17: note: Revealed type is "builtins.str"',
+        ]
+        assert (hits, misses) == (2, 2)
@@ -3,7 +3,7 @@
 from __future__ import annotations
 
 import re
-from unittest import TestCase, skipUnless
+from unittest import TestCase, mock, skipUnless
 
 from mypy.erasetype import erase_type, remove_instance_last_known_values
 from mypy.indirection import TypeIndirectionVisitor
@@ -29,7 +29,7 @@ from mypy.state import state
 from mypy.subtypes import is_more_precise, is_proper_subtype, is_same_type, is_subtype
 from mypy.test.helpers import Suite, assert_equal, assert_type, skip
 from mypy.test.typefixture import InterfaceTypeFixture, TypeFixture
-from mypy.typeops import false_only, make_simplified_union, true_only
+from mypy.typeops import UNION_ITEM_INDEX_THRESHOLD, false_only, make_simplified_union, true_only
 from mypy.types import (
     AnyType,
     CallableType,
@@ -47,8 +47,10 @@ from mypy.types import (
     UnboundType,
     UninhabitedType,
     UnionType,
+    deserialize_type,
     get_proper_type,
     has_recursive_types,
+    type_interner,
 )
 
 # Solving the import cycle:
@@ -611,6 +613,23 @@ class TypeOpsSuite(Suite):
         # This shouldn't be very slow, even if the union is big.
         self.assert_simplified_union([*literals, fx.str_type], fx.str_type)
 
+    def test_simplify_large_unions_of_classes(self) -> None:
+        fx = self.fx
+        for size in [10, 100, 1000]:
+            # class C<i>(A)
+            classes: list[Type] = [
+                Instance(fx.make_type_info(f"C{i}", mro=[fx.ai, fx.oi]), []) for i in range(size)
+            ]
+            self.assert_simplified_union(classes, UnionType(classes))
+            self.assert_simplified_union([*classes, fx.a], fx.a)
+            self.assert_simplified_union([fx.o, *classes, fx.d], fx.o)
+            self.assert_simplified_union([fx.b, *classes, fx.d], UnionType([fx.b, *classes, fx.d]))
+            with mock.patch("mypy.subtypes.is_proper_subtype", wraps=is_proper_subtype) as check:
+                make_simplified_union([*classes, fx.a])
+            if size > UNION_ITEM_INDEX_THRESHOLD:
+                # Only the items that may be supertypes of an item are checked.
+                assert check.call_count <= size
+
     def test_simplified_union_with_str_instance_literals(self) -> None:
         fx = self.fx
 
@@ -1472,3 +1491,40 @@ class TestExpandTypeLimitGetProperType(TestCase):
             code = f.read()
         get_proper_type_count = len(re.findall("get_proper_type", code))
         assert get_proper_type_count == self.ALLOWED_GET_PROPER_TYPES
+
+
+class TypeInternerSuite(Suite):
+    def tearDown(self) -> None:
+        type_interner.reset(False)
+
+    def test_disabled(self) -> None:
+        type_interner.reset(False)
+        assert deserialize_type("builtins.int") is not deserialize_type("builtins.int")
+        none = {".class": "NoneType"}
+        assert deserialize_type(none) is not deserialize_type(none)
+
+    def test_shared_types(self) -> None:
+        type_interner.reset(True)
+        int_type = deserialize_type("builtins.int")
+        assert deserialize_type("builtins.int") is int_type
+        assert deserialize_type("builtins.str") is not int_type
+        literal = {".class": "LiteralType", "value": 1, "fallback": "builtins.int"}
+        literal_type = get_proper_type(deserialize_type(literal))
+        assert isinstance(literal_type, LiteralType)
+        assert literal_type.fallback is int_type
+        assert deserialize_type(literal) is literal_type
+        assert deserialize_type({**literal, "value": 2}) is not literal_type
+        none = {".class": "NoneType"}
+        assert deserialize_type(none) is deserialize_type(none)
+        generic = {".class": "Instance", "type_ref": "builtins.list", "args": ["builtins.int"]}
+        assert deserialize_type(generic) is not deserialize_type(generic)
+        assert type_interner.reused == {"Instance": 5, "LiteralType": 1, "NoneType": 2}
+
+    def test_forget(self) -> None:
+        type_interner.reset(True)
+        int_type = deserialize_type("builtins.int")
+        literal = {".class": "LiteralType", "value": 1, "fallback": "builtins.int"}
+        literal_type = deserialize_type(literal)
+        type_interner.forget("builtins.int")
+        assert deserialize_type("builtins.int") is not int_type
+        assert deserialize_type(literal) is not literal_type
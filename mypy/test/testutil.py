@@ -3,7 +3,7 @@ from __future__ import annotations
 import os
 from unittest import TestCase, mock
 
-from mypy.util import get_terminal_width
+from mypy.util import get_terminal_width, hash_algorithm, hash_digest
 
 
 class TestGetTerminalSize(TestCase):
@@ -15,3 +15,14 @@ class TestGetTerminalSize(TestCase):
         with mock.patch.object(os, "get_terminal_size", return_value=ret):
             with mock.patch.dict(os.environ, values=mock_environ, clear=True):
                 assert get_terminal_width() == 80
+
+
+class TestHashDigest(TestCase):
+    def test_algorithms(self) -> None:
+        sha256 = hash_digest(b"data")
+        blake2b = hash_digest(b"data", "blake2b")
+        assert len(sha256) == 64
+        assert blake2b != sha256
+        assert hash_digest(b"data", "blake2b") == blake2b
+        assert hash_algorithm(sha256) == "sha256"
+        assert hash_algorithm(blake2b) == "blake2b"
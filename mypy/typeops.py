@@ -8,7 +8,7 @@ NOTE: These must not be accessed from mypy.nodes or mypy.types to avoid import
 from __future__ import annotations
 
 import itertools
-from typing import Any, Iterable, List, Sequence, TypeVar, cast
+from typing import Any, Final, Iterable, List, Sequence, TypeVar, cast
 
 from mypy.copytype import copy_type
 from mypy.expandtype import expand_type, expand_type_by_instance
@@ -31,6 +31,7 @@ from mypy.nodes import (
 from mypy.state import state
 from mypy.types import (
     ENUM_REMOVED_PROPS,
+    TYPED_NAMEDTUPLE_NAMES,
     AnyType,
     CallableType,
     ExtraAttrs,
@@ -490,6 +491,69 @@ def make_simplified_union(
     return result
 
 
+# Unions with more items than this use an index to find the items that may be
+# supertypes of an item, instead of checking all items (see UnionItemIndex).
+UNION_ITEM_INDEX_THRESHOLD: Final = 16
+
+
+class UnionItemIndex:
+    """Index of union items, used to find the items that may be supertypes of a type.
+
+    When promotions are ignored, a type is a proper subtype of an instance of a
+    (non-protocol) class only if the class is in the MRO of the type, or of its
+    fallback for literal and TypedDict types. A TypedDict type is a proper subtype
+    of another TypedDict type only if it has all keys of the other type, and other
+    types are never proper subtypes of TypedDict types. Other items may be
+    supertypes of anything.
+    """
+
+    def __init__(self) -> None:
+        # Indices of instances of classes, by the full name of the class
+        self.instances: dict[str, list[int]] = {}
+        # Indices of TypedDict types, by their smallest key
+        self.typeddicts: dict[str, list[int]] = {}
+        self.empty_typeddicts: list[int] = []
+        self.others: list[int] = []
+        self.count = 0
+
+    def add(self, item: ProperType) -> None:
+        """Add the next item (items are numbered in the order they are added)."""
+        index = self.count
+        self.count += 1
+        if (
+            isinstance(item, Instance)
+            and not item.type.is_protocol
+            and item.type.fullname != "builtins.object"
+            and item.type.fullname not in TYPED_NAMEDTUPLE_NAMES
+        ):
+            self.instances.setdefault(item.type.fullname, []).append(index)
+        elif isinstance(item, TypedDictType):
+            if item.items:
+                self.typeddicts.setdefault(min(item.items), []).append(index)
+            else:
+                self.empty_typeddicts.append(index)
+        else:
+            self.others.append(index)
+
+    def candidates(self, item: ProperType) -> Sequence[int]:
+        """Return the indices of the items that may be supertypes of a type, in order."""
+        if isinstance(item, Instance):
+            info = item.type
+        elif isinstance(item, (LiteralType, TypedDictType)):
+            info = item.fallback.type
+        else:
+            return range(self.count)
+        result = self.others.copy()
+        for base in info.mro:
+            result.extend(self.instances.get(base.fullname, ()))
+        if isinstance(item, TypedDictType):
+            result.extend(self.empty_typeddicts)
+            for key in item.items:
+                result.extend(self.typeddicts.get(key, ()))
+        result.sort()
+        return result
+
+
 def _remove_redundant_union_items(items: list[Type], keep_erased: bool) -> list[Type]:
     from mypy.subtypes import is_proper_subtype
 
@@ -501,6 +565,7 @@ def _remove_redundant_union_items(items: list[Type], keep_erased: bool) -> list[
         # seen is a map from a type to its index in new_items
         seen: dict[ProperType, int] = {}
         unduplicated_literal_fallbacks: set[Instance] | None = None
+        index = UnionItemIndex() if len(items) > UNION_ITEM_INDEX_THRESHOLD else None
         for ti in items:
             proper_ti = get_proper_type(ti)
 
@@ -526,8 +591,12 @@ def _remove_redundant_union_items(items: list[Type], keep_erased: bool) -> list[
                 pass
             else:
                 # If not, check if we've seen a supertype of this type
-                for j, tj in enumerate(new_items):
-                    tj = get_proper_type(tj)
+                if index is not None:
+                    candidates = index.candidates(proper_ti)
+                else:
+                    candidates = range(len(new_items))
+                for j in candidates:
+                    tj = get_proper_type(new_items[j])
                     # If tj is an Instance with a last_known_value, do not remove proper_ti
                     # (unless it's an instance with the same last_known_value)
                     if (
@@ -556,6 +625,8 @@ def _remove_redundant_union_items(items: list[Type], keep_erased: bool) -> list[
                 # We have a non-duplicate item, add it to new_items
                 seen[proper_ti] = len(new_items)
                 new_items.append(ti)
+                if index is not None:
+                    index.add(proper_ti)
                 if isinstance(proper_ti, LiteralType):
                     if unduplicated_literal_fallbacks is None:
                         unduplicated_literal_fallbacks = set()
@@ -1239,6 +1239,8 @@ class NoneType(ProperType):
     @classmethod
     def deserialize(cls, data: JsonDict) -> NoneType:
         assert data[".class"] == "NoneType"
+        if type_interner.enabled:
+            return type_interner.none()
         return NoneType()
 
     def is_singleton_type(self) -> bool:
@@ -1293,6 +1295,77 @@ class DeletedType(ProperType):
 NOT_READY: Final = mypy.nodes.FakeInfo("De-serialization failure: TypeInfo not fixed")
 
 
+class TypeInterner:
+    """Shared copies of common types deserialized from the cache (see --intern-types).
+
+    The same types, such as builtins.str, are deserialized again for each module
+    loaded from the cache. When enabled, instances without type arguments, literal
+    types and None types are shared by all modules, so that they are only stored
+    once and mostly compare by identity. Only deserialized types are shared, since
+    types created during semantic analysis and type checking may be modified.
+
+    Instances are shared before they are fixed up (see mypy.fixup), so entries
+    must be forgotten when a name may no longer refer to the same TypeInfo.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.instances: dict[str, Instance] = {}
+        # Fallback fullname -> value -> literal type
+        self.literals: dict[str, dict[LiteralValue, LiteralType]] = {}
+        self.none_type = NoneType()
+        # Number of deserialized types that were replaced by a shared type, by class name
+        self.reused: dict[str, int] = {}
+
+    def reset(self, enabled: bool) -> None:
+        self.enabled = enabled
+        self.clear()
+        self.reused.clear()
+
+    def clear(self) -> None:
+        self.instances.clear()
+        self.literals.clear()
+
+    def forget(self, fullname: str) -> None:
+        """Stop sharing instances (and literals) of a type."""
+        self.instances.pop(fullname, None)
+        self.literals.pop(fullname, None)
+
+    def instance(self, fullname: str) -> Instance:
+        inst = self.instances.get(fullname)
+        if inst is None:
+            inst = Instance(NOT_READY, [])
+            inst.type_ref = fullname
+            self.instances[fullname] = inst
+        else:
+            self.record_reuse("Instance")
+        return inst
+
+    def literal(self, value: LiteralValue, fallback: str) -> LiteralType:
+        literals = self.literals.setdefault(fallback, {})
+        typ = literals.get(value)
+        if typ is None:
+            typ = LiteralType(value, self.instance(fallback))
+            literals[value] = typ
+        else:
+            self.record_reuse("LiteralType")
+        return typ
+
+    def none(self) -> NoneType:
+        self.record_reuse("NoneType")
+        return self.none_type
+
+    def record_reuse(self, name: str) -> None:
+        self.reused[name] = self.reused.get(name, 0) + 1
+
+    def size(self) -> int:
+        """Return the number of shared types."""
+        return len(self.instances) + sum(len(lits) for lits in self.literals.values()) + 1
+
+
+type_interner: Final = TypeInterner()
+
+
 class ExtraAttrs:
     """Summary of module attributes and types.
 
@@ -1443,6 +1516,8 @@ class Instance(ProperType):
     @classmethod
     def deserialize(cls, data: JsonDict | str) -> Instance:
         if isinstance(data, str):
+            if type_interner.enabled:
+                return type_interner.instance(data)
             inst = Instance(NOT_READY, [])
             inst.type_ref = data
             return inst
@@ -2646,6 +2721,8 @@ class LiteralType(ProperType):
     @classmethod
     def deserialize(cls, data: JsonDict) -> LiteralType:
         assert data[".class"] == "LiteralType"
+        if type_interner.enabled and isinstance(data["fallback"], str):
+            return type_interner.literal(data["value"], data["fallback"])
         return LiteralType(value=data["value"], fallback=Instance.deserialize(data["fallback"]))
 
     def is_singleton_type(self) -> bool:
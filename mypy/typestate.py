@@ -5,7 +5,7 @@ and potentially other mutable TypeInfo state. This module contains mutable globa
 
 from __future__ import annotations
 
-from typing import Dict, Final, Set, Tuple
+from typing import AbstractSet, Dict, Final, Hashable, List, Optional, Set, Tuple
 from typing_extensions import TypeAlias as _TypeAlias
 
 from mypy.nodes import TypeInfo
@@ -14,6 +14,9 @@ from mypy.types import Instance, Type, TypeVarId, get_proper_type
 
 MAX_NEGATIVE_CACHE_TYPES: Final = 1000
 MAX_NEGATIVE_CACHE_ENTRIES: Final = 10000
+MAX_STRUCTURAL_CACHE_ENTRIES: Final = 10000
+MAX_OVERLOAD_CACHE_ENTRIES: Final = 10000
+MAX_MEMBER_ACCESS_CACHE_ENTRIES: Final = 10000
 
 # Represents that the 'left' instance is a subtype of the 'right' instance
 SubtypeRelationship: _TypeAlias = Tuple[Instance, Instance]
@@ -26,6 +29,21 @@ SubtypeKind: _TypeAlias = Tuple[bool, ...]
 # subtype relationship
 SubtypeCache: _TypeAlias = Dict[TypeInfo, Dict[SubtypeKind, Set[SubtypeRelationship]]]
 
+# A subtype check between arbitrary types, together with the conditions of the check
+StructuralSubtypeCheck: _TypeAlias = Tuple[SubtypeKind, Type, Type]
+
+# The overload items and the argument types (and other conditions) of a call to an
+# overloaded function, see ExpressionChecker.infer_overload_return_type()
+OverloadCallKey: _TypeAlias = Tuple[Hashable, ...]
+# The types that the key of a cached call refers to by identity (these are kept alive,
+# so that their ids aren't reused), and the inferred return type and callee type, or
+# None if no item matched
+OverloadCallResult: _TypeAlias = Tuple[List[Type], Optional[Tuple[Type, Type]]]
+
+# The receiver type, member name and other conditions of an attribute access, see
+# mypy.checkmember.analyze_member_access()
+MemberAccessKey: _TypeAlias = Tuple[Hashable, ...]
+
 
 class TypeState:
     """This class provides subtype caching to improve performance of subtype checks.
@@ -48,6 +66,32 @@ class TypeState:
     # Same as above but for negative subtyping results.
     _negative_subtype_caches: Final[SubtypeCache]
 
+    # Results of subtype checks involving callable, tuple, TypedDict, union and overloaded
+    # types, keyed by the structure of the types (types that compare equal share entries).
+    # Each entry is also indexed by every TypeInfo that the types refer to, so that it's
+    # invalidated together with the subtype caches of any of these TypeInfos.
+    _structural_subtype_cache: Final[dict[StructuralSubtypeCheck, bool]]
+    _structural_cache_deps: Final[dict[TypeInfo, set[StructuralSubtypeCheck]]]
+    # Number of lookups in the above cache that were hits and misses since the
+    # counters were last reported (see take_cache_stats).
+    structural_cache_hits: int
+    structural_cache_misses: int
+
+    # Results of overload resolution for calls with the same overload items and argument
+    # types. The entries are indexed by TypeInfos like the structural subtype cache above.
+    _overload_cache: Final[dict[OverloadCallKey, OverloadCallResult]]
+    _overload_cache_deps: Final[dict[TypeInfo, set[OverloadCallKey]]]
+    overload_cache_hits: int
+    overload_cache_misses: int
+
+    # Types of attributes of instances, for accesses with the same receiver type and
+    # conditions. The entries are indexed by the TypeInfos of the receiver and its MRO,
+    # and by other TypeInfos that the key refers to.
+    _member_access_cache: Final[dict[MemberAccessKey, Type]]
+    _member_access_cache_deps: Final[dict[TypeInfo, set[MemberAccessKey]]]
+    member_access_cache_hits: int
+    member_access_cache_misses: int
+
     # This contains protocol dependencies generated after running a full build,
     # or after an update. These dependencies are special because:
     #   * They are a global property of the program; i.e. some dependencies for imported
@@ -105,6 +149,18 @@ class TypeState:
     def __init__(self) -> None:
         self._subtype_caches = {}
         self._negative_subtype_caches = {}
+        self._structural_subtype_cache = {}
+        self._structural_cache_deps = {}
+        self.structural_cache_hits = 0
+        self.structural_cache_misses = 0
+        self._overload_cache = {}
+        self._overload_cache_deps = {}
+        self.overload_cache_hits = 0
+        self.overload_cache_misses = 0
+        self._member_access_cache = {}
+        self._member_access_cache_deps = {}
+        self.member_access_cache_hits = 0
+        self.member_access_cache_misses = 0
         self.proto_deps = {}
         self._attempted_protocols = {}
         self._checked_against_members = {}
@@ -140,19 +196,144 @@ class TypeState:
         """Completely reset all known subtype caches."""
         self._subtype_caches.clear()
         self._negative_subtype_caches.clear()
+        self._structural_subtype_cache.clear()
+        self._structural_cache_deps.clear()
+        self._overload_cache.clear()
+        self._overload_cache_deps.clear()
+        self._member_access_cache.clear()
+        self._member_access_cache_deps.clear()
 
     def reset_subtype_caches_for(self, info: TypeInfo) -> None:
-        """Reset subtype caches (if any) for a given supertype TypeInfo."""
+        """Reset subtype caches (if any) for a given supertype TypeInfo.
+
+        This also drops all cached structural subtype checks, overload calls and member
+        accesses that refer to the TypeInfo.
+        """
         if info in self._subtype_caches:
             self._subtype_caches[info].clear()
         if info in self._negative_subtype_caches:
             self._negative_subtype_caches[info].clear()
+        self._remove_cache_entries_for(info)
+
+    def reset_member_access_cache_for(self, info: TypeInfo) -> None:
+        """Drop the cached member accesses that depend on a TypeInfo."""
+        accesses = self._member_access_cache_deps.pop(info, None)
+        if accesses:
+            for access in accesses:
+                self._member_access_cache.pop(access, None)
+
+    def remove_subtype_caches_for(self, info: TypeInfo) -> None:
+        """Remove subtype caches (if any) for a TypeInfo that is no longer used."""
+        self._subtype_caches.pop(info, None)
+        self._negative_subtype_caches.pop(info, None)
+        self._remove_cache_entries_for(info)
+
+    def _remove_cache_entries_for(self, info: TypeInfo) -> None:
+        checks = self._structural_cache_deps.pop(info, None)
+        if checks:
+            for check in checks:
+                self._structural_subtype_cache.pop(check, None)
+        calls = self._overload_cache_deps.pop(info, None)
+        if calls:
+            for call in calls:
+                self._overload_cache.pop(call, None)
+        self.reset_member_access_cache_for(info)
 
     def reset_all_subtype_caches_for(self, info: TypeInfo) -> None:
         """Reset subtype caches (if any) for a given supertype TypeInfo and its MRO."""
         for item in info.mro:
             self.reset_subtype_caches_for(item)
 
+    def lookup_structural_subtype_check(
+        self, kind: SubtypeKind, left: Type, right: Type
+    ) -> bool | None:
+        """Return the cached result of a structural subtype check, or None if not cached."""
+        result = self._structural_subtype_cache.get((kind, left, right))
+        if result is None:
+            self.structural_cache_misses += 1
+        else:
+            self.structural_cache_hits += 1
+        return result
+
+    def record_structural_subtype_check(
+        self,
+        kind: SubtypeKind,
+        left: Type,
+        right: Type,
+        result: bool,
+        infos: AbstractSet[TypeInfo],
+    ) -> None:
+        """Cache the result of a subtype check between types that refer to given TypeInfos."""
+        if len(self._structural_subtype_cache) >= MAX_STRUCTURAL_CACHE_ENTRIES:
+            self._structural_subtype_cache.clear()
+            self._structural_cache_deps.clear()
+        check = (kind, left, right)
+        self._structural_subtype_cache[check] = result
+        for info in infos:
+            self._structural_cache_deps.setdefault(info, set()).add(check)
+
+    def lookup_overload_call(self, key: OverloadCallKey) -> OverloadCallResult | None:
+        """Return the cached result of overload resolution, or None if not cached."""
+        result = self._overload_cache.get(key)
+        if result is None:
+            self.overload_cache_misses += 1
+        else:
+            self.overload_cache_hits += 1
+        return result
+
+    def record_overload_call(
+        self,
+        key: OverloadCallKey,
+        referenced: list[Type],
+        result: tuple[Type, Type] | None,
+        infos: AbstractSet[TypeInfo],
+    ) -> None:
+        """Cache the result of overload resolution for a call that refers to given TypeInfos."""
+        if len(self._overload_cache) >= MAX_OVERLOAD_CACHE_ENTRIES:
+            self._overload_cache.clear()
+            self._overload_cache_deps.clear()
+        self._overload_cache[key] = (referenced, result)
+        for info in infos:
+            self._overload_cache_deps.setdefault(info, set()).add(key)
+
+    def lookup_member_access(self, key: MemberAccessKey) -> Type | None:
+        """Return the cached type of an attribute access, or None if not cached."""
+        result = self._member_access_cache.get(key)
+        if result is None:
+            self.member_access_cache_misses += 1
+        else:
+            self.member_access_cache_hits += 1
+        return result
+
+    def record_member_access(
+        self, key: MemberAccessKey, result: Type, infos: AbstractSet[TypeInfo]
+    ) -> None:
+        """Cache the type of an attribute access that depends on given TypeInfos."""
+        if len(self._member_access_cache) >= MAX_MEMBER_ACCESS_CACHE_ENTRIES:
+            self._member_access_cache.clear()
+            self._member_access_cache_deps.clear()
+        self._member_access_cache[key] = result
+        for info in infos:
+            self._member_access_cache_deps.setdefault(info, set()).add(key)
+
+    def take_cache_stats(self) -> dict[str, int]:
+        """Return the hit and miss counts of the caches in this class and reset them."""
+        stats = {
+            "subtype_cache_hits": self.structural_cache_hits,
+            "subtype_cache_misses": self.structural_cache_misses,
+            "overload_cache_hits": self.overload_cache_hits,
+            "overload_cache_misses": self.overload_cache_misses,
+            "member_cache_hits": self.member_access_cache_hits,
+            "member_cache_misses": self.member_access_cache_misses,
+        }
+        self.structural_cache_hits = 0
+        self.structural_cache_misses = 0
+        self.overload_cache_hits = 0
+        self.overload_cache_misses = 0
+        self.member_access_cache_hits = 0
+        self.member_access_cache_misses = 0
+        return stats
+
     def is_cached_subtype_check(self, kind: SubtypeKind, left: Instance, right: Instance) -> bool:
         if left.last_known_value is not None or right.last_known_value is not None:
             # If there is a literal last known value, give up. There
@@ -319,5 +500,6 @@ def reset_global_state() -> None:
     and functools.lru_cache.
     """
     type_state.reset_all_subtype_caches()
+    type_state.take_cache_stats()
     type_state.reset_protocol_deps()
     TypeVarId.next_raw_id = 1
@@ -487,16 +487,41 @@ def soft_wrap(msg: str, max_len: int, first_offset: int, num_indent: int = 0) ->
     return padding.join(lines)
 
 
-def hash_digest(data: bytes) -> str:
+# Algorithms supported by hash_digest(). The default is sha256, which is
+# hardware accelerated on many CPUs; blake2b tends to be faster elsewhere, and
+# xxh3 (a non-cryptographic hash, requires the xxhash package) is the fastest.
+HASH_ALGORITHMS: Final = ("sha256", "blake2b", "xxh3")
+DEFAULT_HASH_ALGORITHM: Final = "sha256"
+
+
+def hash_digest(data: bytes, algorithm: str = DEFAULT_HASH_ALGORITHM) -> str:
     """Compute a hash digest of some data.
 
-    We use a cryptographic hash because we want a low probability of
-    accidental collision, but we don't really care about any of the
+    We use a cryptographic hash by default because we want a low probability
+    of accidental collision, but we don't really care about any of the
     cryptographic properties.
+
+    Digests from algorithms other than the default are prefixed by the name
+    of the algorithm, so that digests from different algorithms never match
+    (see hash_algorithm()).
     """
-    # Once we drop Python 3.5 support, we should consider using
-    # blake2b, which is faster.
-    return hashlib.sha256(data).hexdigest()
+    if algorithm == DEFAULT_HASH_ALGORITHM:
+        return hashlib.sha256(data).hexdigest()
+    elif algorithm == "blake2b":
+        return "blake2b:" + hashlib.blake2b(data, digest_size=16).hexdigest()
+    elif algorithm == "xxh3":
+        import xxhash  # type: ignore[import, unused-ignore]
+
+        digest: str = xxhash.xxh3_128_hexdigest(data)
+        return "xxh3:" + digest
+    else:
+        assert False, f"Unknown hash algorithm {algorithm}"
+
+
+def hash_algorithm(digest: str) -> str:
+    """Return the name of the algorithm used to compute digest."""
+    algorithm, sep, _ = digest.partition(":")
+    return algorithm if sep else DEFAULT_HASH_ALGORITHM
 
 
 def parse_gray_color(cup: bytes) -> str:
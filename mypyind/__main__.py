@@ -1,10 +1,37 @@
-import sys
+import argparse
 
-from mypyind.src.view.command import run_mypyind
+from mypyind.src.view.command import run_mypyind, run_mypyind_batch
 
 if __name__ == "__main__":
-    try:
-        target_path = sys.argv[1]
-    except IndexError:
-        raise Exception("Please provide a target file path.")
-    run_mypyind(target_path=target_path)
+    parser = argparse.ArgumentParser(prog="mypyind")
+    parser.add_argument("target_path", help="file or directory to analyze")
+    parser.add_argument("--rebuild-index", action="store_true", help="discard cached call edges")
+    parser.add_argument(
+        "--use-saved-index",
+        action="store_true",
+        help="answer from the saved index without running mypy",
+    )
+    parser.add_argument(
+        "--seeds", metavar="FILE", help="batch mode: find callers of each line of FILE"
+    )
+    parser.add_argument(
+        "--output",
+        metavar="FILE",
+        default="found.jsonl",
+        help="batch mode output, JSON lines or SQLite (.db, .sqlite)",
+    )
+    args = parser.parse_args()
+    if args.seeds is not None:
+        run_mypyind_batch(
+            target_path=args.target_path,
+            seeds_path=args.seeds,
+            output_path=args.output,
+            rebuild_index=args.rebuild_index,
+            use_saved_index=args.use_saved_index,
+        )
+    else:
+        run_mypyind(
+            target_path=args.target_path,
+            rebuild_index=args.rebuild_index,
+            use_saved_index=args.use_saved_index,
+        )
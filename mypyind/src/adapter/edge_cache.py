@@ -0,0 +1,95 @@
+"""Per-module call edges stored alongside the mypy incremental cache.
+
+The edges of a module are only collected while mypy type checks it, so for
+modules that are fresh in the mypy cache they are read from here instead. Each
+edges file records the meta of the mypy cache entry it was collected with, and
+is only valid as long as that meta is unchanged.
+"""
+import json
+import logging
+
+from mypy.build import BuildResult, get_cache_names
+from mypy.metastore import MetadataStore
+from mypyind.src.call_graph import CallGraphIndex
+
+logger = logging.getLogger(__name__)
+
+META_SUFFIX = ".meta.json"
+EDGES_SUFFIX = ".mypyind.json"
+
+
+def edges_name_for_meta(meta_name: str) -> str:
+    return meta_name[: -len(META_SUFFIX)] + EDGES_SUFFIX
+
+
+def _read_json(metastore: MetadataStore, name: str) -> dict | None:
+    try:
+        data = json.loads(metastore.read(name))
+    except (OSError, KeyError, ValueError):
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def _meta_key(meta: dict) -> list | None:
+    if "hash" not in meta or "data_mtime" not in meta:
+        return None
+    return [meta["hash"], meta["data_mtime"]]
+
+
+def invalidate_modules_without_edges(metastore: MetadataStore) -> int:
+    """Remove mypy cache metas that have no valid edges, so mypy rechecks them.
+
+    Returns the number of invalidated modules.
+    """
+    count = 0
+    for name in list(metastore.list_all()):
+        if not name.endswith(META_SUFFIX):
+            continue
+        meta = _read_json(metastore, name)
+        edges = _read_json(metastore, edges_name_for_meta(name))
+        if meta is None or edges is None or edges.get("meta") != _meta_key(meta):
+            metastore.remove(name)
+            count += 1
+    if count:
+        logger.info(f"Invalidated {count} cached modules without call edges.")
+    return count
+
+
+def write_module_edges(
+    metastore: MetadataStore, meta_name: str, edges: set[tuple[str, str]]
+) -> bool:
+    """Store edges of a module that was just checked and written to the mypy cache."""
+    meta = _read_json(metastore, meta_name)
+    key = _meta_key(meta) if meta is not None else None
+    if key is None:
+        # The module wasn't written to the cache, so it will be rechecked anyway.
+        return False
+    data = {"meta": key, "edges": sorted(edges)}
+    return metastore.write(edges_name_for_meta(meta_name), json.dumps(data))
+
+
+def read_module_edges(metastore: MetadataStore, meta_name: str) -> set[tuple[str, str]] | None:
+    """Read edges of a module that is fresh in the mypy cache."""
+    data = _read_json(metastore, edges_name_for_meta(meta_name))
+    if data is None:
+        return None
+    return {(callee, caller) for callee, caller in data["edges"]}
+
+
+def sync_module_edges(result: BuildResult, index: CallGraphIndex) -> None:
+    """Store edges of rechecked modules, and add cached edges of fresh ones to index."""
+    manager = result.manager
+    rechecked = cached = 0
+    for id, state in result.graph.items():
+        meta_name = get_cache_names(id, state.xpath, manager.options)[0]
+        if id in manager.rechecked_modules:
+            write_module_edges(manager.metastore, meta_name, index.get_module_edges(id))
+            rechecked += 1
+            continue
+        edges = read_module_edges(manager.metastore, meta_name)
+        if edges is None:
+            logger.warning(f"No cached call edges for {id}.")
+            continue
+        index.add_module_edges(id, edges)
+        cached += 1
+    logger.info(f"Collected call edges of {rechecked} modules, reused {cached}.")
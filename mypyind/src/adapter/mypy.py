@@ -1,25 +1,40 @@
 import io
 import logging
+import shutil
 
-from mypy.main import main
-from mypyind.src.configs import INI_PATH
+from mypy.build import BuildResult, build, create_metastore
+from mypy.errors import CompileError
+from mypy.main import process_options
+from mypyind.src.adapter.edge_cache import invalidate_modules_without_edges
+from mypyind.src.configs import INI_PATH, MYPY_CACHE_DIR
 
 logger = logging.getLogger(__name__)
 MYPY_REQUIRED_OPTIONS = [
-    "--cache-dir=/dev/null",  # disable caching
+    f"--cache-dir={MYPY_CACHE_DIR}",  # cache call edges for incremental re-runs
     "--namespace-packages",
     f"--config-file={INI_PATH}",  # use custom config file
     "--show-traceback",
 ]
 
 
-def call_mypy(target_path: str, options: None | list[str] = None) -> None:
+def call_mypy(target_path: str, options: None | list[str] = None) -> BuildResult | None:
+    """Type check target_path, returning None if mypy stopped on blocking errors."""
     if options is None:
         options = []
     logger.info("Call mypy...")
-    main(
-        stdout=io.StringIO(),
-        stderr=io.StringIO(),
-        args=[target_path] + MYPY_REQUIRED_OPTIONS + options,
-        clean_exit=True,
+    stdout, stderr = io.StringIO(), io.StringIO()
+    sources, mypy_options = process_options(
+        [target_path] + MYPY_REQUIRED_OPTIONS + options, stdout=stdout, stderr=stderr
     )
+    # Modules that are fresh in the mypy cache aren't checked, so their call
+    # edges must be cached too.
+    invalidate_modules_without_edges(create_metastore(mypy_options))
+    try:
+        return build(sources, mypy_options, stdout=stdout, stderr=stderr)
+    except CompileError:
+        logger.warning("Mypy stopped with blocking errors.")
+        return None
+
+
+def clear_mypy_cache() -> None:
+    shutil.rmtree(MYPY_CACHE_DIR, ignore_errors=True)
@@ -0,0 +1,25 @@
+import json
+import logging
+
+from mypyind.src.call_graph import CallGraphIndex
+from mypyind.src.configs import INDEX_PATH, SEED_PATH
+
+logger = logging.getLogger(__name__)
+
+
+def read_index_from_file(path=INDEX_PATH) -> CallGraphIndex | None:
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError):
+        logger.warning(f"Ignoring unreadable index file {path}.")
+        return None
+    return CallGraphIndex.from_dict(data)
+
+
+def read_seeds_from_file(path=SEED_PATH) -> list[str]:
+    """Read seeds, one fullname per line."""
+    with open(path, "r") as f:
+        return [line.strip() for line in f if line.strip()]
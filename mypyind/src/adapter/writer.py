@@ -1,19 +1,27 @@
+from __future__ import annotations
+
 import json
+import sqlite3
+from abc import ABCMeta, abstractmethod
 from datetime import datetime
+from pathlib import Path
+from typing import Any, Tuple
 
-from mypyind.src.configs import TXT_PATH, JSON_PATH, DEBUG_LOG_PATH
-
-# type check
+from mypyind.src.call_graph import CallGraphIndex
+from mypyind.src.configs import DEBUG_LOG_PATH, INDEX_PATH, JSON_PATH, TXT_PATH
 from mypyind.src.state import MypyindState
 
+# (seed, level, callee, caller)
+ResultRow = Tuple[str, int, str, str]
 
-def write_state_to_text_file(state: MypyindState):
+
+def write_state_to_text_file(state: MypyindState) -> None:
     with open(TXT_PATH, "w") as f:
         f.writelines("\n".join(sorted(state.list_all_found())))
 
 
-def write_state_to_json_file(state: MypyindState):
-    dump_data = dict()
+def write_state_to_json_file(state: MypyindState) -> None:
+    dump_data: dict[str, dict[str, int]] = {}
     for found, info in state.found.items():
         dump_data[found] = {}
         for item in info:
@@ -24,6 +32,94 @@ def write_state_to_json_file(state: MypyindState):
         json.dump(dump_data, f, indent=4)
 
 
-def write_log_to_log_file(log: str):
+def write_log_to_log_file(log: str) -> None:
+    write_logs_to_log_file([log])
+
+
+def write_logs_to_log_file(logs: list[str]) -> None:
+    now = datetime.now().isoformat()
     with open(DEBUG_LOG_PATH, "a") as f:
-        f.write(f"[{datetime.now().isoformat()}] {log}\n")
+        f.write("".join(f"[{now}] {log}\n" for log in logs))
+
+
+def write_index_to_file(index: CallGraphIndex, path: str | Path = INDEX_PATH) -> None:
+    with open(path, "w") as f:
+        json.dump(index.to_dict(), f)
+
+
+class ResultWriter(metaclass=ABCMeta):
+    """Buffered writer for (seed, level, callee, caller) results of batch queries."""
+
+    buffer_size = 10000
+
+    def __init__(self) -> None:
+        self._buffer: list[ResultRow] = []
+
+    def __enter__(self) -> ResultWriter:
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def write(self, seed: str, level: int, callee: str, caller: str) -> None:
+        self._buffer.append((seed, level, callee, caller))
+        if len(self._buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._buffer:
+            self._write_rows(self._buffer)
+            self._buffer = []
+
+    def close(self) -> None:
+        self.flush()
+
+    @abstractmethod
+    def _write_rows(self, rows: list[ResultRow]) -> None:
+        """Write a batch of buffered rows."""
+
+
+class JsonLinesResultWriter(ResultWriter):
+    """Write one JSON object per result line."""
+
+    def __init__(self, path: str | Path) -> None:
+        super().__init__()
+        self._file = open(path, "w")
+
+    def _write_rows(self, rows: list[ResultRow]) -> None:
+        lines = []
+        for seed, level, callee, caller in rows:
+            item = {"seed": seed, "level": level, "callee": callee, "caller": caller}
+            lines.append(json.dumps(item) + "\n")
+        self._file.write("".join(lines))
+
+    def close(self) -> None:
+        super().close()
+        self._file.close()
+
+
+class SqliteResultWriter(ResultWriter):
+    """Write results to a "found" table, one transaction per flushed buffer."""
+
+    def __init__(self, path: str | Path) -> None:
+        super().__init__()
+        self._db = sqlite3.connect(path)
+        self._db.execute("DROP TABLE IF EXISTS found")
+        self._db.execute("CREATE TABLE found (seed TEXT, level INTEGER, callee TEXT, caller TEXT)")
+
+    def _write_rows(self, rows: list[ResultRow]) -> None:
+        with self._db:
+            self._db.executemany("INSERT INTO found VALUES (?, ?, ?, ?)", rows)
+
+    def close(self) -> None:
+        super().close()
+        with self._db:
+            self._db.execute("CREATE INDEX IF NOT EXISTS found_seed ON found (seed)")
+        self._db.close()
+
+
+def create_result_writer(path: str | Path) -> ResultWriter:
+    """Create a writer based on the extension of path (.jsonl, or .db/.sqlite)."""
+    if str(path).endswith((".db", ".sqlite", ".sqlite3")):
+        return SqliteResultWriter(path)
+    return JsonLinesResultWriter(path)
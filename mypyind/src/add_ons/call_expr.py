@@ -1,3 +1,5 @@
+from __future__ import annotations
+
 from datetime import datetime
 
 from mypyind.src.adapter.writer import write_log_to_log_file
@@ -5,6 +7,7 @@ from mypyind.src.configs import DEBUG_LOG_PATH
 from mypyind.src.state import global_mypyind_state
 
 # type check
+from mypyind.src.call_graph import CallGraphIndex
 from mypyind.src.state import MypyindState
 
 
@@ -14,6 +17,14 @@ class CallExprAddOn:
     def __init__(self, state: MypyindState, include_test: bool = False):
         self._state = state
         self._include_test = include_test
+        self._index: CallGraphIndex | None = None
+
+    def start_recording(self, index: CallGraphIndex) -> None:
+        """Record every call edge into index instead of only the ones to found items."""
+        self._index = index
+
+    def stop_recording(self) -> None:
+        self._index = None
 
     def render_fullname(
         self, fullname: None | str, member: str, object_type, parent_f
@@ -29,8 +40,13 @@ class CallExprAddOn:
             return
         return fullname
 
-    def add_if_found(self, target: str, from_: str):
-        if (not self._include_test and "test" in from_) or not self._state.is_in_found(target):
+    def add_if_found(self, target: str, from_: str, module: str | None = None) -> None:
+        if not self._include_test and "test" in from_:
+            return
+        if self._index is not None:
+            self._index.add_edge(target, from_, module)
+            return
+        if not self._state.is_in_found(target):
             return
         self._state.add_found(target, from_)
         write_log_to_log_file(log=f"[{self._state.level}] [{target}] is called from [{from_}]")
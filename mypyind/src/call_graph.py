@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import logging
+from collections import deque
+from typing import Any, Iterator
+
+logger = logging.getLogger(__name__)
+
+
+class CallGraphIndex:
+    """Reverse call graph: maps each callee fullname to the fullnames of its callers."""
+
+    def __init__(self, target_path: str = "", callers: dict[str, set[str]] | None = None) -> None:
+        self._target_path = target_path
+        self._callers: dict[str, set[str]] = callers if callers is not None else {}
+        # Edges grouped by the module they were seen in (only while recording)
+        self._module_edges: dict[str, set[tuple[str, str]]] = {}
+
+    @property
+    def target_path(self) -> str:
+        return self._target_path
+
+    @property
+    def callers(self) -> dict[str, set[str]]:
+        return self._callers
+
+    def add_edge(self, callee: str, caller: str, module: str | None = None) -> None:
+        if callee not in self._callers:
+            self._callers[callee] = set()
+        self._callers[callee].add(caller)
+        if module is not None:
+            if module not in self._module_edges:
+                self._module_edges[module] = set()
+            self._module_edges[module].add((callee, caller))
+
+    def add_module_edges(self, module: str, edges: set[tuple[str, str]]) -> None:
+        for callee, caller in edges:
+            self.add_edge(callee, caller, module)
+
+    def get_module_edges(self, module: str) -> set[tuple[str, str]]:
+        return self._module_edges.get(module, set())
+
+    def get_callers(self, callee: str) -> set[str]:
+        return self._callers.get(callee, set())
+
+    def count_edges(self) -> int:
+        return sum(len(callers) for callers in self._callers.values())
+
+    def iter_transitive_callers(self, seed: str) -> Iterator[tuple[int, str, str]]:
+        """Yield (level, callee, caller) for edges reachable from seed, breadth first.
+
+        The level of an edge is the distance of the caller from the seed, which is
+        the iteration in which the fixed-point search used to find it.
+        """
+        visited = {seed}
+        queue = deque([(seed, 0)])
+        while queue:
+            callee, level = queue.popleft()
+            for caller in sorted(self.get_callers(callee)):
+                yield level + 1, callee, caller
+                if caller not in visited:
+                    visited.add(caller)
+                    queue.append((caller, level + 1))
+
+    def iter_transitive_callers_many(
+        self, seeds: list[str]
+    ) -> Iterator[tuple[str, int, str, str]]:
+        """Yield (seed, level, callee, caller) for edges reachable from any of seeds.
+
+        This is a single breadth first traversal shared by all seeds: each
+        function carries a bit mask of the seeds that reached it, so at every
+        level it is expanded once, no matter how many seeds reached it. The
+        levels are the same as those from iter_transitive_callers().
+        """
+        seeds = list(dict.fromkeys(seeds))
+        reached: dict[str, int] = {}
+        for i, seed in enumerate(seeds):
+            reached[seed] = 1 << i
+        frontier = dict(reached)
+        level = 0
+        while frontier:
+            next_frontier: dict[str, int] = {}
+            for callee in sorted(frontier):
+                mask = frontier[callee]
+                seeds_reached = _seeds_in_mask(seeds, mask)
+                for caller in sorted(self.get_callers(callee)):
+                    for seed in seeds_reached:
+                        yield seed, level + 1, callee, caller
+                    new = mask & ~reached.get(caller, 0)
+                    if new:
+                        reached[caller] = reached.get(caller, 0) | new
+                        next_frontier[caller] = next_frontier.get(caller, 0) | new
+            frontier = next_frontier
+            level += 1
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "target_path": self._target_path,
+            "callers": {
+                callee: sorted(callers) for callee, callers in sorted(self._callers.items())
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> CallGraphIndex:
+        return cls(
+            target_path=data["target_path"],
+            callers={callee: set(callers) for callee, callers in data["callers"].items()},
+        )
+
+
+def _seeds_in_mask(seeds: list[str], mask: int) -> list[str]:
+    result = []
+    while mask:
+        low = mask & -mask
+        result.append(seeds[low.bit_length() - 1])
+        mask ^= low
+    return result
@@ -9,6 +9,10 @@ TXT_PATH = Path(DATA_DIR, "found.txt")
 JSON_PATH = Path(DATA_DIR, "found.json")
 DEBUG_LOG_PATH = Path(DATA_DIR, "found.log")
 SEED_PATH = Path(DATA_DIR, "seed.txt")
+INDEX_PATH = Path(DATA_DIR, "index.json")
+
+# Mypy cache directory (call edges of each module are stored alongside)
+MYPY_CACHE_DIR = Path(DATA_DIR, "cache")
 
 # Mypy related path
 MYPY_DIR = Path(DIR.parent, "mypy")
@@ -1,7 +1,18 @@
 import logging
+import time
 
-from mypyind.src.adapter.mypy import call_mypy
-from mypyind.src.adapter.writer import write_state_to_json_file, write_state_to_text_file
+from mypyind.src.adapter.edge_cache import sync_module_edges
+from mypyind.src.adapter.mypy import call_mypy, clear_mypy_cache
+from mypyind.src.adapter.reader import read_index_from_file
+from mypyind.src.adapter.writer import (
+    create_result_writer,
+    write_index_to_file,
+    write_logs_to_log_file,
+    write_state_to_json_file,
+    write_state_to_text_file,
+)
+from mypyind.src.add_ons.call_expr import call_expr_add_on
+from mypyind.src.call_graph import CallGraphIndex
 
 # type check
 from mypyind.src.state import MypyindState
@@ -12,22 +23,76 @@ logger = logging.getLogger(__name__)
 class Mypyind:
     def __init__(self, state: MypyindState):
         self._state = state
-        self._current_found = set(self._state.list_all_found())
 
-    def execute(self, target_path: str) -> None:
-        self._state.increase_level()
+    def execute(
+        self, target_path: str, rebuild_index: bool = False, use_saved_index: bool = False
+    ) -> None:
+        index = self.get_index(target_path, rebuild_index, use_saved_index)
+        self.find_callers(index)
+        write_state_to_json_file(self._state)
+        write_state_to_text_file(self._state)
+        logger.info("Finish finding...")
+
+    def execute_batch(
+        self,
+        target_path: str,
+        seeds: list[str],
+        output_path: str,
+        rebuild_index: bool = False,
+        use_saved_index: bool = False,
+    ) -> None:
+        """Find the transitive callers of each of seeds, writing them to output_path."""
+        index = self.get_index(target_path, rebuild_index, use_saved_index)
+        count = 0
+        with create_result_writer(output_path) as writer:
+            for result in index.iter_transitive_callers_many(seeds):
+                writer.write(*result)
+                count += 1
+        logger.info(f"Wrote {count} results of {len(seeds)} seeds.")
+
+    def get_index(
+        self, target_path: str, rebuild_index: bool, use_saved_index: bool
+    ) -> CallGraphIndex:
+        index = read_index_from_file() if use_saved_index else None
+        if index is not None and index.target_path == target_path:
+            logger.info("Using saved call graph index...")
+            return index
+        if rebuild_index:
+            clear_mypy_cache()
+        index = self.build_index(target_path)
+        write_index_to_file(index)
+        return index
+
+    def build_index(self, target_path: str) -> CallGraphIndex:
+        """Record all call edges in target_path with a single incremental mypy run.
+
+        Edges are only collected from modules that mypy rechecks; those of
+        modules that are fresh in the mypy cache are read from the cache.
+        """
+        logger.info("Building call graph index...")
+        t0 = time.time()
+        index = CallGraphIndex(target_path=target_path)
+        call_expr_add_on.start_recording(index)
         try:
-            call_mypy(target_path)
+            result = call_mypy(target_path)
         except KeyboardInterrupt:
             raise KeyboardInterrupt
         except SystemExit:
-            # Mypy does sys.exit(2) when it finds errors. Bypass this for iteration.
-            pass
-        write_state_to_json_file(self._state)
-        write_state_to_text_file(self._state)
+            # Mypy exits early on invalid options. Bypass this.
+            result = None
+        finally:
+            call_expr_add_on.stop_recording()
+        if result is not None:
+            sync_module_edges(result, index)
+        logger.info(f"Indexed {index.count_edges()} call edges in {time.time() - t0:.2f}s.")
+        return index
 
-        if set(self._state.list_all_found()) != self._current_found:
-            self._current_found = set(self._state.list_all_found())
-            self.execute(target_path)
-        else:
-            logger.info("Finish finding...")
+    def find_callers(self, index: CallGraphIndex) -> None:
+        """Add all transitive callers of the seed to the state."""
+        logs = []
+        for level, callee, caller in index.iter_transitive_callers(self._state.seed):
+            while self._state.level < level:
+                self._state.increase_level()
+            self._state.add_found(callee, caller)
+            logs.append(f"[{level}] [{callee}] is called from [{caller}]")
+        write_logs_to_log_file(logs)
@@ -14,9 +14,14 @@ class FoundItem:
 
 class MypyindState:
     def __init__(self, seed: str = ""):
+        self._seed = seed
         self._level: int = 0
         self._found: dict[str, list[FoundItem]] = {seed: []}
 
+    @property
+    def seed(self) -> str:
+        return self._seed
+
     @property
     def level(self) -> int:
         return self._level
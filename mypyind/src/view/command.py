@@ -1,10 +1,31 @@
 from pathlib import Path
 
+from mypyind.src.adapter.reader import read_seeds_from_file
 from mypyind.src.service.mypyind import Mypyind
 from mypyind.src.state import global_mypyind_state
 
 
-def run_mypyind(target_path: str):
+def run_mypyind(target_path: str, rebuild_index: bool = False, use_saved_index: bool = False):
     path = Path(target_path).absolute()
     mypyind = Mypyind(state=global_mypyind_state)
-    mypyind.execute(target_path=str(path))
+    mypyind.execute(
+        target_path=str(path), rebuild_index=rebuild_index, use_saved_index=use_saved_index
+    )
+
+
+def run_mypyind_batch(
+    target_path: str,
+    seeds_path: str,
+    output_path: str,
+    rebuild_index: bool = False,
+    use_saved_index: bool = False,
+):
+    path = Path(target_path).absolute()
+    mypyind = Mypyind(state=global_mypyind_state)
+    mypyind.execute_batch(
+        target_path=str(path),
+        seeds=read_seeds_from_file(seeds_path),
+        output_path=output_path,
+        rebuild_index=rebuild_index,
+        use_saved_index=use_saved_index,
+    )
@@ -0,0 +1,62 @@
+from mypyind.src.add_ons.call_expr import CallExprAddOn
+from mypyind.src.call_graph import CallGraphIndex
+from mypyind.src.state import MypyindState
+
+
+def test_add_edge():
+    index = CallGraphIndex()
+    index.add_edge("foo", "bar")
+    index.add_edge("foo", "bar")
+    index.add_edge("foo", "baz")
+    assert index.get_callers("foo") == {"bar", "baz"}
+    assert index.get_callers("bar") == set()
+    assert index.count_edges() == 2
+
+
+def test_transitive_callers():
+    index = CallGraphIndex()
+    index.add_edge("seed", "a")
+    index.add_edge("a", "b")
+    index.add_edge("b", "a")
+    index.add_edge("b", "c")
+    index.add_edge("unrelated", "d")
+    assert list(index.iter_transitive_callers("seed")) == [
+        (1, "seed", "a"),
+        (2, "a", "b"),
+        (3, "b", "a"),
+        (3, "b", "c"),
+    ]
+
+
+def test_round_trip():
+    index = CallGraphIndex(target_path="/path")
+    index.add_edge("foo", "bar")
+    loaded = CallGraphIndex.from_dict(index.to_dict())
+    assert loaded.target_path == "/path"
+    assert loaded.callers == {"foo": {"bar"}}
+
+
+def test_add_on_records_all_edges():
+    state = MypyindState("seed")
+    add_on = CallExprAddOn(state=state)
+    index = CallGraphIndex()
+    add_on.start_recording(index)
+    add_on.add_if_found("foo", "bar")
+    add_on.add_if_found("foo", "test_foo")
+    add_on.stop_recording()
+    assert index.callers == {"foo": {"bar"}}
+    assert state.list_all_found() == ["seed"]
+
+
+def test_transitive_callers_many():
+    index = CallGraphIndex()
+    index.add_edge("seed", "a")
+    index.add_edge("a", "b")
+    index.add_edge("b", "a")
+    index.add_edge("other", "b")
+    index.add_edge("b", "c")
+    results = list(index.iter_transitive_callers_many(["seed", "other"]))
+    for seed in ("seed", "other"):
+        assert [
+            (level, callee, caller) for s, level, callee, caller in results if s == seed
+        ] == list(index.iter_transitive_callers(seed))
@@ -0,0 +1,43 @@
+import json
+import os
+
+from mypy.metastore import FilesystemMetadataStore
+from mypyind.src.adapter.edge_cache import (
+    invalidate_modules_without_edges,
+    read_module_edges,
+    write_module_edges,
+)
+
+
+def write_meta(metastore, name, hash):
+    metastore.write(name, json.dumps({"hash": hash, "data_mtime": 1}))
+
+
+def test_edges_round_trip(tmp_path):
+    metastore = FilesystemMetadataStore(str(tmp_path))
+    write_meta(metastore, "a/b.meta.json", "h1")
+    assert write_module_edges(metastore, "a/b.meta.json", {("foo", "a.b.bar")})
+    assert read_module_edges(metastore, "a/b.meta.json") == {("foo", "a.b.bar")}
+    assert invalidate_modules_without_edges(metastore) == 0
+
+
+def test_no_edges_without_meta(tmp_path):
+    metastore = FilesystemMetadataStore(str(tmp_path))
+    assert not write_module_edges(metastore, "a.meta.json", {("foo", "a.bar")})
+    assert read_module_edges(metastore, "a.meta.json") is None
+
+
+def test_invalidate_modules_without_edges(tmp_path):
+    metastore = FilesystemMetadataStore(str(tmp_path))
+    write_meta(metastore, "fresh.meta.json", "h1")
+    write_module_edges(metastore, "fresh.meta.json", set())
+    write_meta(metastore, "missing.meta.json", "h1")
+    write_meta(metastore, "changed.meta.json", "h1")
+    write_module_edges(metastore, "changed.meta.json", set())
+    write_meta(metastore, "changed.meta.json", "h2")
+    assert invalidate_modules_without_edges(metastore) == 2
+    assert sorted(os.path.normpath(name) for name in metastore.list_all()) == [
+        "changed.mypyind.json",
+        "fresh.meta.json",
+        "fresh.mypyind.json",
+    ]
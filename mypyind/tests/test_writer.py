@@ -0,0 +1,31 @@
+import json
+import sqlite3
+
+from mypyind.src.adapter.writer import create_result_writer
+
+ROWS = [("seed", 1, "seed", "a"), ("seed", 2, "a", "b"), ("other", 1, "other", "b")]
+
+
+def test_json_lines(tmp_path):
+    path = tmp_path / "found.jsonl"
+    with create_result_writer(path) as writer:
+        writer.buffer_size = 2
+        for row in ROWS:
+            writer.write(*row)
+    lines = path.read_text().splitlines()
+    assert [json.loads(line) for line in lines] == [
+        {"seed": seed, "level": level, "callee": callee, "caller": caller}
+        for seed, level, callee, caller in ROWS
+    ]
+
+
+def test_sqlite(tmp_path):
+    path = tmp_path / "found.db"
+    for _ in range(2):
+        with create_result_writer(path) as writer:
+            writer.buffer_size = 2
+            for row in ROWS:
+                writer.write(*row)
+    db = sqlite3.connect(path)
+    assert db.execute("SELECT * FROM found").fetchall() == ROWS
+    db.close()